@@ -0,0 +1,206 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: affinity
+   :platform: Unix
+   :synopsis: Placement of the processes on each node onto the cores of its \
+       NUMA nodes, and the number of threads used by numerical libraries.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import glob
+import ctypes
+import logging
+
+THREAD_ENV = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+              'NUMEXPR_NUM_THREADS', 'PYFFTW_NUM_THREADS']
+
+# functions setting the number of threads in libraries that may already be
+# loaded (the environment variables are only read when they are loaded)
+THREAD_FUNCTIONS = {'openblas': 'openblas_set_num_threads',
+                    'mkl_rt': 'MKL_Set_Num_Threads',
+                    'gomp': 'omp_set_num_threads',
+                    'iomp5': 'omp_set_num_threads'}
+
+
+def parse_cpu_list(cpu_list):
+    """ Convert a list of cpus in the kernel format, e.g. '0-3,8,10-11', to a
+    list of integers. """
+    cpus = []
+    for entry in cpu_list.strip().split(','):
+        if not entry:
+            continue
+        if '-' in entry:
+            start, stop = entry.split('-')
+            cpus += range(int(start), int(stop)+1)
+        else:
+            cpus.append(int(entry))
+    return cpus
+
+
+def get_allowed_cpus():
+    """ The cpus this process is allowed to run on. """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('Cpus_allowed_list:'):
+                    return parse_cpu_list(line.split(':')[1])
+    except IOError:
+        logging.debug("Unable to read the allowed cpus")
+    import multiprocessing
+    return range(multiprocessing.cpu_count())
+
+
+def get_numa_nodes(allowed=None):
+    """ The allowed cpus on each NUMA node of this machine (a single node
+    if the topology is unavailable). """
+    allowed = set(allowed if allowed is not None else get_allowed_cpus())
+    nodes = []
+    paths = glob.glob('/sys/devices/system/node/node[0-9]*/cpulist')
+    for path in sorted(paths, key=lambda p: int(p.split('node')[-1][:-8])):
+        with open(path, 'r') as f:
+            cpus = [c for c in parse_cpu_list(f.read()) if c in allowed]
+        if cpus:
+            nodes.append(cpus)
+    return nodes if nodes else [sorted(allowed)]
+
+
+def get_rank_cores(local_rank, n_local, numa_nodes):
+    """ The cores assigned to one of the processes on a node.  The processes
+    are divided as evenly as possible between the NUMA nodes, and each NUMA
+    node's cores as evenly as possible between its processes.  Processes
+    share cores if there are more processes than cores.
+
+    :param int local_rank: The index of the process on this node.
+    :param int n_local: The number of processes on this node.
+    :param list(list(int)) numa_nodes: The cores on each NUMA node.
+    """
+    n_numa = min(len(numa_nodes), n_local)
+    # the processes on each NUMA node
+    counts = [n_local/n_numa + (1 if i < n_local % n_numa else 0)
+              for i in range(n_numa)]
+    starts = [sum(counts[:i]) for i in range(n_numa)]
+    numa = max(i for i in range(n_numa) if starts[i] <= local_rank)
+    cores = numa_nodes[numa]
+    n, idx = counts[numa], local_rank - starts[numa]
+    if n >= len(cores):
+        return [cores[idx % len(cores)]]
+    return cores[idx*len(cores)/n:(idx+1)*len(cores)/n]
+
+
+def set_affinity(cores):
+    """ Restrict this process (and threads created afterwards) to the cores.
+
+    :returns: True if the affinity was set.
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+        return True
+    try:
+        libc = ctypes.CDLL('libc.so.6', use_errno=True)
+    except OSError:
+        logging.debug("Unable to load libc to set the cpu affinity")
+        return False
+    bits = 8*ctypes.sizeof(ctypes.c_ulong)
+    mask = (ctypes.c_ulong*(max(cores)/bits + 1))()
+    for core in cores:
+        mask[core/bits] |= 1 << (core % bits)
+    if libc.sched_setaffinity(0, ctypes.sizeof(mask), ctypes.byref(mask)):
+        logging.debug("Unable to set the cpu affinity: %s",
+                      os.strerror(ctypes.get_errno()))
+        return False
+    return True
+
+
+def set_threads(nThreads):
+    """ Set the number of threads used by OpenMP, the BLAS libraries,
+    numexpr and pyFFTW, including libraries that are already loaded. """
+    for env in THREAD_ENV:
+        os.environ[env] = str(nThreads)
+    for lib in __get_loaded_libraries():
+        for name, func in THREAD_FUNCTIONS.iteritems():
+            if 'lib' + name in os.path.basename(lib):
+                try:
+                    getattr(ctypes.CDLL(lib), func)(ctypes.c_int(nThreads))
+                except (OSError, AttributeError):
+                    pass
+    if 'pyfftw' in sys.modules:
+        config = getattr(sys.modules['pyfftw'], 'config', None)
+        if config is not None:
+            config.NUM_THREADS = nThreads
+
+
+def __get_loaded_libraries():
+    try:
+        with open('/proc/self/maps', 'r') as f:
+            return set(line.split()[-1] for line in f if '.so' in line)
+    except IOError:
+        return set()
+
+
+def setup_affinity(options, hosts, rank):
+    """ Pin each process to its share of the cores on its node, unless the
+    processes have already been bound (e.g. by mpirun), and add the cores of
+    this process ('cpu_affinity') and all processes on its node
+    ('node_cpu_affinity') to the options.
+
+    :param dict options: The run options.
+    :param list(str) hosts: The host name of every process.
+    :param int rank: The rank of this process.
+    :returns: The cores of this process and a description of them.
+    """
+    from mpi4py import MPI
+    allowed = get_allowed_cpus()
+    local_ranks = [r for r in range(len(hosts)) if hosts[r] == hosts[rank]]
+    node_comm = MPI.COMM_WORLD.Split(local_ranks[0], rank)
+    all_allowed = node_comm.allgather(allowed)
+    node_comm.Free()
+
+    node_cpus = sorted(set(c for a in all_allowed for c in a))
+    if options.get('affinity', True) and \
+            all(a == all_allowed[0] for a in all_allowed):
+        numa_nodes = get_numa_nodes(allowed)
+        cores = get_rank_cores(local_ranks.index(rank), len(local_ranks),
+                               numa_nodes)
+        if not set_affinity(cores):
+            cores = allowed
+        desc = 'cores %s (%i NUMA nodes)' % (cores, len(numa_nodes))
+    else:
+        cores = allowed
+        desc = 'cores %s (not pinned)' % cores
+    options['cpu_affinity'] = cores
+    options['node_cpu_affinity'] = node_cpus
+    return cores, desc
+
+
+def set_driver_threads(meta_data, node=False):
+    """ Set the number of threads to the number of cores assigned to this
+    process, or to all processes on the node if node is True, and pin the
+    process to those cores.
+
+    :returns: The number of threads.
+    """
+    key = 'node_cpu_affinity' if node else 'cpu_affinity'
+    cores = meta_data.get_dictionary().get(key, None)
+    if not cores:
+        return None
+    if meta_data.get_dictionary().get('affinity', True):
+        set_affinity(cores)
+    set_threads(len(cores))
+    return len(cores)
@@ -19,11 +19,21 @@
 .. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
 """
 
+import os
+import copy
+import json
+import pickle
+import hashlib
 import logging
 import numpy as np
+from mpi4py import MPI
 
 import savu.core.utils as cu
+import savu.core.trace as trace
+import savu.core.progressive as progressive
 import savu.plugins.utils as pu
+import savu.plugins.plugin_index as pi
+from savu.version import __version__
 from savu.data.experiment_collection import Experiment
 
 
@@ -42,18 +52,66 @@ class PluginRunner(object):
         self.options = options
         # add all relevent locations to the path
         pu.get_plugins_paths()
+        self.__load_plugin_index()
         self.exp = Experiment(options)
 
     def _run_plugin_list(self):
-        """ Create an experiment and run the plugin list.
+        """ Create an experiment and run the plugin list, once for each pass
+        in progressive mode.
         """
+        if self.options.get('progressive', None):
+            self.__run_progressive()
+        else:
+            self.__run_plugin_list()
+
+        logging.info('Processing complete')
+        self.__close_trace()
+        if self.exp.meta_data.get('email'):
+            cu.send_email(self.exp.meta_data.get('email'))
+        return self.exp
+
+    def __run_progressive(self):
+        """ Run the plugin list once for each stride, on every n-th slice of
+        the progressive dimension, and write the results of each pass into a
+        single file at their global indices.  The plugin list is checked
+        once, and only the preview changes between passes.
+        """
+        strides = progressive.get_strides(self.options['progressive'])
+        filename = progressive.get_filename(self.options)
+        rank = MPI.COMM_WORLD.rank
+        if rank == 0 and os.path.exists(filename):
+            os.remove(filename)
+
+        for i, stride in enumerate(strides):
+            cu.user_message("*Progressive pass %i of %i (stride %i)*" %
+                            (i + 1, len(strides), stride))
+            self.exp.meta_data.set('progressive_stride', stride)
+            self.exp.meta_data.set('progressive', None)
+            if i:
+                self.exp._clear_data_objects()
+            self.__run_plugin_list(check=not i)
+
+            self.exp._barrier()
+            if rank == 0:
+                written = progressive.write_pass(
+                    self.exp, filename, stride, stride == strides[-1])
+                cu.user_message("Pass %i results (%s) written to %s" %
+                                (i + 1, ', '.join(written), filename))
+            self.exp._barrier()
+
+    def __run_plugin_list(self, check=True):
         plugin_list = self.exp.meta_data.plugin_list
-        logging.info('Running the plugin list check')
-        self._run_plugin_list_check(plugin_list)
+        if check:
+            logging.info('Running the plugin list check')
+            self._run_plugin_list_check(plugin_list)
 
         logging.info('Setting up the experiment')
         self.exp._experiment_setup()
+        if self.options.get('progressive', None):
+            progressive.check_dim(self.exp)
         exp_coll = self.exp._get_experiment_collection()
+        if check:
+            self.__verify_check_cache(exp_coll)
         n_plugins = plugin_list._get_n_processing_plugins()
 
         #  ********* transport function ***********
@@ -76,14 +134,14 @@ class PluginRunner(object):
         cu.user_message("* Processing Complete *")
         cu.user_message("***********************")
 
-        logging.info('Processing complete')
-        if self.exp.meta_data.get('email'):
-            cu.send_email(self.exp.meta_data.get('email'))
-        return self.exp
-
     def __run_plugin(self, plugin_dict):
         plugin = self._transport_load_plugin(self.exp, plugin_dict)
+        trace.set_plugin(plugin.name)
+        with trace.span(plugin.name, 'plugin'):
+            self.__run_loaded_plugin(plugin)
+        trace.set_plugin(None)
 
+    def __run_loaded_plugin(self, plugin):
         #  ********* transport function ***********
         self._transport_pre_plugin()
 
@@ -108,14 +166,32 @@ class PluginRunner(object):
 
         self.exp._reorganise_datasets(finalise)
 
+    def __close_trace(self):
+        if trace.is_enabled():
+            trace.close()
+            cu.user_message("Trace files written to %s (merge them with "
+                            "savu_trace)" % self.exp.meta_data.get('log_path'))
+
     def _run_plugin_list_check(self, plugin_list):
         """ Run the plugin list through the framework without executing the
-        main processing.
+        main processing.  If a check cache folder is given and an identical
+        run has been checked before, the cached results are used instead.
         """
         plugin_list._check_loaders()
         n_loaders = plugin_list._get_n_loaders()
 
         self.__check_gpu()
+        self.exp.meta_data.set('rank_memory_budget',
+                               cu.get_rank_memory_budget(self.exp.meta_data))
+
+        self.cached_check = None
+        cache_file = self.__get_check_cache_file(plugin_list)
+        if cache_file:
+            self.cached_check = self.__load_check_cache(cache_file)
+            if self.cached_check:
+                self.__apply_check_cache(plugin_list, self.cached_check)
+                cu.user_message("Plugin list check loaded from the cache!")
+                return
 
         check_list = np.arange(len(plugin_list.plugin_list)) - n_loaders
         self.__fake_plugin_list_run(plugin_list, check_list, setnxs=True)
@@ -130,14 +206,105 @@ class PluginRunner(object):
 
         check_list = np.array(list(set(plugin_list._get_savers_index()).
                               difference(set(savers_idx_before)))) - n_loaders
-        self.__fake_plugin_list_run(plugin_list, check_list)
+        shapes = self.__fake_plugin_list_run(plugin_list, check_list)
 
         self.exp._clear_data_objects()
+        if cache_file:
+            self.__save_check_cache(cache_file, plugin_list, shapes)
         cu.user_message("Plugin list check complete!")
 
+    def __get_check_cache_file(self, plugin_list):
+        """ Get the cache file for this run, keyed on the process list, the
+        input data and the processes, or None if caching is not required.
+        """
+        folder = self.options.get('check_cache', None)
+        if not folder:
+            return None
+        data_file = os.path.abspath(self.exp.meta_data.get('data_file'))
+        stat = os.stat(data_file)
+        key = [__version__, plugin_list.plugin_list, data_file, stat.st_size,
+               stat.st_mtime, self.exp.meta_data.get('processes'),
+               self.options['transport'], self.options.get('template', None),
+               self.options.get('progressive', None),
+               self.options.get('progressive_dim', None)]
+        key = json.dumps(key, sort_keys=True, default=str)
+        fname = 'plugin_list_check_' + hashlib.sha1(key).hexdigest() + '.pkl'
+        return os.path.join(folder, fname)
+
+    def __load_plugin_index(self):
+        """ Load the (read-only) plugin index on one process and share it,
+        to avoid parsing the plugin docstrings on every process. """
+        index = None
+        if MPI.COMM_WORLD.rank == 0:
+            index = dict(pi.load_plugin_index())
+        if self.options.get('mpi', False):
+            index = MPI.COMM_WORLD.bcast(index, root=0)
+        pi.set_plugin_index(index)
+
+    def __load_check_cache(self, cache_file):
+        cached = None
+        if MPI.COMM_WORLD.rank == 0 and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as f:
+                    cached = pickle.load(f)
+            except Exception as e:
+                logging.warn("Unable to load the plugin list check cache %s:"
+                             " %s", cache_file, e)
+        if self.exp.meta_data.get('mpi'):
+            cached = MPI.COMM_WORLD.bcast(cached, root=0)
+        return cached
+
+    def __save_check_cache(self, cache_file, plugin_list, shapes):
+        if MPI.COMM_WORLD.rank != 0:
+            return
+        cached = {'plugin_list': plugin_list.plugin_list,
+                  'datasets_list': plugin_list._get_datasets_list(),
+                  'shapes': shapes}
+        if not os.path.exists(os.path.dirname(cache_file)):
+            os.makedirs(os.path.dirname(cache_file))
+        temp_file = cache_file + '.' + str(os.getpid())
+        try:
+            with open(temp_file, 'wb') as f:
+                pickle.dump(cached, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(temp_file, cache_file)
+        except Exception as e:
+            logging.warn("Unable to save the plugin list check cache %s: %s",
+                         cache_file, e)
+
+    def __apply_check_cache(self, plugin_list, cached):
+        """ Set the plugin list state that the check would have created. """
+        plugin_list.plugin_list = copy.deepcopy(cached['plugin_list'])
+        plugin_list._check_loaders()  # reset the loader and saver indices
+        plugin_list._reset_datasets_list()
+        plugin_list.datasets_list.extend(
+            copy.deepcopy(cached['datasets_list']))
+        self.exp._set_nxs_filename()
+
+    def __verify_check_cache(self, exp_coll):
+        """ Fail fast if the dataset shapes found in the experiment setup do
+        not match those in a cached plugin list check, and check the data
+        transfers of the experiment setup against the memory budget of this
+        run. """
+        if not self.cached_check:
+            return
+        shapes = [self.__get_shapes(d) for d in exp_coll['datasets']]
+        if shapes != self.cached_check['shapes']:
+            raise Exception("The cached plugin list check does not match "
+                            "this run: dataset shapes %s != %s. Remove the "
+                            "cache file and re-run." %
+                            (shapes, self.cached_check['shapes']))
+        for name, nbytes, min_nbytes in exp_coll['transfer_nbytes']:
+            self.__check_memory_budget(name, nbytes, min_nbytes)
+
+    def __get_shapes(self, datasets):
+        return sorted((name, tuple(data.get_shape())) for name, data in
+                      datasets.iteritems())
+
     def __fake_plugin_list_run(self, plugin_list, check_list, setnxs=False):
         """ Run through the plugin list without any processing (setup only)\
         and fill in missing dataset names.
+
+        :returns: The (name, shape) of the output datasets of each plugin.
         """
         #plugin_list._reset_datasets_list()
         n_loaders = self.exp.meta_data.plugin_list._get_n_loaders()
@@ -153,13 +320,42 @@ class PluginRunner(object):
         check = [True if x in check_list else False for x in range(n_plugins)]
 
         count = 0
+        shapes = []
         for i in range(n_loaders, n_loaders+n_plugins):
             self.exp._barrier()
             plugin = pu.plugin_loader(self.exp, plist[i], check=check[count])
             plist[i]['cite'] = plugin.get_citation_information()
+            if check[count]:
+                self.__check_memory_budget(
+                    plugin.name, plugin._get_transfer_nbytes(),
+                    plugin._get_transfer_nbytes(minimum=True))
             plugin._clean_up()
+            shapes.append(self.__get_shapes(self.exp.index['out_data']))
             self.exp._merge_out_data_to_in()
             count += 1
+        return shapes
+
+    def __check_memory_budget(self, name, nbytes, min_nbytes):
+        """ Flag a plugin whose data transfers may not fit in the memory budget
+        of each process.
+
+        :param str name: The plugin name.
+        :param int nbytes: The bytes of the largest data transfers.
+        :param int min_nbytes: The bytes of the data transfers of the frames \
+            processed at a time.
+        """
+        budget = self.exp.meta_data.get_dictionary().get(
+            'rank_memory_budget', None)
+        if not budget:
+            return
+        msg = "WARNING: The data transfers of the %s plugin %s %.1f MB per " \
+            "process, which exceeds the memory budget of %.1f MB."
+        if min_nbytes > budget:
+            cu.user_message(msg % (name, 'need at least',
+                                   min_nbytes/2.0**20, budget/2.0**20))
+        elif nbytes > budget:
+            cu.user_message(msg % (name, 'use', nbytes/2.0**20,
+                                   budget/2.0**20))
 
     def __check_gpu(self):
         """ Check if the process list contains GPU processes and determine if
@@ -0,0 +1,184 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: progressive
+   :platform: Unix
+   :synopsis: Coarse-to-fine processing of a plugin list, where each pass \
+       processes a strided subset of the slices and adds its results to a \
+       single output file at their global indices.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import h5py
+import numpy as np
+
+DEFAULT_DIM = 'detector_y'
+BLOCK_BYTES = 64*2**20
+
+
+def get_strides(value):
+    """ The strides of the passes, coarsest first, always ending with a full
+    pass.
+
+    :param value: A comma separated string or a list of strides.
+    """
+    if isinstance(value, str):
+        value = [v for v in value.split(',') if v.strip()]
+    strides = sorted(set(int(v) for v in value), reverse=True)
+    if not strides or strides[-1] < 1:
+        raise Exception("The progressive strides must be positive integers.")
+    return strides if strides[-1] == 1 else strides + [1]
+
+
+def get_filename(options):
+    """ The file holding the results of all passes. """
+    return os.path.join(options['out_path'],
+                        options['datafile_name'] + '_progressive.nxs')
+
+
+def set_preview(data_obj, preview):
+    """ Set the preview of a loaded dataset.  In a progressive pass the step
+    of the progressive dimension is multiplied by the stride of the pass.
+
+    :param Data data_obj: The loaded dataset.
+    :param list preview: The preview parameter of the loader.
+    """
+    mData = data_obj.exp.meta_data.get_dictionary()
+    stride = mData.get('progressive_stride', None)
+    label = mData.get('progressive_dim', DEFAULT_DIM)
+    if not stride or label not in __get_labels(data_obj):
+        data_obj.get_preview().set_preview(preview, load=True)
+        return
+
+    dim = data_obj.get_data_dimension_by_axis_label(label)
+    ndims = len(data_obj.get_shape())
+    preview = list(preview) if preview else [':']*ndims
+    entry = data_obj.get_preview()._add_preview_defaults(
+        [preview[dim]])[0]
+    entry = '0:end:1:1' if entry == ':' else entry
+    vals = entry.split(':')
+    vals[2] = '(%s)*%i' % (vals[2], stride)
+    preview[dim] = ':'.join(vals)
+    data_obj.get_preview().set_preview(preview, load=True)
+
+    starts, stops, steps, _ = data_obj.get_preview().get_starts_stops_steps()
+    length = len(xrange(starts[dim], stops[dim], steps[dim]/stride))
+    data_obj.exp.meta_data.set('progressive', {'dim': dim, 'length': length})
+
+
+def check_dim(exp):
+    """ Raise an error if none of the loaded datasets has the progressive
+    dimension. """
+    mData = exp.meta_data.get_dictionary()
+    if mData.get('progressive', None):
+        return
+    labels = set(l for d in exp.index['in_data'].values()
+                 for l in __get_labels(d))
+    raise Exception(
+        "The progressive dimension '%s' is not an axis label of the loaded "
+        "data: the valid labels are %s." %
+        (mData.get('progressive_dim', DEFAULT_DIM), ', '.join(sorted(labels))))
+
+
+def __get_labels(data_obj):
+    return [l for d in data_obj.data_info.get('axis_labels') for l in d]
+
+
+def write_pass(exp, filename, stride, final):
+    """ Add the final results of a pass to the progressive file.  The
+    results of a coarse pass are copied to the global indices of the
+    processed slices, and the results of the final pass are linked.  A
+    result that does not retain the progressive dimension is linked by the
+    final pass only.
+
+    :returns: The names of the datasets that were written.
+    """
+    mData = exp.meta_data.get_dictionary()
+    info = mData.get('progressive', None)
+    label = mData.get('progressive_dim', DEFAULT_DIM)
+    written = []
+    with h5py.File(mData['nxs_filename'], 'r') as nxs, \
+            h5py.File(filename, 'a') as out:
+        for entry in sorted(nxs['entry'].keys()):
+            if not entry.startswith('final_result_'):
+                continue
+            name = 'entry/' + entry
+            if final:
+                __link_dataset(nxs, out, name)
+                out[name].attrs['stride'] = 1
+            else:
+                data = nxs[name]['data']
+                dim = __get_dim(nxs[name], label, info, stride)
+                if dim is None:
+                    continue
+                __write_dataset(data, out, name, dim, stride, info['length'])
+                out[name].attrs['stride'] = stride
+            written.append(entry[len('final_result_'):])
+    return written
+
+
+def __link_dataset(nxs, out, name):
+    """ Replace a result in the progressive file with a link to the result
+    of the final pass. """
+    link = nxs[name].get('data', getlink=True)
+    if isinstance(link, h5py.ExternalLink):
+        fname, path = link.filename, link.path
+        if not os.path.isabs(fname):
+            fname = os.path.join(os.path.dirname(nxs.filename), fname)
+    else:
+        fname, path = nxs.filename, name + '/data'
+    folder = os.path.dirname(os.path.abspath(out.filename))
+    group = out.require_group(name)
+    group.attrs['signal'] = 'data'
+    if 'data' in group:
+        del group['data']
+    group['data'] = h5py.ExternalLink(os.path.relpath(fname, folder), path)
+
+
+def __get_dim(entry, label, info, stride):
+    """ The dimension of a result with the progressive axis label, if it has
+    one and its length is that of the strided pass. """
+    axes = [str(a) for a in entry.attrs.get('axes', [])]
+    if not info or label not in axes:
+        return None
+    dim = axes.index(label)
+    n = len(xrange(0, info['length'], stride))
+    return dim if entry['data'].shape[dim] == n else None
+
+
+def __write_dataset(data, out, name, dim, step, length):
+    """ Write a result to every step-th slice of the progressive dimension,
+    creating the dataset (unwritten values are NaN) on the first pass. """
+    shape = list(data.shape)
+    shape[dim] = length
+    if name not in out:
+        out.create_group(name).attrs['signal'] = 'data'
+        fill = np.nan if np.dtype(data.dtype).kind == 'f' else 0
+        out[name].create_dataset('data', shape, data.dtype, fillvalue=fill)
+    result = out[name]['data']
+
+    # copy in blocks of slices to bound the memory use
+    nbytes = data.dtype.itemsize*np.prod(data.shape)/max(data.shape[dim], 1)
+    block = max(1, int(BLOCK_BYTES/max(nbytes, 1)))
+    sl_in = [slice(None)]*len(shape)
+    sl_out = [slice(None)]*len(shape)
+    for start in range(0, data.shape[dim], block):
+        stop = min(start + block, data.shape[dim])
+        sl_in[dim] = slice(start, stop)
+        sl_out[dim] = slice(start*step, (stop - 1)*step + 1, step)
+        result[tuple(sl_out)] = data[tuple(sl_in)]
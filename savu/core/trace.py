@@ -0,0 +1,293 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: trace
+   :platform: Unix
+   :synopsis: Per-process trace events in the Chrome trace format (viewable \
+       in chrome://tracing or Perfetto), and the merging and summary of the \
+       trace files from all processes.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import glob
+import json
+import time
+import socket
+import resource
+import threading
+
+# the summary column each event category is counted in
+CATEGORIES = {'read': 'io', 'write': 'io', 'file': 'io', 'comm': 'io',
+              'process': 'compute', 'barrier': 'wait', 'plugin': 'other'}
+COLUMNS = ['io', 'compute', 'wait', 'other']
+
+_tracer = None
+
+
+class Tracer(object):
+    """ Writes the trace events of this process to a file in the JSON array
+    format, one event per line.  The closing bracket is optional in this
+    format, so the file is readable even if the run is killed.
+
+    :param str filename: The trace file.
+    :param int rank: The process rank (the trace process id).
+    :param float offset: Added to the local time (s) to align the clocks of \
+        different nodes.
+    """
+
+    def __init__(self, filename, rank, offset=0.0):
+        self.filename = filename
+        self.rank = rank
+        self.offset = offset
+        self.plugin = None
+        self.threads = {}
+        self.lock = threading.Lock()
+        self.file = open(filename, 'w')
+        self.file.write('[\n')
+        self.__write({'name': 'process_name', 'ph': 'M', 'pid': rank,
+                      'args': {'name': 'rank %i (%s)' %
+                               (rank, socket.gethostname())}})
+        self.__write({'name': 'process_sort_index', 'ph': 'M', 'pid': rank,
+                      'args': {'sort_index': rank}})
+
+    def now(self):
+        return (time.time() + self.offset)*1e6
+
+    def add(self, name, cat, start, end, args):
+        """ Add a complete event, with start and end times in microseconds.
+        """
+        args['plugin'] = args.get('plugin', self.plugin)
+        with self.lock:
+            self.__write({'name': name, 'cat': cat, 'ph': 'X',
+                          'ts': round(start, 1), 'dur': round(end - start, 1),
+                          'pid': self.rank, 'tid': self.__get_tid(),
+                          'args': args})
+
+    def set_plugin(self, name):
+        self.plugin = name
+        with self.lock:
+            self.__write_memory()
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.__write_memory()
+            self.file.write(']\n')
+            self.file.close()
+
+    def __write_memory(self):
+        """ Add a counter event with the peak memory of this process. """
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0
+        self.__write({'name': 'memory', 'ph': 'C', 'ts': round(self.now(), 1),
+                      'pid': self.rank, 'args': {'peak_rss_MB': peak}})
+
+    def __get_tid(self):
+        thread = threading.current_thread()
+        if thread.ident not in self.threads:
+            tid = len(self.threads)
+            self.threads[thread.ident] = tid
+            self.__write({'name': 'thread_name', 'ph': 'M', 'pid': self.rank,
+                          'tid': tid, 'args': {'name': thread.name}})
+        return self.threads[thread.ident]
+
+    def __write(self, event):
+        self.file.write(json.dumps(event) + ',\n')
+
+
+class Span(object):
+    """ A context manager adding a complete event for the code it encloses.
+    """
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.tracer.now()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.cat, self.start, self.tracer.now(),
+                        self.args)
+        return False
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_null_span = _NullSpan()
+
+
+def enable(folder, rank, mpi=False):
+    """ Start tracing this process to trace_<rank>.json in the folder.  If mpi
+    is True this must be called by all processes, and the clocks are aligned
+    with the clock of rank 0.
+    """
+    global _tracer
+    offset = 0.0
+    if mpi:
+        from mpi4py import MPI
+        MPI.COMM_WORLD.barrier()
+        local = time.time()
+        offset = MPI.COMM_WORLD.bcast(local, root=0) - local
+    close()
+    _tracer = Tracer(os.path.join(folder, 'trace_%i.json' % rank), rank,
+                     offset=offset)
+
+
+def close():
+    """ Stop tracing and close the trace file. """
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def is_enabled():
+    return _tracer is not None
+
+
+def span(name, cat, **args):
+    """ A context manager recording the enclosed code as an event.
+
+    :param str name: The event name.
+    :param str cat: The event category: read, process, write, barrier, \
+        file, comm or plugin.
+    :param args: Additional event information.
+    """
+    if _tracer is None:
+        return _null_span
+    return Span(_tracer, name, cat, args)
+
+
+def set_plugin(name):
+    """ Attribute the following events to a plugin (None for the
+    framework). """
+    if _tracer is not None:
+        _tracer.set_plugin(name)
+
+
+def read_trace_file(filename):
+    """ Read the events from a trace file, ignoring an incomplete final
+    event. """
+    events = []
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip().rstrip(',')
+            if line in ['', '[', ']']:
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                break
+    return events
+
+
+def merge_trace_files(folder, out_file=None):
+    """ Merge the trace files from all processes in a folder into a single
+    timeline.
+
+    :param str folder: The folder containing the trace_<rank>.json files.
+    :param str out_file: The merged trace file (optional).
+    :returns: The merged events.
+    """
+    files = glob.glob(os.path.join(folder, 'trace_[0-9]*.json'))
+    if not files:
+        raise Exception("There are no trace files in %s" % folder)
+    events = []
+    for fname in sorted(files):
+        events += read_trace_file(fname)
+    if out_file:
+        with open(out_file, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return events
+
+
+def get_exclusive_times(events):
+    """ The time (us) of each complete event excluding the events nested
+    inside it on the same thread.
+
+    :returns: (event, exclusive time) pairs.
+    """
+    threads = {}
+    for e in events:
+        if e.get('ph') == 'X':
+            threads.setdefault((e['pid'], e['tid']), []).append(e)
+
+    times = []
+    for thread_events in threads.values():
+        thread_events.sort(key=lambda e: (e['ts'], -e['dur']))
+        stack = []
+        for e in thread_events:
+            while stack and e['ts'] >= \
+                    stack[-1][0]['ts'] + stack[-1][0]['dur']:
+                times.append(tuple(stack.pop()))
+            if stack:
+                stack[-1][1] -= e['dur']
+            stack.append([e, e['dur']])
+        times += [tuple(s) for s in stack]
+    return times
+
+
+def summarise(events):
+    """ The time (s) spent by each plugin in I/O (reading, writing, file
+    operations and communication), computation, waiting at barriers and
+    elsewhere, summed over the processes.
+
+    :returns: A dictionary of plugin name: {column: time} and the number of
+        processes.
+    """
+    summary = {}
+    for e, t in get_exclusive_times(events):
+        plugin = e.get('args', {}).get('plugin') or 'framework'
+        column = CATEGORIES.get(e.get('cat'), 'other')
+        row = summary.setdefault(plugin, dict.fromkeys(COLUMNS, 0.0))
+        row[column] += t*1e-6
+    nProcs = len(set(e['pid'] for e in events))
+    return summary, nProcs
+
+
+def get_peak_memory(events):
+    """ The largest peak memory (MB) of any process. """
+    peaks = [e['args']['peak_rss_MB'] for e in events
+             if e.get('ph') == 'C' and e.get('name') == 'memory']
+    return max(peaks) if peaks else None
+
+
+def format_summary(summary, nProcs):
+    """ A table of the time per process spent by each plugin in each
+    category. """
+    width = max([len(p) for p in summary] + [6])
+    header = ('%-' + str(width) + 's') % 'plugin' + \
+        ''.join('%16s' % c for c in COLUMNS + ['total'])
+    lines = [header, '-'*len(header)]
+    for plugin in sorted(summary, key=lambda p: -sum(summary[p].values())):
+        row = summary[plugin]
+        total = sum(row.values())
+        lines.append(('%-' + str(width) + 's') % plugin + ''.join(
+            '%16s' % ('%.2f (%i%%)' % (row[c]/nProcs,
+                                        100*row[c]/total if total else 0))
+            for c in COLUMNS) + '%16.2f' % (total/nProcs))
+    lines.append('Times are in seconds per process (%i processes).' % nProcs)
+    return '\n'.join(lines)
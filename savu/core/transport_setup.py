@@ -26,6 +26,8 @@ import os
 
 from mpi4py import MPI
 import savu.core.utils as cu
+import savu.core.trace as trace
+import savu.core.affinity as af
 
 
 class MPI_setup(object):
@@ -43,10 +45,15 @@ class MPI_setup(object):
             options["process"] = 0
             options["processes"] = processes
             self.__set_logger_single(options)
+            options['cpu_affinity'] = af.get_allowed_cpus()
+            options['node_cpu_affinity'] = options['cpu_affinity']
         else:
             options["mpi"] = True
             self.__mpi_setup(options)
 
+        if options.get('trace', False):
+            trace.enable(options['log_path'], options['process'],
+                         mpi=options['mpi'])
         logging.debug(options)
 
     def __mpi_setup(self, options):
@@ -71,6 +78,7 @@ class MPI_setup(object):
         local_name = all_processes[rank]
 
         self.__set_logger_parallel("%03i" % node_number, local_name, options)
+        self.__set_affinity(options, hosts, rank, local_name)
 
         MPI.COMM_WORLD.barrier()
         logging.debug("Rank : %i - Size : %i - host : %s", rank, n_cores,
@@ -82,6 +90,18 @@ class MPI_setup(object):
         logging.debug("LD_LIBRARY_PATH is %s",  os.getenv('LD_LIBRARY_PATH'))
         self.call_mpi__barrier()
 
+    def __set_affinity(self, options, hosts, rank, local_name):
+        """ Place the processes on the cores of each node and log the layout.
+        """
+        cores, desc = af.setup_affinity(options, hosts, rank)
+        af.set_threads(len(cores))
+        layout = MPI.COMM_WORLD.gather(
+            (hosts[rank], rank, local_name, desc), root=0)
+        if layout:
+            for host, r, name, desc in sorted(layout):
+                logging.info("Process layout: %s rank %i (%s) - %s",
+                             host, r, name, desc)
+
     def call_mpi__barrier(self):
         """ Call MPI_barrier before an experiment is created.
         """
@@ -29,7 +29,12 @@ import logging
 import numpy as np
 
 import savu.core.utils as cu
+import savu.core.trace as trace
 import savu.plugins.utils as pu
+from savu.plugins.savers.utils.hdf5_utils import NexusWriter
+from savu.data.data_structures.data_types.replicate import Replicate
+from savu.data.data_structures.data_types.distributed_buffer import \
+    DistributedBuffer
 
 NX_CLASS = 'NX_class'
 
@@ -43,6 +48,7 @@ class BaseTransport(object):
     def __init__(self):
         self.pDict = None
         self.no_processing = False
+        self.nexus_writer = None
 
     def _transport_initialise(self, options):
         """
@@ -114,6 +120,25 @@ class BaseTransport(object):
         frames = [f for f in pDict['in_sl']['frames']]
         self._set_global_frame_index(plugin, frames, pDict['nProc'])
         self.pDict = pDict
+        self.__exchange_distributed_data()
+
+    def __exchange_distributed_data(self):
+        """ Send each process the regions of the in-memory distributed
+        datasets that it will read during this plugin. """
+        for idx in self.pDict['nIn']:
+            data = self.pDict['in_data'][idx].data
+            data = data.data if isinstance(data, Replicate) else data
+            if not isinstance(data, DistributedBuffer):
+                continue
+            regions = []
+            for sl in self.pDict['in_sl']['transfer'][idx]:
+                regions.append(tuple(
+                    slice(max(s.start, 0), min(s.stop, n)) if
+                    s.start is not None else s
+                    for s, n in zip(sl, data.get_shape())))
+            with trace.span('exchange', 'comm',
+                            dataset=self.pDict['in_data'][idx].get_name()):
+                data.exchange(regions)
 
     def _transport_process(self, plugin):
         """ Organise required data and execute the main plugin processing.
@@ -135,19 +160,23 @@ class BaseTransport(object):
             cu.user_message("%s - %3i%% complete" %
                             (plugin.name, percent_complete))
             # get the transfer data
-            transfer_data = self._transfer_all_data(count)
+            with trace.span('read', 'read', transfer=count):
+                transfer_data = self._transfer_all_data(count)
 
             # loop over the process data
-            for i in range(pDict['nProc']):
-                data = self._get_input_data(plugin, transfer_data, i, count)
-                res = self._get_output_data(
-                        plugin.plugin_process_frames(data), i)
-
-                for j in pDict['nOut']:
-                    out_sl = pDict['out_sl']['process'][i][j]
-                    result[j][out_sl] = res[j]
-
-            self._return_all_data(count, result, end)
+            with trace.span('process', 'process', transfer=count):
+                for i in range(pDict['nProc']):
+                    data = self._get_input_data(
+                        plugin, transfer_data, i, count)
+                    res = self._get_output_data(
+                            plugin.plugin_process_frames(data), i)
+
+                    for j in pDict['nOut']:
+                        out_sl = pDict['out_sl']['process'][i][j]
+                        result[j][out_sl] = res[j]
+
+            with trace.span('write', 'write', transfer=count):
+                self._return_all_data(count, result, end)
         cu.user_message("%s - 100%% complete" % (plugin.name))
 
     def _get_all_slice_lists(self, data_list, dtype):
@@ -387,59 +416,83 @@ class BaseTransport(object):
             return 'intermediate'
         return 'final_result'
 
-    def _populate_nexus_file(self, data):
-        filename = self.exp.meta_data.get('nxs_filename')
-
-        with h5py.File(filename, 'a') as nxs_file:
-            nxs_entry = nxs_file['entry']
-            name = data.data_info.get('name')
-            group_name = self.exp.meta_data.get(['group_name', name])
-            link_type = self.exp.meta_data.get(['link_type', name])
-
-            if link_type is 'final_result':
-                plugin_entry = \
-                    nxs_entry.create_group('final_result_' + data.get_name())
-                plugin_entry.attrs[NX_CLASS] = 'NXdata'
-            elif link_type is 'intermediate':
-                link = nxs_entry.require_group(link_type)
-                link.attrs[NX_CLASS] = 'NXcollection'
-                plugin_entry = link.create_group(group_name)
-                plugin_entry.attrs[NX_CLASS] = 'NXdata'
-            else:
-                raise Exception("The link type is not known")
-
-            self.__output_metadata(data, plugin_entry)
+    def _populate_nexus_file(self, data, link=None):
+        """ Add the axis labels, patterns and metadata of a dataset to the
+        nexus file.  The entry is copied and written by a background thread,
+        so no other process needs to wait for it.
 
-    def __output_metadata(self, data, entry):
-        self.__output_axis_labels(data, entry)
-        self.__output_data_patterns(data, entry)
-        self.__output_metadata_dict(data, entry)
+        :param Data data: The dataset.
+        :param tuple link: An optional external link to the dataset's backing
+            file (see :meth:`Hdf5Utils._get_nexus_link`).
+        """
+        if self.nexus_writer is None:
+            self.nexus_writer = \
+                NexusWriter(self.exp.meta_data.get('nxs_filename'))
+        entry = self.__get_nexus_entry(data)
+        self.nexus_writer.add(
+            lambda nxs_file: self.__write_nexus_entry(nxs_file, entry, link))
+
+    def _finalise_nexus_file(self):
+        """ Wait for all outstanding nexus file entries to be written. """
+        if self.nexus_writer is not None:
+            self.nexus_writer.close()
+            self.nexus_writer = None
+
+    def __get_nexus_entry(self, data):
+        """ Take a copy of everything required to populate the nexus file. """
+        name = data.get_name()
+        entry = {'name': name,
+                 'group_name': self.exp.meta_data.get(['group_name', name]),
+                 'link_type': self.exp.meta_data.get(['link_type', name]),
+                 'axes': [],
+                 'patterns': copy.deepcopy(data.data_info.get("data_patterns")),
+                 'meta_data': copy.deepcopy(data.meta_data.get_dictionary())}
 
-    def __output_axis_labels(self, data, entry):
         axis_labels = data.data_info.get("axis_labels")
-        axes = []
-        count = 0
-        for labels in axis_labels:
-            name = labels.keys()[0]
-            axes.append(name)
-            entry.attrs[name + '_indices'] = count
-
+        for count in range(len(axis_labels)):
+            label, units = axis_labels[count].items()[0]
             try:
-                mData = data.meta_data.get(name)
+                mData = data.meta_data.get(label)
             except KeyError:
                 mData = np.arange(data.get_shape()[count])
+            entry['axes'].append((label, units, np.array(mData)))
+        return entry
+
+    def __write_nexus_entry(self, nxs_file, entry, link):
+        nxs_entry = nxs_file['entry']
+        link_type = entry['link_type']
+
+        if link_type is 'final_result':
+            plugin_entry = \
+                nxs_entry.create_group('final_result_' + entry['name'])
+            plugin_entry.attrs[NX_CLASS] = 'NXdata'
+        elif link_type is 'intermediate':
+            link_group = nxs_entry.require_group(link_type)
+            link_group.attrs[NX_CLASS] = 'NXcollection'
+            plugin_entry = link_group.create_group(entry['group_name'])
+            plugin_entry.attrs[NX_CLASS] = 'NXdata'
+        else:
+            raise Exception("The link type is not known")
 
-            if isinstance(mData, list):
-                mData = np.array(mData)
+        self.__output_axis_labels(entry['axes'], plugin_entry)
+        self.__output_data_patterns(entry['patterns'], plugin_entry)
+        self.__output_metadata_dict(entry['meta_data'], plugin_entry)
+        if link:
+            self.hdf5._add_nexus_link(nxs_file, link)
 
+    def __output_axis_labels(self, axis_labels, entry):
+        axes = []
+        count = 0
+        for name, units, mData in axis_labels:
+            axes.append(name)
+            entry.attrs[name + '_indices'] = count
             axis_entry = entry.create_dataset(name, mData.shape, mData.dtype)
             axis_entry[...] = mData[...]
-            axis_entry.attrs['units'] = labels.values()[0]
+            axis_entry.attrs['units'] = units
             count += 1
         entry.attrs['axes'] = axes
 
-    def __output_data_patterns(self, data, entry):
-        data_patterns = data.data_info.get("data_patterns")
+    def __output_data_patterns(self, data_patterns, entry):
         entry = entry.create_group('patterns')
         entry.attrs[NX_CLASS] = 'NXcollection'
         for pattern in data_patterns:
@@ -449,8 +502,7 @@ class BaseTransport(object):
             nx_data.create_dataset('core_dims', data=values['core_dims'])
             nx_data.create_dataset('slice_dims', data=values['slice_dims'])
 
-    def __output_metadata_dict(self, data, entry):
-        meta_data = data.meta_data.get_dictionary()
+    def __output_metadata_dict(self, meta_data, entry):
         entry = entry.create_group('meta_data')
         entry.attrs[NX_CLASS] = 'NXcollection'
         for mData in meta_data:
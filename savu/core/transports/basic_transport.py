@@ -76,6 +76,9 @@ class BasicTransport(BaseTransport):
 
         self.count += 1
 
+    def _transport_post_plugin_list_run(self):
+        self.h5trans._finalise_nexus_file()
+
     def __set_hdf5_transport(self):
         self.hdf5_flag = True
         self.exp.meta_data.set('transport', 'hdf5')
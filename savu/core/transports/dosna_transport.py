@@ -109,6 +109,7 @@ class DosnaTransport(BaseTransport):
         plist = self.exp.meta_data.plugin_list
         self.n_plugins = plist._get_n_processing_plugins()
         self.final_dict = plist.plugin_list[-1]
+        self.files = []
         for plugin_index in range(self.n_plugins):
             self.exp._set_experiment_for_current_plugin(plugin_index)
             self.files.append(
@@ -117,6 +118,7 @@ class DosnaTransport(BaseTransport):
             self._setup_dosna_objects()  # creates the dosna objects
 
     def _transport_post_plugin_list_run(self):
+        self.h5trans._finalise_nexus_file()
         if not self.dosna_connection:
             return
         for dataset in self.dataset_cache:
@@ -22,8 +22,14 @@
 """
 
 import os
+import h5py
+import logging
+from mpi4py import MPI
 
+import savu.core.utils as cu
 from savu.plugins.savers.utils.hdf5_utils import Hdf5Utils
+from savu.data.data_structures.data_types.distributed_buffer import \
+    DistributedBuffer
 from savu.core.transports.base_transport import BaseTransport
 from savu.core.transport_setup import MPI_setup
 
@@ -58,6 +64,9 @@ class Hdf5Transport(BaseTransport):
         self.exp_coll = self.exp._get_experiment_collection()
         self.data_flow = self.exp.meta_data.plugin_list._get_dataset_flow()
         n_plugins = range(len(self.exp_coll['datasets']))
+        self.exp.meta_data.set('buffer_nbytes', 0)
+        self.buffer_charges = {}
+        self.files = []
 
         for i in n_plugins:
             self.exp._set_experiment_for_current_plugin(i)
@@ -66,20 +75,71 @@ class Hdf5Transport(BaseTransport):
             self._set_file_details(self.files[i])
             self._setup_h5_files()  # creates the hdf5 files
 
+    def __set_distributed_buffers(self, files):
+        """ Hold an intermediate dataset that is read by a later plugin with
+        a different pattern in memory, distributed between the processes, so
+        the data is reorganised with an all-to-all exchange rather than
+        through the file.  The share of the dataset held by each process, the
+        regions it receives and the exchange buffers must fit in the
+        remaining buffer budget of each process. """
+        if not self.exp.meta_data.get('mpi') or MPI.COMM_WORLD.size == 1:
+            return
+        patterns = self.exp.meta_data.get_dictionary().get(
+            'current_and_next', [])
+        for entry in patterns:
+            data = self.exp.index['out_data'].get(entry['name'], None)
+            if data is None or not entry['next'] or data.remove or \
+                    entry['next'].keys() == entry['current'].keys() or \
+                    files['link_type'][entry['name']] != 'intermediate' or \
+                    not isinstance(data.data, h5py.Dataset):
+                continue
+            share = -(-DistributedBuffer.get_nbytes(
+                data.data.shape, data.data.dtype)//MPI.COMM_WORLD.size)
+            max_bytes = min(DistributedBuffer.MAX_BYTES, share)
+            # the blocks, the received regions and the send and receive
+            # buffers of an exchange round
+            nbytes = 2*share + 2*max_bytes
+            if nbytes > cu.get_buffer_budget(self.exp.meta_data):
+                logging.debug("The %s dataset does not fit in memory and will "
+                              "be reorganised through the file", entry['name'])
+                continue
+            cu.charge_buffer(self.exp.meta_data, nbytes)
+            data.data = DistributedBuffer(data.data.shape, data.data.dtype,
+                                          backing=data.data,
+                                          max_bytes=max_bytes)
+            self.buffer_charges[data.data] = nbytes
+            cu.user_message("The %s dataset will be reorganised from %s to %s "
+                            "in memory" % (entry['name'],
+                                           entry['current'].keys()[0],
+                                           entry['next'].keys()[0]))
+
     def _transport_pre_plugin(self):
         count = self.exp.meta_data.get('nPlugin')
         self._set_file_details(self.files[count])
+        # decided before each plugin, so the memory of the distributed
+        # datasets that have been freed is available again
+        self.__set_distributed_buffers(self.files[count])
 
     def _transport_post_plugin(self):
+        # the nexus file is only written (in the background) by the last
+        # process and is not read during the run, so no barrier is required
         for data in self.exp.index['out_data'].values():
             if not data.remove:
-                self.exp._barrier()
+                if isinstance(data.data, DistributedBuffer):
+                    # intermediate datasets are kept, so write each block
+                    data.data.write_to(data.data.backing)
                 if self.exp.meta_data.get('process') == \
                         len(self.exp.meta_data.get('processes'))-1:
-                    self._populate_nexus_file(data)
-                    self.hdf5._link_datafile_to_nexus_file(data)
-                self.exp._barrier()
+                    self._populate_nexus_file(
+                        data, link=self.hdf5._get_nexus_link(data))
                 self.hdf5._reopen_file(data, 'r')  # reopen file as read-only
 
+    def _transport_post_plugin_list_run(self):
+        self._finalise_nexus_file()
+
     def _transport_terminate_dataset(self, data):
+        if isinstance(data.data, DistributedBuffer):
+            data.data.free()
+            cu.charge_buffer(self.exp.meta_data,
+                             -self.buffer_charges.pop(data.data, 0))
         self.hdf5._close_file(data)
@@ -115,6 +115,73 @@ def get_available_gpus():
     return pv, count
 
 
+def get_available_memory():
+    """ The memory available on this node in bytes, or None if unknown. """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1])*1024
+    except (IOError, ValueError, IndexError):
+        logging.debug("Unable to read the available memory")
+    return None
+
+
+def get_memory_budget(meta_data):
+    """ The memory budget per node in bytes, set by the 'memory_budget' option
+    (in MB) or otherwise half of the available memory.  The minimum over all
+    nodes is returned in MPI runs.
+    """
+    budget = meta_data.get_dictionary().get('memory_budget', None)
+    if budget is not None:
+        return int(float(budget)*2**20)
+    available = get_available_memory()
+    budget = available/2 if available else 0
+    if meta_data.get_dictionary().get('mpi', False):
+        budget = MPI.COMM_WORLD.allreduce(budget, op=MPI.MIN)
+    return budget
+
+
+def get_rank_memory_budget(meta_data):
+    """ The memory budget per process in bytes for the data transfers of a
+    plugin, set by the 'rank_memory' option (in MB) or otherwise the available
+    memory on the node divided by the number of processes on the node.  The
+    minimum over all processes is returned in MPI runs (this must be called by
+    all processes).
+    """
+    budget = meta_data.get_dictionary().get('rank_memory', None)
+    if budget is not None:
+        return int(float(budget)*2**20)
+    available = get_available_memory()
+    budget = available if available else 0
+    if meta_data.get_dictionary().get('mpi', False):
+        node_comm = MPI.COMM_WORLD.Split_type(MPI.COMM_TYPE_SHARED)
+        budget /= node_comm.size
+        node_comm.Free()
+        budget = MPI.COMM_WORLD.allreduce(budget, op=MPI.MIN)
+    return budget
+
+
+def get_buffer_budget(meta_data):
+    """ The memory budget per process in bytes for datasets that are held in
+    memory, which is the rank memory budget less the largest data transfers
+    of any plugin and the buffers that have already been charged
+    ('buffer_nbytes').
+    """
+    mData = meta_data.get_dictionary()
+    budget = mData.get('rank_memory_budget', None)
+    if not budget:
+        return 0
+    return max(budget - mData.get('transfer_nbytes', 0) -
+               mData.get('buffer_nbytes', 0), 0)
+
+
+def charge_buffer(meta_data, nbytes):
+    """ Charge a buffer of nbytes per process to the buffer budget. """
+    meta_data.set('buffer_nbytes',
+                  meta_data.get_dictionary().get('buffer_nbytes', 0) + nbytes)
+
+
 USER_LOG_LEVEL = 100
 USER_LOG_HANDLER = None
 
@@ -0,0 +1,188 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: distributed_buffer
+   :platform: Unix
+   :synopsis: A dataset held in memory and distributed between the \
+       processes, which is reorganised between plugins with an all-to-all \
+       exchange.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import numpy as np
+from mpi4py import MPI
+
+from savu.data.data_structures.data_types.base_type import BaseType
+
+
+class DistributedBuffer(BaseType):
+    """ An in-memory replacement for a backing dataset, where each process
+    holds the blocks it has written.  Before the data is read with a
+    different pattern, :meth:`exchange` sends each process the regions it
+    will read, with a blocked MPI all-to-all, instead of writing the blocks to
+    file and reading orthogonal slices back.
+
+    :param tuple shape: The shape of the dataset.
+    :param dtype: The data type.
+    :param backing: The backing dataset the blocks are written to by \
+        :meth:`write_to` (optional).
+    :param MPI.Comm comm: The communicator.
+    :param int max_bytes: The maximum number of bytes each process sends in \
+        each round of the exchange.
+    """
+
+    MAX_BYTES = 2**27
+
+    def __init__(self, shape, dtype, backing=None, comm=MPI.COMM_WORLD,
+                 max_bytes=MAX_BYTES):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.backing = backing
+        self.comm = comm
+        self.max_bytes = max_bytes
+        self.blocks = []  # (box, array) written by this process
+        self.regions = []  # (box, array) received by the last exchange
+
+    @staticmethod
+    def get_nbytes(shape, dtype):
+        return int(np.prod(shape))*np.dtype(dtype).itemsize
+
+    def get_shape(self):
+        return self.shape
+
+    def __getitem__(self, idx):
+        box, rel = self.__get_box(idx)
+        for region, data in self.regions + self.blocks[::-1]:
+            if all(r[0] <= b[0] and b[1] <= r[1] for b, r in zip(box, region)):
+                return np.array(data[self.__relative(box, region)][rel])
+        raise Exception("The region %s of the distributed dataset is not "
+                        "available on this process." % (box,))
+
+    def __setitem__(self, idx, value):
+        box, rel = self.__get_box(idx)
+        if any(isinstance(r, slice) and r.step != 1 for r in rel):
+            raise Exception("Strided writes to a distributed dataset are not "
+                            "supported.")
+        block = np.empty([b[1] - b[0] for b in box], dtype=self.dtype)
+        block[rel] = value
+        self.blocks.append((box, block))
+
+    def __get_box(self, idx):
+        """ The (start, stop) bounds of an index in each dimension and the
+        index relative to the bounds. """
+        idx = tuple(idx) if isinstance(idx, (list, tuple)) else (idx,)
+        if Ellipsis in idx:
+            i = idx.index(Ellipsis)
+            fill = (slice(None),)*(len(self.shape) - len(idx) + 1)
+            idx = idx[:i] + fill + idx[i+1:]
+        idx += (slice(None),)*(len(self.shape) - len(idx))
+
+        box, rel = [], []
+        for sl, n in zip(idx, self.shape):
+            if isinstance(sl, slice):
+                start, stop, step = sl.indices(n)
+                if step < 0:
+                    raise Exception("Negative steps are not supported.")
+                nvals = max(0, (stop - start + step - 1)/step)
+                box.append((start, start + max((nvals - 1)*step + 1, 0)))
+                rel.append(slice(0, box[-1][1] - start, step))
+            else:
+                sl = int(sl) % n
+                box.append((sl, sl + 1))
+                rel.append(0)
+        return tuple(box), tuple(rel)
+
+    def __relative(self, box, region):
+        return tuple(slice(b[0] - r[0], b[1] - r[0])
+                     for b, r in zip(box, region))
+
+    def __intersect(self, box1, box2):
+        box = tuple((max(a[0], b[0]), min(a[1], b[1]))
+                    for a, b in zip(box1, box2))
+        return box if all(b[1] > b[0] for b in box) else None
+
+    def exchange(self, regions):
+        """ Gather the regions this process will read from the blocks written
+        by all processes.  The blocks are sent in rounds of at most max_bytes
+        per process.  This must be called by all processes.
+
+        :param list regions: The (start, stop) bounds in each dimension of \
+            each region, or a list of slices.
+        """
+        regions = sorted(set(
+            self.__get_box(r)[0] if isinstance(r[0], slice) else
+            tuple(tuple(int(v) for v in b) for b in r) for r in regions))
+        all_regions = self.comm.allgather(regions)
+
+        # the pieces of the local blocks required by each process
+        send, info, nbytes = [], [], 0
+        for rank in range(self.comm.size):
+            send.append([])
+            info.append([])
+            for i, region in enumerate(all_regions[rank]):
+                for box, block in self.blocks:
+                    piece = self.__intersect(region, box)
+                    if piece:
+                        send[rank].append(block[self.__relative(piece, box)])
+                        info[rank].append((i, piece, nbytes/self.max_bytes))
+                        nbytes += send[rank][-1].nbytes
+        recv_info = self.comm.alltoall(info)
+        nRounds = self.comm.allreduce(
+            nbytes/self.max_bytes + 1 if nbytes else 0, op=MPI.MAX)
+
+        self.regions = [(r, np.zeros([b[1] - b[0] for b in r], self.dtype))
+                        for r in regions]
+        for rnd in range(nRounds):
+            self.__exchange_round(rnd, send, info, recv_info)
+
+    def __exchange_round(self, rnd, send, info, recv_info):
+        pieces = [[np.ascontiguousarray(p).view(np.uint8).ravel()
+                   for p, i in zip(send[rank], info[rank]) if i[2] == rnd]
+                  for rank in range(self.comm.size)]
+        scounts = [sum(p.size for p in rank_pieces) for rank_pieces in pieces]
+        flat = [p for rank_pieces in pieces for p in rank_pieces]
+        sendbuf = np.concatenate(flat) if flat else np.zeros(0, np.uint8)
+
+        itemsize = self.dtype.itemsize
+        recv = [[(i, piece) for i, piece, r in recv_info[rank] if r == rnd]
+                for rank in range(self.comm.size)]
+        rcounts = [sum(int(np.prod([b[1] - b[0] for b in piece]))*itemsize
+                       for i, piece in rank_recv) for rank_recv in recv]
+        recvbuf = np.empty(sum(rcounts), np.uint8)
+
+        self.comm.Alltoallv(
+            [sendbuf, (scounts, np.cumsum([0] + scounts[:-1])), MPI.BYTE],
+            [recvbuf, (rcounts, np.cumsum([0] + rcounts[:-1])), MPI.BYTE])
+
+        offset = 0
+        for rank_recv in recv:
+            for i, piece in rank_recv:
+                region, data = self.regions[i]
+                shape = [b[1] - b[0] for b in piece]
+                n = int(np.prod(shape))*itemsize
+                data[self.__relative(piece, region)] = \
+                    recvbuf[offset:offset+n].view(self.dtype).reshape(shape)
+                offset += n
+
+    def write_to(self, data):
+        """ Write the blocks held by this process to a backing dataset. """
+        for box, block in self.blocks:
+            data[tuple(slice(*b) for b in box)] = block
+
+    def free(self):
+        self.blocks = []
+        self.regions = []
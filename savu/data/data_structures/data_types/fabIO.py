@@ -25,17 +25,36 @@
 import numpy as np
 import fabio
 import os
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 from savu.data.data_structures.data_types.base_type import BaseType
 
 
 class FabIO(BaseType):
     """ This class loads any of the FabIO python module supported image
-    formats. """
+    formats.
 
-    def __init__(self, folder, Data, dim, shape=None, data_prefix=None):
+    Frames are decoded by a pool of ``nThreads`` threads, sequential reads
+    trigger a background prefetch of the next block of frames and recently
+    decoded frames are held in a small LRU cache of ``cache_size`` frames
+    (twice the largest request, up to a maximum of 1GB, if None), so
+    overlapping (padded) reads are not decoded twice.
+    """
+
+    max_cache_bytes = 2**30
+
+    def __init__(self, folder, Data, dim, shape=None, data_prefix=None,
+                 nThreads=1, cache_size=None):
         self._data_obj = Data
         self.nFrames = None
+        self.nThreads = nThreads
+        self.cache_size = cache_size
+        self._pool = None
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._last_read = None
+        self._limit = 0
         self.start_file = fabio.open(self.__get_file_name(folder, data_prefix))
         self.frame_dim = dim
         self.dtype = self.start_file.getframe(self.start_no).data[0, 0].dtype
@@ -63,16 +82,101 @@ class FabIO(BaseType):
             index[i] = slice(0, end, 1)
 
         index, frameidx = self.__get_indices(index, size)
+        frames = self.__get_frames(frameidx)
 
         for i in range(len(frameidx)):
-            image = self.start_file.getframe(
-                    self.start_no + frameidx[i]).data[tiff_slices]
+            image = frames[frameidx[i]][tuple(tiff_slices)]
             for d in self.frame_dim:
                 image = np.expand_dims(image, axis=d)
             data[index[i]] = image
 
         return data
 
+    def _read_frame(self, idx):
+        """ Decode a single (full) frame from file. """
+        return self.start_file.getframe(self.start_no + idx).data
+
+    def __get_frames(self, frameidx):
+        """ Get a dictionary of decoded frames for the frame indices, reusing
+        cached and prefetched frames and decoding the remainder in parallel.
+        """
+        required = np.unique(frameidx).tolist()
+        self.__set_cache_limit(len(required))
+
+        frames = {}
+        for idx in required:
+            frame = self.__get_cached_frame(idx)
+            if frame is not None:
+                frames[idx] = frame
+
+        missing = [idx for idx in required if idx not in frames]
+        pool = self.__get_pool(len(missing))
+        decoded = pool.map(self._read_frame, missing) if pool else \
+            [self._read_frame(idx) for idx in missing]
+        for idx, frame in zip(missing, decoded):
+            frames[idx] = frame
+            self.__cache_frame(idx, frame)
+
+        self.__prefetch(required)
+        return frames
+
+    def __get_pool(self, nJobs):
+        """ Create the decoding thread pool on first use.  Frames stored in a
+        single multi-frame file share a file handle and are read serially.
+        """
+        if self.nThreads <= 1 or nJobs < 1 or self.start_file.nframes > 1:
+            return None
+        if self._pool is None:
+            self._pool = ThreadPool(self.nThreads)
+        return self._pool
+
+    def __set_cache_limit(self, nRequired):
+        if self.cache_size is not None:
+            self._limit = self.cache_size
+            return
+        frame_bytes = np.prod(self.image_shape)*np.dtype(self.dtype).itemsize
+        limit = min(2*nRequired, int(self.max_cache_bytes/frame_bytes))
+        self._limit = max(limit, self._limit)
+
+    def __get_cached_frame(self, idx):
+        if idx in self._cache:
+            frame = self._cache.pop(idx)
+            self._cache[idx] = frame
+            return frame
+        if idx in self._pending:
+            frame = self._pending.pop(idx).get()
+            self.__cache_frame(idx, frame)
+            return frame
+        return None
+
+    def __cache_frame(self, idx, frame):
+        self._cache[idx] = frame
+        while len(self._cache) > self._limit:
+            self._cache.popitem(last=False)
+
+    def __prefetch(self, required):
+        """ If the frames follow on from the previous read, start decoding
+        the next block of frames in the background. """
+        if not required:
+            return
+        last, self._last_read = self._last_read, (required[0], required[-1])
+        if last is None:
+            return
+        step = required[0] - last[0]
+        if step <= 0 or required[0] > last[1] + 1:
+            self._pending = {}
+            return
+
+        pool = self.__get_pool(len(required))
+        if pool is None:
+            return
+        total = int(np.prod(self.shape))
+        start = required[0] + step
+        stop = min(start + len(required), total)
+        for idx in range(start, stop):
+            if idx not in self._cache and idx not in self._pending:
+                self._pending[idx] = pool.apply_async(self._read_frame, (idx,))
+
     def __get_file_name(self, folder, prefix):
         import re
         import glob
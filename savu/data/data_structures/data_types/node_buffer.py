@@ -0,0 +1,220 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: node_buffer
+   :platform: Unix
+   :synopsis: A dataset held in memory, with one copy per node shared by all \
+       processes on that node.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import numpy as np
+from mpi4py import MPI
+
+from savu.data.data_structures.data_types.base_type import BaseType
+
+
+def get_node_communicators(comm=MPI.COMM_WORLD):
+    """ Split a communicator into a communicator per node (shared memory) and
+    a communicator containing the first process on each node.
+
+    :returns: The node communicator and the node leaders communicator (None \
+        if this process is not a node leader).
+    :rtype: tuple(MPI.Comm)
+    """
+    node_comm = comm.Split_type(MPI.COMM_TYPE_SHARED)
+    colour = 0 if node_comm.rank == 0 else MPI.UNDEFINED
+    leader_comm = comm.Split(colour, comm.rank)
+    return node_comm, (leader_comm if leader_comm != MPI.COMM_NULL else None)
+
+
+class NodeBuffer(BaseType):
+    """ An in-memory replacement for a backing dataset.  The regions written
+    by each process are recorded and shared with the other nodes by
+    :meth:`synchronise`.
+
+    :param tuple shape: The shape of the dataset.
+    :param dtype: The data type.
+    :param tuple comms: The node and node leaders communicators (see \
+        :func:`get_node_communicators`).
+    :param int max_bytes: The maximum number of bytes gathered by each node \
+        in each round of the synchronisation.
+    """
+
+    MAX_BYTES = 2**27
+
+    def __init__(self, shape, dtype, comms, max_bytes=MAX_BYTES):
+        self.node_comm, self.leader_comm = comms
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.max_bytes = max_bytes
+        nbytes = self.get_nbytes(shape, dtype) if self.node_comm.rank == 0 \
+            else 0
+        self.win = MPI.Win.Allocate_shared(
+            nbytes, self.dtype.itemsize, comm=self.node_comm)
+        buf, itemsize = self.win.Shared_query(0)
+        self.data = np.ndarray(buffer=buf, dtype=self.dtype, shape=self.shape)
+        if self.node_comm.rank == 0:
+            self.data.fill(0)
+        self.node_comm.barrier()
+        self.written = []
+
+    @staticmethod
+    def get_nbytes(shape, dtype):
+        return int(np.prod(shape))*np.dtype(dtype).itemsize
+
+    @staticmethod
+    def get_sync_nbytes(max_bytes=MAX_BYTES):
+        """ The memory used on each node by the send and receive buffers of
+        :meth:`synchronise`. """
+        return 2*max_bytes
+
+    def __getitem__(self, idx):
+        return self.data[idx]
+
+    def __setitem__(self, idx, value):
+        idx = tuple(idx) if isinstance(idx, list) else idx
+        self.data[idx] = value
+        self.written.append(idx)
+
+    def get_shape(self):
+        return self.shape
+
+    def fill_from(self, data):
+        """ Copy a dataset into the buffer (the first process on each node
+        reads the data). """
+        if self.node_comm.rank == 0:
+            self.data[...] = data[tuple([slice(0, s) for s in self.shape])]
+        self.node_comm.barrier()
+
+    def synchronise(self):
+        """ Update the buffer on each node with the regions written on all
+        other nodes since the last synchronisation.  The regions are split
+        into pieces of at most max_bytes and gathered in rounds of at most
+        max_bytes in total.  This must be called by all processes. """
+        self.node_comm.barrier()
+        written = self.node_comm.gather(self.written, root=0)
+        self.written = []
+        if self.leader_comm is not None and self.leader_comm.size > 1:
+            boxes = [p for w in written for idx in w for p in
+                     self.__split(self.__get_box(idx))]
+            all_boxes = self.leader_comm.allgather(boxes)
+            rounds = self.__get_rounds(all_boxes)
+            nbytes = max(sum(self.__nbytes(b) for r, b in rnd)
+                         for rnd in rounds) if rounds else 0
+            sendbuf = np.empty(nbytes, np.uint8)
+            recvbuf = np.empty(nbytes, np.uint8)
+            for rnd in rounds:
+                self.__gather_round(rnd, sendbuf, recvbuf)
+        self.node_comm.barrier()
+
+    def __get_box(self, idx):
+        """ The (start, stop, step) of an index in each dimension. """
+        idx = idx if isinstance(idx, tuple) else (idx,)
+        idx += (slice(None),)*(len(self.shape) - len(idx))
+        box = []
+        for sl, n in zip(idx, self.shape):
+            if isinstance(sl, slice):
+                box.append(sl.indices(n))
+            elif isinstance(sl, (int, long, np.integer)):
+                sl = int(sl) % n
+                box.append((sl, sl + 1, 1))
+            else:
+                raise Exception("Unsupported index %s of an in-memory "
+                                "dataset." % (sl,))
+        return tuple(box)
+
+    def __nbytes(self, box):
+        return int(np.prod([len(xrange(*b)) for b in box])) * \
+            self.dtype.itemsize
+
+    def __split(self, box):
+        """ Split a region into pieces of at most max_bytes (or single
+        values). """
+        nbytes = self.__nbytes(box)
+        if nbytes <= self.max_bytes:
+            return [box] if nbytes else []
+        for dim, (start, stop, step) in enumerate(box):
+            n = len(xrange(start, stop, step))
+            if n > 1:
+                chunk = max(n*self.max_bytes/nbytes, 1)
+                pieces = []
+                for i in range(0, n, chunk):
+                    sub = list(box)
+                    sub[dim] = (start + i*step,
+                                start + min(i + chunk, n)*step, step)
+                    pieces += self.__split(tuple(sub))
+                return pieces
+        return [box]
+
+    def __get_rounds(self, all_boxes):
+        """ Assign the pieces of all nodes, in order, to rounds of at most
+        max_bytes in total. """
+        rounds, nbytes = [], 0
+        for rank, boxes in enumerate(all_boxes):
+            for box in boxes:
+                n = self.__nbytes(box)
+                if not rounds or nbytes + n > self.max_bytes:
+                    rounds.append([])
+                    nbytes = 0
+                rounds[-1].append((rank, box))
+                nbytes += n
+        return rounds
+
+    def __gather_round(self, rnd, sendbuf, recvbuf):
+        """ Gather the pieces of one round from all nodes with a buffer-based
+        Allgatherv and copy those of the other nodes into the buffer. """
+        me = self.leader_comm.rank
+        counts = [0]*self.leader_comm.size
+        offset = 0
+        for rank, box in rnd:
+            n = self.__nbytes(box)
+            if rank == me:
+                sendbuf[offset:offset+n] = np.ascontiguousarray(
+                    self.data[self.__slices(box)]).view(np.uint8).ravel()
+                offset += n
+            counts[rank] += n
+        displs = np.cumsum([0] + counts[:-1]).tolist()
+        self.leader_comm.Allgatherv(
+            [sendbuf[:counts[me]], counts[me], MPI.BYTE],
+            [recvbuf, (counts, displs), MPI.BYTE])
+
+        offset = 0
+        for rank, box in rnd:
+            n = self.__nbytes(box)
+            if rank != me:
+                sl = self.__slices(box)
+                self.data[sl] = recvbuf[offset:offset+n].view(
+                    self.dtype).reshape(self.data[sl].shape)
+            offset += n
+
+    def __slices(self, box):
+        return tuple(slice(*b) for b in box)
+
+    def write_to(self, data, comm=MPI.COMM_WORLD):
+        """ Write the buffer to a backing dataset, with each process writing
+        an equal share along the first dimension. """
+        n = self.shape[0]
+        start = n*comm.rank/comm.size
+        stop = n*(comm.rank+1)/comm.size
+        if stop > start:
+            data[start:stop] = self.data[start:stop]
+
+    def free(self):
+        self.node_comm.barrier()
+        self.data = None
+        self.win.Free()
@@ -0,0 +1,150 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: streaming_data
+   :platform: Unix
+   :synopsis: A hdf5 dataset that is still being written, read from a file \
+       opened in SWMR mode.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import time
+import weakref
+import logging
+import numpy as np
+
+import savu.core.trace as trace
+from savu.data.data_structures.data_types.base_type import BaseType
+
+# hdf5 fails to read a dataset in a SWMR file (can't insert duplicate key)
+# when it is refreshed while another handle to it is open, so all instances
+# share one handle to each dataset
+_datasets = weakref.WeakValueDictionary()
+
+
+class StreamingData(BaseType):
+    """ A hdf5 dataset that grows along one dimension while it is processed.
+    The dataset has its final shape, and a read waits until the frames it
+    requires have been written, so plugins reading the data in the order it
+    is acquired process each transfer as soon as it arrives.  The writer
+    grows the dataset before writing each frame, so the newest frame is only
+    read once the dataset has grown past it, or once the dataset has had its
+    final shape for a poll interval.  A failed read is retried after
+    refreshing the dataset.
+
+    :param h5py.Dataset data: The growing dataset, in a file opened in SWMR \
+        mode.
+    :param tuple shape: The final shape of the dataset.
+    :param int dim: The growing dimension.
+    :param float poll: The time (s) between checks for new frames.
+    :param float timeout: The time (s) without new frames before a read \
+        fails.
+    :param int retries: The number of times a failed read is retried.
+    """
+
+    def __init__(self, data, shape, dim=0, poll=1.0, timeout=600.0,
+                 retries=3):
+        self.data = self.__get_shared_dataset(data)
+        self.shape = tuple(shape)
+        self.dim = dim
+        self.poll = poll
+        self.timeout = timeout
+        self.retries = retries
+        self.final_shape_time = None
+
+    def __get_shared_dataset(self, data):
+        """ The handle to this dataset that is shared by all instances (the
+        handle passed in is closed when the caller releases it). """
+        key = (os.path.abspath(data.file.filename), data.name)
+        shared = _datasets.get(key, None)
+        if shared is None or not shared.id.valid:
+            _datasets[key] = shared = data
+        return shared
+
+    def __getattr__(self, name):
+        # the dtype, chunks etc. of the hdf5 dataset
+        if name.startswith('__') or 'data' not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.data, name)
+
+    def get_shape(self):
+        return self.shape
+
+    def get_nframes(self):
+        """ The number of frames that have been written and flushed. """
+        self.data.refresh()
+        nframes = self.data.shape[self.dim]
+        if nframes < self.shape[self.dim]:
+            return max(nframes - 1, 0)
+        if self.final_shape_time is None:
+            self.final_shape_time = time.time()
+        if time.time() - self.final_shape_time < self.poll:
+            return nframes - 1
+        return nframes
+
+    def is_complete(self):
+        return self.get_nframes() >= self.shape[self.dim]
+
+    def __getitem__(self, idx):
+        self.wait(self.__get_last_frame(idx) + 1)
+        for attempt in range(self.retries + 1):
+            try:
+                return self.data[idx]
+            except IOError as e:
+                if attempt == self.retries:
+                    raise
+                logging.warn("Failed to read the streamed data (%s), "
+                             "retrying", e)
+                time.sleep(self.poll)
+                self.data.refresh()
+
+    def wait(self, nFrames):
+        """ Wait until at least nFrames frames have been written. """
+        current = self.get_nframes()
+        if current >= nFrames:
+            return
+        logging.debug("Waiting for frame %i of the streamed data (%i "
+                      "written)", nFrames, current)
+        last_change = time.time()
+        with trace.span('stream_wait', 'barrier', frames=nFrames):
+            while current < nFrames:
+                if time.time() - last_change > self.timeout:
+                    raise Exception(
+                        "The streamed data has not grown for %s seconds: %i "
+                        "of %i frames were written." %
+                        (self.timeout, current, self.shape[self.dim]))
+                time.sleep(self.poll)
+                nframes = self.get_nframes()
+                if nframes > current:
+                    current, last_change = nframes, time.time()
+
+    def __get_last_frame(self, idx):
+        """ The last frame in the growing dimension read by an index. """
+        idx = idx if isinstance(idx, tuple) else (idx,)
+        if len(idx) <= self.dim or \
+                any(i is Ellipsis for i in idx[:self.dim + 1]):
+            return self.shape[self.dim] - 1
+        sl = idx[self.dim]
+        if isinstance(sl, slice):
+            start, stop, step = sl.indices(self.shape[self.dim])
+            if not len(xrange(start, stop, step)):
+                return -1
+            return start if step < 0 else start + (stop - start - 1)/step*step
+        if isinstance(sl, (list, tuple, np.ndarray)):
+            return int(np.max(sl)) if len(sl) else -1
+        return int(sl) % self.shape[self.dim]
@@ -369,6 +369,47 @@ class PluginData(object):
             for key in self.pad_dict.keys():
                 getattr(self.padding, key)(self.pad_dict[key])
 
+    def _get_padding_amounts(self):
+        """ The total padding (before plus after) in each padded dimension. """
+        if not self.padding:
+            return {}
+        if isinstance(self.padding, Padding):
+            return dict((dim, sum(pad.values())) for dim, pad in
+                        self.padding._get_padding_directions().iteritems())
+
+        pattern = self.get_pattern().values()[0]
+        amounts = {}
+        for key, value in self.padding.iteritems():
+            if key == 'pad_multi_frames':
+                entries = ['%i.%i' % (pattern['slice_dims'][0], value)]
+            elif key == 'pad_frame_edges':
+                entries = ['%i.%i' % (d, value) for d in pattern['core_dims']]
+            elif key == 'pad_directions':
+                entries = value
+            else:
+                continue
+            for entry in entries:
+                vals = entry.split('.')
+                dim = int(vals[0])
+                amounts[dim] = amounts.get(dim, 0) + \
+                    int(vals[-1])*(2 if len(vals) == 2 else 1)
+        return amounts
+
+    def _get_transfer_nbytes(self, nFrames):
+        """ Estimate the memory (in bytes) used by a transfer of nFrames
+        frames, including any padding known at the time of the call.  The
+        data is assumed to be held as (at least) float32, as the plugin result
+        buffers are.
+        """
+        shape = self._get_shape_before_tuning()
+        pad = self._get_padding_amounts()
+        core = self.data_obj.get_core_dimensions()
+        sdir = self.data_obj.get_slice_dimensions()[0]
+        frame = np.prod([shape[d] + pad.get(d, 0) for d in core])
+        dtype = self.data_obj.dtype
+        itemsize = max(np.dtype(dtype).itemsize if dtype is not None else 4, 4)
+        return int(frame*(nFrames + pad.get(sdir, 0))*itemsize)
+
     def plugin_data_setup(self, pattern, nFrames, split=None):
         """ Setup the PluginData object.
 
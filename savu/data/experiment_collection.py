@@ -22,10 +22,12 @@
 """
 
 import os
+import time
 import logging
 import copy
 from mpi4py import MPI
 
+import savu.core.trace as trace
 import savu.plugins.utils as pu
 from savu.data.plugin_list import PluginList
 from savu.data.data_structures.data import Data
@@ -93,7 +95,8 @@ class Experiment(object):
 
         # load the saver plugin and save the plugin list
         self.experiment_collection = {'plugin_dict': [],
-                                      'datasets': []}
+                                      'datasets': [],
+                                      'transfer_nbytes': []}
 
         self._barrier()
         if self.meta_data.get('process') == \
@@ -103,6 +106,7 @@ class Experiment(object):
 
         n_plugins = plugin_list._get_n_processing_plugins()
         count = 0
+        self.meta_data.set('transfer_nbytes', 0)
         # first run through of the plugin setup methods
         for plugin_dict in plist[n_loaders:n_loaders+n_plugins]:
             data = self.__plugin_setup(plugin_dict, count)
@@ -130,6 +134,13 @@ class Experiment(object):
         # Run main_setup method
         plugin = pu.plugin_loader(self, plugin_dict)
         plugin._revert_preview(plugin.get_in_datasets())
+        # the largest data transfers of any plugin, which are charged against
+        # the memory budget of each process
+        nbytes = plugin._get_transfer_nbytes()
+        self.meta_data.set('transfer_nbytes', max(
+            self.meta_data.get('transfer_nbytes'), nbytes))
+        self.experiment_collection['transfer_nbytes'].append(
+            (plugin.name, nbytes, plugin._get_transfer_nbytes(minimum=True)))
         # Populate the metadata
         plugin._clean_up()
         data = self.index['out_data'].copy()
@@ -157,7 +168,8 @@ class Experiment(object):
             current_pattern = current_data['pattern']
             next_pattern = self.__find_next_pattern(datasets_lists[1:],
                                                     current_name)
-            patterns_list.append({'current': current_pattern,
+            patterns_list.append({'name': current_name,
+                                  'current': current_pattern,
                                   'next': next_pattern})
         self.meta_data.set('current_and_next', patterns_list)
 
@@ -246,9 +258,27 @@ class Experiment(object):
         comm_dict = {'comm': communicator}
         if self.meta_data.get('mpi') is True:
             logging.debug("About to hit a _barrier %s", comm_dict)
-            comm_dict['comm'].barrier()
+            with trace.span('barrier', 'barrier'):
+                comm_dict['comm'].barrier()
             logging.debug("Past the _barrier")
 
+    def _idle_barrier(self, communicator=MPI.COMM_WORLD, max_sleep=0.05):
+        """ A barrier for processes that may wait for a long time.  A
+        non-blocking barrier is tested with increasing sleeps (up to max_sleep
+        seconds) in between, so that waiting processes do not busy-poll cores
+        needed by other processes.  It must be called by all processes in the
+        communicator.
+        """
+        if self.meta_data.get('mpi') is True:
+            logging.debug("About to hit an idle _barrier")
+            with trace.span('idle_barrier', 'barrier'):
+                request = communicator.Ibarrier()
+                sleep = 1e-4
+                while not request.Test():
+                    time.sleep(sleep)
+                    sleep = min(2*sleep, max_sleep)
+            logging.debug("Past the idle _barrier")
+
     def log(self, log_tag, log_level=logging.DEBUG):
         """
         Log the contents of the experiment at the specified level
@@ -34,6 +34,7 @@ import numpy as np
 from collections import defaultdict
 
 import savu.plugins.utils as pu
+import savu.plugins.plugin_index as pi
 from savu.data.meta_data import MetaData
 import savu.data.framework_citations as fc
 import savu.plugins.loaders.utils.yaml_utils as yu
@@ -180,6 +181,9 @@ class PluginList(object):
             count += 1
 
     def _get_docstring_info(self, plugin):
+        params = pi.get_indexed_parameters(pu.plugins[plugin])
+        if params:
+            return params['docstring_info']
         plugin_inst = pu.plugins[plugin]()
         plugin_inst._populate_default_parameters()
         return plugin_inst.docstring_info
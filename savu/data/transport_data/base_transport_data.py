@@ -142,12 +142,38 @@ class BaseTransportData(object):
 
     def __get_boundaries(self, nFrames):
         min_mft, max_mft, frame_threshold = self._set_boundaries()
+        budget_mft = self._get_memory_limited_frames()
+        if budget_mft is not None and budget_mft < max_mft:
+            logging.debug("Limiting the frames per transfer to %s to fit in "
+                          "the memory budget.", budget_mft)
+            max_mft = budget_mft
+            min_mft = min(min_mft, max_mft)
         if isinstance(nFrames, int) and nFrames > max_mft:
             logging.warn("The requested %s frames excedes the maximum "
                          "preferred of %s." % (nFrames, max_mft))
             max_mft = nFrames
         return min_mft, max_mft, frame_threshold
 
+    def _get_memory_limited_frames(self):
+        """ The largest number of frames per transfer that keeps the transfers
+        of all the plugin datasets within the memory budget of each process,
+        with the budget shared equally between the datasets (None if there is
+        no budget).
+        """
+        budget = self.data.exp.meta_data.get_dictionary().get(
+            'rank_memory_budget', None)
+        if not budget:
+            return None
+        pData = self.data._get_plugin_data()
+        nDatasets = 1
+        if pData._plugin is not None:
+            nDatasets = max(sum(len(d) for d in
+                                pData._plugin.get_plugin_datasets()), 1)
+        # bytes of the padding frames and of each additional frame
+        pad_bytes = pData._get_transfer_nbytes(0)
+        frame_bytes = max(pData._get_transfer_nbytes(1) - pad_bytes, 1)
+        return max(int((budget/nDatasets - pad_bytes)/frame_bytes), 1)
+
     def _get_slice_dir_index(self, dim, boolean=False):
         starts, stops, steps, chunks = \
             self.data.get_preview().get_starts_stops_steps()
@@ -21,7 +21,53 @@
 
 """
 
+import zlib
+import h5py
 import numpy as np
+from mpi4py import MPI
+
+
+def _fill_padding(data, pad_list, mode):
+    """ Fill the padding of an array in place from its interior, matching
+    np.pad (the dimensions are padded in order).  Modes and pad widths that
+    are not handled here fall back to np.pad. """
+    interior = tuple(slice(p[0], n - p[1]) for n, p in zip(data.shape,
+                                                            pad_list))
+    sizes = [n - sum(p) for n, p in zip(data.shape, pad_list)]
+    if mode not in ['edge', 'reflect', 'symmetric', 'wrap', 'constant'] or \
+            (mode != 'edge' and any(max(p) > n - (mode == 'reflect') for
+                                    n, p in zip(sizes, pad_list) if sum(p))):
+        data[...] = np.pad(data[interior], pad_list, mode=mode)
+        return
+
+    for dim, (before, after) in enumerate(pad_list):
+        if not before and not after:
+            continue
+        # padded in the previous dimensions only
+        sl = list(interior[dim+1:])
+        start, stop = before, data.shape[dim] - after
+
+        def region(a, b, step=1):
+            return tuple([slice(None)]*dim + [slice(a, b, step)] + sl)
+
+        if mode == 'constant':
+            data[region(0, start)] = 0
+            data[region(stop, None)] = 0
+        elif mode == 'edge':
+            data[region(0, start)] = data[region(start, start+1)]
+            data[region(stop, None)] = data[region(stop-1, stop)]
+        elif mode == 'wrap':
+            data[region(0, start)] = data[region(stop-before, stop)]
+            data[region(stop, None)] = data[region(start, start+after)]
+        else:
+            shift = 1 if mode == 'reflect' else 0
+            if before:
+                data[region(0, start)] = data[region(
+                    start+before-1+shift, start-1+shift, -1)]
+            if after:
+                data[region(stop, None)] = data[region(
+                    stop-1-shift, stop-1-shift-after if
+                    stop-1-shift-after >= 0 else None, -1)]
 
 
 class SliceLists(object):
@@ -375,6 +421,7 @@ class GlobalData(object):
         self.data = transport.data
         self.pData = self.data._get_plugin_data()
         self.shape = self.data.get_shape()
+        self.halo = None
 
     def _get_dict(self):
         return self._get_dict_in() if self.dtype == 'in' else \
@@ -394,9 +441,24 @@ class GlobalData(object):
         if self.trans.pad:
             sl = self.trans._pad_slice_list(
                 sl, "-value['before']", "value['after']")
+            self.halo = self.__get_halo(sl)
         sl_dict['transfer'] = sl
         return sl_dict
 
+    def __get_halo(self, sl):
+        """ Share the overlapping frames of consecutive padded transfers,
+        when the data is read from file with padding in the first slice
+        dimension. """
+        sdir = self.data.get_slice_dimensions()[0]
+        pad = self.pData.padding._get_padding_directions().get(sdir, None)
+        if not pad or not isinstance(self.data.data, h5py.Dataset):
+            return None
+        shape = self.data.data.shape
+        exp = self.data.exp
+        mpi = exp.meta_data.get('mpi') is True
+        return TransferHalo(sdir, pad['before'], pad['after'], sl, shape,
+                            self.data.data.dtype, self.data.get_name(), mpi)
+
     def _get_dict_out(self):
         sl_dict = {}
         sl, _ = self._get_slice_list(self.shape)
@@ -453,10 +515,151 @@ class GlobalData(object):
                 slice_list[dim] = \
                     slice(slice_list[dim].start, sl.stop - diff, sl.step)
 
-        data = self.data.data[tuple(slice_list)]
-
+        mode = pData.padding.mode if pData.padding else 'edge'
+        if not self.trans.pad or not hasattr(self.data.data, 'dtype') or \
+                any(sl.step not in (None, 1) for sl in slice_list):
+            data = self.data.data[tuple(slice_list)]
+            if np.sum(pad_list):
+                return np.pad(data, tuple(pad_list), mode=mode)
+            return data
+
+        # read the data directly into a buffer with room for the padding
+        box = tuple((sl.start, sl.stop) for sl in slice_list)
+        padded = np.empty([b[1] - b[0] + sum(p) for b, p in
+                           zip(box, pad_list)], dtype=self.data.data.dtype)
+        origin = [b[0] - p[0] for b, p in zip(box, pad_list)]
+        if self.halo:
+            self.halo._read(box, padded, origin, self.__read)
+        else:
+            self.__read(box, padded, origin)
         if np.sum(pad_list):
-            mode = pData.padding.mode if pData.padding else 'edge'
-            temp = np.pad(data, tuple(pad_list), mode=mode)
-            return temp
-        return data
+            _fill_padding(padded, pad_list, mode)
+        return padded
+
+    def __read(self, box, out, origin):
+        """ Read a region of the data into the buffer out, whose first element
+        is at position origin in the data. """
+        dest = tuple(slice(b[0] - o, b[1] - o) for b, o in zip(box, origin))
+        source = tuple(slice(*b) for b in box)
+        if any(b[1] <= b[0] for b in box):
+            return
+        if isinstance(self.data.data, h5py.Dataset):
+            self.data.data.read_direct(out, source_sel=source, dest_sel=dest)
+        else:
+            out[dest] = self.data.data[source]
+
+
+class TransferHalo(object):
+    """ Supplies the frames that overlap between the consecutive padded
+    transfers of a dataset along the first slice dimension, so that each
+    frame is read from file only once.  The overlap with the previous transfer
+    of this process is kept from that transfer, and the overlap of the last
+    transfer with the first transfer of another process is sent by that
+    process over MPI.
+
+    :param int dim: The padded slice dimension.
+    :param int before: The padding before each transfer.
+    :param int after: The padding after each transfer.
+    :param list transfers: The padded transfer slice lists of this process.
+    :param tuple shape: The shape of the data.
+    :param dtype: The data type.
+    :param str name: The name of the dataset.
+    :param bool mpi: Exchange the overlap with the other processes.
+    """
+
+    def __init__(self, dim, before, after, transfers, shape, dtype, name,
+                 mpi):
+        self.dim = dim
+        self.overlap = before + after
+        self.dtype = np.dtype(dtype)
+        self.boxes = [tuple((max(s.start, 0), min(s.stop, n)) for s, n in
+                            zip(sl, shape)) for sl in transfers]
+        self.cache = None  # (box, array) of the end of the previous transfer
+        self.send = []  # (rank, box) of the regions to send to other ranks
+        self.recv = None  # (box, request, array) of the region to receive
+        self.requests = []
+        if mpi:
+            own_stop = transfers[-1][dim].stop - after if transfers else None
+            self.__setup_exchange(own_stop, zlib.crc32(name) & 0x7fff)
+
+    def __setup_exchange(self, own_stop, tag):
+        """ Find the process whose first transfer contains the padding at
+        the end of the last transfer of each process. """
+        comm = MPI.COMM_WORLD
+        halo = None
+        if self.boxes:
+            last = list(self.boxes[-1])
+            if own_stop < last[self.dim][1]:
+                last[self.dim] = (own_stop, last[self.dim][1])
+                halo = tuple(last)
+        info = comm.allgather((self.boxes[0] if self.boxes else None, halo))
+        for rank, (_, rank_halo) in enumerate(info):
+            if rank_halo is None:
+                continue
+            source = [r for r in range(comm.size) if r != rank and info[r][0]
+                      and self.__contains(info[r][0], rank_halo)]
+            if source and source[0] == comm.rank:
+                self.send.append((rank, rank_halo))
+            elif source and rank == comm.rank:
+                buf = np.empty([b[1] - b[0] for b in halo], self.dtype)
+                self.recv = (halo, comm.Irecv(buf.view(np.uint8).ravel(),
+                                              source=source[0], tag=tag), buf)
+        self.tag = tag
+
+    def __contains(self, box, region):
+        return all(b[0] <= r[0] and r[1] <= b[1] for b, r in zip(box, region))
+
+    def __same_frames(self, box, region):
+        return all(b == r for i, (b, r) in enumerate(zip(box, region))
+                   if i != self.dim)
+
+    def _read(self, box, out, origin, read):
+        """ Fill the region box of the buffer out, whose first element is at
+        position origin in the data, using read(box, out, origin) for the
+        frames that are not already available. """
+        d = self.dim
+        start, stop = box[d]
+
+        def sub(a, b):
+            return tuple((a, b) if i == d else r for i, r in enumerate(box))
+
+        def dest(a, b):
+            return tuple(slice(r[0] - o, r[1] - o) for r, o in
+                         zip(sub(a, b), origin))
+
+        if self.cache and self.__same_frames(self.cache[0], box) and \
+                self.cache[0][d][0] <= start < self.cache[0][d][1]:
+            cstart, cstop = self.cache[0][d]
+            n = min(cstop, stop) - start
+            sl = [slice(None)]*len(box)
+            sl[d] = slice(start - cstart, start - cstart + n)
+            out[dest(start, start + n)] = self.cache[1][tuple(sl)]
+            start += n
+
+        is_last = self.boxes and box == self.boxes[-1]
+        recv_start = stop
+        if is_last and self.recv and self.__same_frames(self.recv[0], box) \
+                and self.recv[0][d][1] == stop and \
+                self.recv[0][d][0] >= start:
+            recv_start = self.recv[0][d][0]
+        read(sub(start, recv_start), out, origin)
+        if recv_start < stop:
+            self.recv[1].Wait()
+            out[dest(recv_start, stop)] = self.recv[2]
+            self.recv = None
+
+        if self.boxes and box == self.boxes[0]:
+            for rank, region in self.send:
+                sl = [slice(r[0] - o, r[1] - o) for r, o in
+                      zip(region, origin)]
+                buf = np.ascontiguousarray(out[tuple(sl)])
+                self.requests.append(MPI.COMM_WORLD.Isend(
+                    buf.view(np.uint8).ravel(), dest=rank, tag=self.tag))
+            self.send = []
+
+        n = min(self.overlap, box[d][1] - box[d][0])
+        sl = list(dest(box[d][1] - n, box[d][1]))
+        self.cache = (sub(box[d][1] - n, box[d][1]), out[tuple(sl)].copy())
+        if is_last:
+            MPI.Request.Waitall(self.requests)
+            self.requests = []
@@ -24,8 +24,11 @@
 
 import logging
 import numpy as np
-from skimage.feature import match_template, match_descriptors, ORB
+from mpi4py import MPI
+from skimage.feature import match_descriptors, ORB
 from scipy.linalg import lstsq
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import lsqr
 from skimage.transform import AffineTransform
 from skimage.measure import ransac
 
@@ -46,7 +49,8 @@ class ProjectionShift(BaseFilter, CpuPlugin):
     robust ransac matching to calculate the translation between different\
     combinations of 10 consecutive projection images. A least squares solution\
     to the shift values between images is calculated and returned for the\
-    middle 8 images.
+    middle 8 images.  The shifts between all combinations of images are then\
+    solved together for the shift of each image.
 
     :param method: Method used to calculate the shift between images. Choose \
         from 'template_matching' and 'orb_ransac'. Default: 'orb_ransac'.
@@ -64,7 +68,7 @@ class ProjectionShift(BaseFilter, CpuPlugin):
     def __init__(self):
         logging.debug("initialising Sinogram Alignment")
         super(ProjectionShift, self).__init__("ProjectionShift")
-        self.template = None
+        self.template_params = None
         self.threshold = 0
 
     def pre_process(self):
@@ -73,17 +77,20 @@ class ProjectionShift(BaseFilter, CpuPlugin):
             for p in self.parameters['template']:
                 start, end = p.split(':')
                 self.template_params.append(slice(int(start), int(end)))
-            self._calculate_shift = self._template_matching_shift
+            self._calculate_shifts = self._template_matching_shifts
         elif self.parameters['method'] == 'orb_ransac':
-            self._calculate_shift = self._orb_ransac_shift
+            self._calculate_shifts = self._orb_ransac_shifts
 
         if self.parameters['threshold']:
             self.threshold = self.parameters['threshold']
 
-        self.sl = [slice(None)]*3
-        self.sl2 = [slice(None)]*3
-        self.slice_dir = self.get_plugin_in_datasets()[0].get_slice_dimension()
+        in_pData = self.get_plugin_in_datasets()[0]
+        self.slice_dir = in_pData.get_slice_dimension()
+        self.data_slice_dim = \
+            self.get_in_datasets()[0].get_slice_dimensions()[0]
+        self.nFrames = in_pData.get_total_frames()
         self.A = self._calculate_frame_matrix()
+        self.equations = []
 
     def _calculate_frame_matrix(self):
         n_unknowns = self.get_max_frames() + 2  # 2 padded frames
@@ -96,55 +103,35 @@ class ProjectionShift(BaseFilter, CpuPlugin):
         return A
 
     def process_frames(self, data):
-        data, nFrames, output, shift_array = self._initial_setup(data)
-        return self._sub_pixel_shift_adjustment(data)
+        frames = self._initial_setup(data)
+        return self._sub_pixel_shift_adjustment(frames)
 
     def _initial_setup(self, data):
-        data = data[0]
-        shape = list(data.shape)
-        nFrames = data.shape[self.slice_dir]-2
-        shape[self.slice_dir] += -2
-        output = np.zeros(tuple(shape))
-        shift_array = np.zeros((nFrames, 2))
-        return data, nFrames, output, shift_array
-
-    def _get_shift(self, data, frame1, frame2):
-        self.sl[self.slice_dir] = frame1
-        self.sl2[self.slice_dir] = frame2
-
-        d1 = data[self.sl]
-        d2 = data[self.sl2]
-        if self.template:
-            self.template = data[self.sl][self.template_params]
-
+        """ Get the list of (thresholded) frames in the block. """
+        frames = np.rollaxis(data[0], self.slice_dir).astype(np.float64)
         if self.threshold:
-            d1[d1 > self.threshold[0]] = self.threshold[1]
-            d2[d2 > self.threshold[0]] = self.threshold[1]
-            if self.template:
-                self.template[self.template > self.threshold[0]] = \
-                    self.threshold[1]
-        return self._calculate_shift(d1, d2, self.template)
-
-    def _orb_ransac_shift(self, im1, im2, template):
-        descriptor_extractor = ORB() #n_keypoints=self.parameters['n_keypoints'])
-        key1, des1 = self._find_key_points(descriptor_extractor, im1)
-        key2, des2 = self._find_key_points(descriptor_extractor, im2)
-        matches = match_descriptors(des1, des2, cross_check=True)
-
-        # estimate affine transform model using all coordinates
-        src = key1[matches[:, 0]]
-        dst = key2[matches[:, 1]]
-
-        # robustly estimate affine transform model with RANSAC
-        model_robust, inliers = ransac((src, dst), AffineTransform,
-                                       min_samples=3, residual_threshold=1,
-                                       max_trials=100)
-#        diff = []
-#        for p1, p2 in zip(src[inliers], dst[inliers]):
-#            diff.append(p2-p1)
-#        return np.mean(diff, axis=0)
-
-        return model_robust.translation
+            frames[frames > self.threshold[0]] = self.threshold[1]
+        return frames
+
+    def _orb_ransac_shifts(self, frames, pairs):
+        """ The translation between each pair of frames, found by robustly
+        matching ORB features.  The features of each frame are found once.
+        """
+        extractor = ORB() #n_keypoints=self.parameters['n_keypoints'])
+        features = [self._find_key_points(extractor, im) for im in frames]
+
+        shifts = []
+        for f1, f2 in pairs:
+            (key1, des1), (key2, des2) = features[f1], features[f2]
+            matches = match_descriptors(des1, des2, cross_check=True)
+            src = key1[matches[:, 0]]
+            dst = key2[matches[:, 1]]
+            # robustly estimate affine transform model with RANSAC
+            model_robust, inliers = ransac(
+                (src, dst), AffineTransform, min_samples=3,
+                residual_threshold=1, max_trials=100)
+            shifts.append(model_robust.translation)
+        return np.array(shifts)
 
     def _find_key_points(self, desc_extractor, image):
         desc_extractor.detect_and_extract(image)
@@ -152,25 +139,63 @@ class ProjectionShift(BaseFilter, CpuPlugin):
         descriptors = desc_extractor.descriptors
         return keypoints, descriptors
 
-    def _template_matching_shift(self, im1, im2, template):
-        index = []
-        for im in [im1, im2]:
-            match = match_template(im, template)
-            index.append(np.unravel_index(np.argmax(match), match.shape))
-        index = np.array(index)
-        shift = index[1] - index[0]
-        return shift
-
-    def _sub_pixel_shift_adjustment(self, data):
-        frame_list = \
-            self._calculate_frame_list(np.arange(data.shape[self.slice_dir]))
-
-        new_shift = []
-        for f in frame_list:
-            new_shift.append(
-                self._get_shift(data, f[0], f[-1]).astype(np.float64))
-
-        return self._calculate_new_shift_array(np.array(new_shift))
+    def _template_matching_shifts(self, frames, pairs):
+        """ The translation of the template region of the first frame of each
+        pair in the second frame, found from the maximum of the normalised
+        cross-correlation.  The correlations for all pairs are calculated
+        together using FFTs of each frame, which are found once.
+        """
+        shape = frames.shape[1:]
+        template = frames[(slice(None),) + tuple(self.template_params)]
+        t_shape = template.shape[1:]
+        template = template - template.mean(axis=(1, 2), keepdims=True)
+        t_norm = np.sqrt(np.square(template).sum(axis=(1, 2)))
+        ft_template = np.conj(np.fft.rfft2(template, s=shape))
+        ft_frames = np.fft.rfft2(frames)
+
+        f1, f2 = np.array(pairs).T
+        xcorr = np.fft.irfft2(ft_frames[f2]*ft_template[f1], s=shape)
+        valid = (slice(None),) + \
+            tuple(slice(0, s - t + 1) for s, t in zip(shape, t_shape))
+        ncc = xcorr[valid]/(self._window_std(frames, t_shape)[f2] *
+                            t_norm[f1, None, None])
+
+        flat_idx = np.argmax(ncc.reshape(len(pairs), -1), axis=1)
+        index = np.transpose(np.unravel_index(flat_idx, ncc.shape[1:]))
+        start = [sl.start for sl in self.template_params]
+        return index - start
+
+    def _window_std(self, frames, t_shape):
+        """ The square root of the sum of squared deviations from the mean in
+        each template sized window of each frame. """
+        def window_sum(data):
+            c = np.pad(data, ((0, 0), (1, 0), (1, 0)), 'constant').cumsum(
+                axis=1).cumsum(axis=2)
+            h, w = t_shape
+            return c[:, h:, w:] - c[:, :-h, w:] - c[:, h:, :-w] + \
+                c[:, :-h, :-w]
+        n = float(np.prod(t_shape))
+        var = window_sum(np.square(frames)) - np.square(window_sum(frames))/n
+        return np.sqrt(np.maximum(var, 1e-12))
+
+    def _sub_pixel_shift_adjustment(self, frames):
+        frame_list = self._calculate_frame_list(np.arange(len(frames)))
+        pairs = [(f[0], f[-1]) for f in frame_list]
+        new_shift = self._calculate_shifts(frames, pairs).astype(np.float64)
+        self._add_equations(pairs, new_shift, len(frames))
+        return self._calculate_new_shift_array(new_shift)
+
+    def _add_equations(self, pairs, shifts, nFrames):
+        """ Record the shifts between pairs of frames against their global
+        frame indices (the first and last frames in the block are padding,
+        as are any frames beyond the end of the data).
+        """
+        sl = self.get_current_slice_list()[0][self.data_slice_dim]
+        frames = sl.start - 1 + np.arange(nFrames)
+        for (f1, f2), shift in zip(pairs, shifts):
+            g1, g2 = frames[f1], frames[f2]
+            if min(g1, g2) >= 0 and max(g1, g2) < self.nFrames:
+                self.equations.append((g1, g2, shift))
 
     def _calculate_frame_list(self, frames):
         sixes = zip(*(frames[i:] for i in xrange(6)))
@@ -185,12 +210,35 @@ class ProjectionShift(BaseFilter, CpuPlugin):
             new_shift.append(lstsq(self.A, shift[:, i])[0])
         return np.transpose(np.array(new_shift))[1:-1]
 
+    def _solve_shifts(self, equations, nFrames):
+        """ The sparse least squares solution for the shift of each frame
+        relative to the first frame, from the shifts between pairs of frames.
+        """
+        g1, g2, shift = [np.array(e) for e in zip(*equations)]
+        n_eq = len(g1)
+        # one equation per pair (shift[g2] - shift[g1]) plus shift[0] = 0
+        rows = np.concatenate([np.arange(n_eq)]*2 + [[n_eq]])
+        cols = np.concatenate([g2, g1, [0]])
+        vals = np.concatenate([np.ones(n_eq), -np.ones(n_eq), [1]])
+        A = coo_matrix((vals, (rows, cols)), shape=(n_eq+1, nFrames)).tocsr()
+        b = np.vstack([shift, np.zeros((1, 2))])
+        return np.transpose([lsqr(A, b[:, i], atol=1e-12, btol=1e-12)[0]
+                             for i in range(2)])
+
     def post_process(self):
         out_data = self.get_out_datasets()[0]
-        self.get_in_datasets()[0].meta_data.set(
-            'proj_align_shift_local', out_data.data[:, :])
-        self.get_in_datasets()[0].meta_data.set(
-            'proj_align_shift', np.cumsum(out_data.data[:, :], axis=0))
+        in_meta_data = self.get_in_datasets()[0].meta_data
+        in_meta_data.set('proj_align_shift_local', out_data.data[:, :])
+
+        equations = self.equations
+        if self.exp.meta_data.get('mpi'):
+            equations = [e for eqs in MPI.COMM_WORLD.allgather(equations)
+                         for e in eqs]
+        if equations:
+            shift = self._solve_shifts(equations, self.nFrames)
+        else:
+            shift = np.cumsum(out_data.data[:, :], axis=0)
+        in_meta_data.set('proj_align_shift', shift)
 
     def get_max_frames(self):
         # Do not change this number as 8 is currently a requirement.
@@ -204,20 +252,16 @@ class ProjectionShift(BaseFilter, CpuPlugin):
         in_dataset, out_dataset = self.get_datasets()
 
         in_pData, out_pData = self.get_plugin_datasets()
-        in_pData[0].plugin_data_setup('PROJECTION', self.get_max_frames(),
-                                      fixed=True)
+        in_pData[0].plugin_data_setup('PROJECTION', self.get_max_frames())
 
         new_shape = (in_dataset[0].get_shape()[
-            in_dataset[0].get_slice_directions()[0]], 2)
+            in_dataset[0].get_slice_dimensions()[0]], 2)
 
         out_dataset[0].create_dataset(shape=new_shape,
                                       axis_labels=['x.pixels', 'y.pixels'],
                                       remove=True)
         out_dataset[0].add_pattern("METADATA", core_dims=(1,), slice_dims=(0,))
-        out_pData[0].plugin_data_setup('METADATA', self.get_max_frames(),
-                                       fixed=True)
+        out_pData[0].plugin_data_setup('METADATA', self.get_max_frames())
 
     def set_filter_padding(self, in_data, out_data):
-        pad_dim = in_data[0].get_slice_directions()[0]
-        in_data[0].padding = {'pad_directions': [str(pad_dim) + '.1']}
-        #in_data[0].padding = {'pad_directions': [str(pad_dim) + '.before.1']}
+        in_data[0].padding = {'pad_multi_frames': 1}
@@ -24,7 +24,6 @@
 
 import logging
 from scipy import ndimage
-from scipy.optimize import curve_fit
 import numpy as np
 
 from savu.plugins.utils import register_plugin
@@ -41,8 +40,8 @@ class SinogramAlignment(BaseFilter, CpuPlugin):
     each centre of mass and the sine function is then used to align each row.
 
     :param threshold: e.g. a.b will set all values above a to b. Default: None.
-    :param p0: Initial guess for the parameters of \
-        scipy.optimize.curve_fit. Default: (1, 1, 1).
+    :param p0: Not used, as the sine function is fitted by linear least \
+        squares. Default: (1, 1, 1).
     :param type: Either centre_of_mass or shift, with the latter requiring\
         ProjectionVerticalAlignment prior to this \
         plugin. Default: 'centre_of_mass'.
@@ -60,83 +59,54 @@ class SinogramAlignment(BaseFilter, CpuPlugin):
                 'proj_align_shift')[:, 1]
         self.com_x = \
             self.get_in_datasets()[0].meta_data.get('rotation_angle')
-        data = self.get_in_datasets()[0]
-        self.sl = [slice(None)]*len(data.get_shape())
         self.slice_dir = self.get_plugin_in_datasets()[0].get_slice_dimension()
-
-#    def filter_frames(self, data):
-#        """
-#        Should be overloaded by filter classes extending this one
-#
-#        :param data: The data to filter
-#        :type data: ndarray
-#        :returns:  The filtered image
-#        """
-#        nFrames = data[0].shape[self.slice_dir]
-#        result = np.empty_like(data[0])
-#        for i in range(nFrames):
-#            self.sl[self.slice_dir] = i
-#            sino = data[0][self.sl]
-#            if self.parameters['threshold']:
-#                a, b = self.parameters['threshold'].split('.')
-#                sino[sino > a] = b
-#            com_y = self.com_y if self.com_y is not None else self._com_y(sino)
-#            shifted = self._shift(sino, self.com_x, com_y)
-#            result[self.sl] = \
-#                shifted.reshape(shifted.shape[0], shifted.shape[1])
-#        return data
+        # the sine function a*sin(x - b) + c is linear in (a*cos(b),
+        # -a*sin(b), c)
+        theta = np.deg2rad(self.com_x)
+        self.basis = np.transpose([np.sin(theta), np.cos(theta),
+                                   np.ones(len(theta))])
 
     def process_frames(self, data):
         """
-        Should be overloaded by filter classes extending this one
+        Align the rows of each sinogram in the block.
 
         :param data: The data to filter
         :type data: ndarray
         :returns:  The filtered image
         """
-        nFrames = data[0].shape[self.slice_dir]
-        result = np.empty_like(data[0])
-        for i in range(nFrames):
-            self.sl[self.slice_dir] = i
-            sino = data[0][self.sl]
-            if self.parameters['threshold']:
-                a, b = self.parameters['threshold'].split('.')
-                sino[sino > a] = b
-            com_y = self.com_y if self.com_y is not None else self._com_y(sino)
-            shifted = self._shift(sino, self.com_x, com_y)
-            result[self.sl] = \
-                shifted.reshape(shifted.shape[0], shifted.shape[1])
-        return result
-
-    def _sinfunc(self, data, a, b, c):
-        return (a*np.sin(np.deg2rad(data-b)))+c
-
-    def _shift(self, sinogram, com_x, com_y):
-        fitpars, covmat = \
-            curve_fit(self._sinfunc, com_x, com_y, p0=self.parameters['p0'])
-        variances = covmat.diagonal()
-        std_devs = np.sqrt(variances)
-        #residual = com_y - self._sinfunc(com_x, *fitpars)
-        residual = self._sinfunc(com_x, *fitpars) - com_y
-        centre_of_rotation_shift = residual
-        np.array_split(sinogram, sinogram.shape[0], axis=0)
-        n = 0
-        shifted_sinogram = []
-        for row in sinogram:
-            shifted_sinogram_row = \
-                ndimage.interpolation.shift(row, [centre_of_rotation_shift[n]],
-                                            mode='nearest')
-            shifted_sinogram.append(shifted_sinogram_row)
-            n += 1
-            output = np.vstack(shifted_sinogram)
-        return output
-
-    def _com_y(self, sinogram):
-        com_y = []
-        for row in sinogram:
-            com = ndimage.measurements.center_of_mass(row)
-            com_y.append(com[0])
-        return com_y
+        block = data[0]
+        squeeze = block.ndim == 2
+        block = block[np.newaxis] if squeeze else \
+            np.rollaxis(block, self.slice_dir)
+        if self.parameters['threshold']:
+            a, b = [float(v) for v in self.parameters['threshold'].split('.')]
+            block = np.where(block > a, b, block)
+        com_y = self._com_y(block) if self.com_y is None else \
+            np.tile(self.com_y, (len(block), 1))
+        result = self._shift(block, self.com_x, com_y)
+        return result[0] if squeeze else \
+            np.rollaxis(result, 0, self.slice_dir + 1)
+
+    def _shift(self, sinograms, com_x, com_y):
+        """ Shift each row of each sinogram by the residual of a sine function
+        fitted to its centre of mass. """
+        params = np.linalg.lstsq(self.basis, com_y.T, rcond=-1)[0]
+        residual = np.dot(self.basis, params).T - com_y
+        nSinos, nRows, nCols = sinograms.shape
+        # interpolate all rows in one call, with an extra row either side so
+        # the (integer) row coordinates are interior spline knots
+        rows = sinograms.reshape(nSinos*nRows, nCols)
+        rows = np.pad(rows, ((1, 1), (0, 0)), 'edge')
+        row_idx, col_idx = np.mgrid[1:nSinos*nRows+1, 0:nCols]
+        col_idx = col_idx - residual.reshape(-1, 1)
+        shifted = ndimage.map_coordinates(
+            rows, [row_idx, col_idx], order=3, mode='nearest')
+        return shifted.reshape(sinograms.shape)
+
+    def _com_y(self, sinograms):
+        """ The centre of mass of each row of each sinogram. """
+        weights = np.arange(sinograms.shape[-1])
+        return np.dot(sinograms, weights)/sinograms.sum(axis=-1)
 
     def get_plugin_pattern(self):
         return 'SINOGRAM'
@@ -21,54 +21,95 @@
 """
 import logging
 import numpy as np
+from mpi4py import MPI
 
 from savu.plugins.plugin import Plugin
 from savu.plugins.driver.cpu_plugin import CpuPlugin
+from savu.plugins.analysis.utils.streaming_stats import StreamingStats
 
 from savu.plugins.utils import register_plugin
 
+FRAME_STATS = ['max', 'min', 'mean', 'std']
+
 
 @register_plugin
 class Stats(Plugin, CpuPlugin):
     """
+    Calculates statistics for each frame and for the whole dataset in a \
+    single pass.  The dataset statistics are added to the metadata of the \
+    input dataset (e.g. for use by the QuantisationFilter).
+
     :param out_datasets: the output dataset. Default: ['stats'].
-    :param required_stats: create a list of required stats\
-        calcs. Default: ['max'].
+    :param required_stats: create a list of required stats calcs, from \
+        'max', 'min', 'mean', 'std', 'percentiles' and 'histogram' (the \
+        first four are also calculated for each frame). Default: ['max'].
     :param direction: which direction to perform this. Default: 'PROJECTION'.
+    :param percentiles: The (approximate) percentiles to calculate if \
+        'percentiles' is required. Default: [1, 50, 99].
+    :param bins: The number of bins between the minimum and maximum values \
+        if 'histogram' is required. Default: 100.
     """
 
     def __init__(self):
         logging.debug("Starting the statistics")
         super(Stats, self).__init__("Stats")
+        self.stats = None
+        self.frame_stats = None
+
+    def pre_process(self):
+        self.stats = StreamingStats()
 
     def process_frames(self, data):
         data = data[0]
-        if 'max' in self.parameters['required_stats']:
-            maximum = np.max(data)
-            op = np.array([maximum])
-        return op
+        self.stats.update(data)
+        funcs = {'max': np.nanmax, 'min': np.nanmin, 'mean': np.nanmean,
+                 'std': np.nanstd}
+        return np.array([funcs[s](data) for s in self.frame_stats])
 
     def post_process(self):
-        out_datasets = self.get_out_datasets()
+        stats = self.stats
+        if self.exp.meta_data.get('mpi'):
+            stats = stats.reduce(MPI.COMM_WORLD)
+
+        required = self.parameters['required_stats']
         in_meta_data = self.get_in_meta_data()[0]
-        data = out_datasets[0].data
-        if self.parameters['required_stats'] == 'max':
-            maximum = np.max(data)
-            in_meta_data.set('max', maximum)
+        # the range is always recorded, for the QuantisationFilter
+        in_meta_data.set('max', stats.max)
+        in_meta_data.set('min', stats.min)
+        if 'mean' in required:
+            in_meta_data.set('mean', stats.mean)
+        if 'std' in required:
+            in_meta_data.set('std', stats.get_std())
+        if 'percentiles' in required:
+            percentiles = self.parameters['percentiles']
+            in_meta_data.set('percentiles', np.array(percentiles))
+            in_meta_data.set('percentile_values',
+                             stats.get_percentiles(percentiles))
+        if 'histogram' in required:
+            counts, edges = stats.get_histogram(self.parameters['bins'])
+            in_meta_data.set('histogram', counts)
+            in_meta_data.set('histogram_bin_edges', edges)
 
     def get_max_frames(self):
         return 'single'
 
     def setup(self):
         self.exp.log(self.name + " Start")
+        required = self.parameters['required_stats']
+        required = [required] if isinstance(required, str) else required
+        self.parameters['required_stats'] = required
+        self.frame_stats = [s for s in FRAME_STATS if s in required]
+        if not self.frame_stats:
+            self.frame_stats = ['max']
+
         _in_dataset, out_dataset = self.get_datasets()
         in_pData, out_pData = self.get_plugin_datasets()
         in_pData[0].plugin_data_setup(self.parameters["direction"],
                                       self.get_max_frames())
         nFrames = in_pData[0].get_total_frames()
-        axis_labels = ['frame.unit', 'max.unit']
+        axis_labels = ['frame.unit', 'stats.unit']
         out_dataset[0].create_dataset(axis_labels=axis_labels,
-                                      shape=(nFrames, 1),
+                                      shape=(nFrames, len(self.frame_stats)),
                                       remove=True)
 
         out_dataset[0].add_pattern("METADATA", core_dims=(1,), slice_dims=(0,))
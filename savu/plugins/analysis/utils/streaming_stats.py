@@ -0,0 +1,170 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: streaming_stats
+   :platform: Unix
+   :synopsis: Single pass statistics that can be accumulated block by block \
+       and merged across processes.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import numpy as np
+
+
+class StreamingStats(object):
+    """ Accumulates the count, minimum, maximum, mean and variance of the
+    (finite) values passed to :meth:`update`, along with a quantile sketch
+    from which approximate percentiles and histograms are calculated.
+
+    The moments are merged using the pairwise update of Chan et al., which
+    is numerically stable for large datasets.  The sketch is a histogram
+    with at most ``nbins`` bins whose width is a power of two, so that two
+    sketches always have aligned bin edges and can be merged exactly by
+    coarsening the finer of the two.  Percentiles are accurate to within
+    the sketch bin width, which is at most ~2*(max - min)/nbins.
+
+    :param int nbins: The maximum number of bins in the quantile sketch.
+    """
+
+    def __init__(self, nbins=4096):
+        self.nbins = nbins
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        # sketch bin i covers [(offset + i)*2**k, (offset + i + 1)*2**k)
+        self.k = None
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, data):
+        """ Add a block of data to the statistics. """
+        data = np.asarray(data, dtype=np.float64).ravel()
+        data = data[np.isfinite(data)]
+        if not data.size:
+            return
+        block = StreamingStats(self.nbins)
+        block.count = data.size
+        block.mean = data.mean()
+        block.m2 = np.square(data - block.mean).sum()
+        block.min = data.min()
+        block.max = data.max()
+        block.k = self.__get_sketch_exponent(block.min, block.max)
+        idx = np.floor(data/2.0**block.k).astype(np.int64)
+        block.offset = idx.min()
+        block.counts = np.bincount(idx - block.offset).astype(np.int64)
+        self.merge(block)
+
+    def merge(self, other):
+        """ Merge the statistics from another instance into this one. """
+        if not other.count:
+            return
+        if not self.count:
+            self.__dict__.update(other.__dict__)
+            self.counts = other.counts.copy()
+            return
+
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta**2*self.count*other.count/float(n)
+        self.mean += delta*other.count/float(n)
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.__merge_sketch(other)
+
+    def reduce(self, comm):
+        """ Merge the statistics from all processes in the communicator.  This
+        must be called by all processes, which all receive the result.
+
+        :returns: The merged statistics.
+        :rtype: StreamingStats
+        """
+        merged = StreamingStats(self.nbins)
+        for stats in comm.allgather(self):
+            merged.merge(stats)
+        return merged
+
+    def get_std(self):
+        return np.sqrt(self.m2/self.count) if self.count else np.nan
+
+    def get_percentiles(self, percentiles):
+        """ Get approximate percentiles (in the range 0 to 100). """
+        if not self.count:
+            return np.tile(np.nan, len(percentiles))
+        cumulative = np.cumsum(self.counts)
+        target = np.asarray(percentiles, dtype=np.float64)/100.0*self.count
+        i = np.clip(np.searchsorted(cumulative, target), 0,
+                    len(self.counts) - 1)
+        before = cumulative[i] - self.counts[i]
+        frac = (target - before)/np.maximum(self.counts[i], 1)
+        values = (self.offset + i + np.clip(frac, 0, 1))*2.0**self.k
+        return np.clip(values, self.min, self.max)
+
+    def get_histogram(self, bins):
+        """ Get an approximate histogram with equal width bins between the
+        minimum and maximum values.
+
+        :returns: The counts and the bin edges.
+        """
+        edges = np.linspace(self.min, self.max, bins + 1)
+        if not self.count:
+            return np.zeros(bins, dtype=np.int64), edges
+        sketch_edges = \
+            (self.offset + np.arange(len(self.counts) + 1))*2.0**self.k
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        cdf = np.round(np.interp(edges, sketch_edges, cumulative))
+        cdf[-1] = self.count
+        return np.diff(cdf).astype(np.int64), edges
+
+    def __get_sketch_exponent(self, vmin, vmax):
+        """ The smallest power of two bin width (no smaller than the current
+        width) for which the range [vmin, vmax] fits in the sketch. """
+        span = vmax - vmin
+        if span > 0:
+            k = int(np.floor(np.log2(span/self.nbins)))
+        else:
+            k = int(np.floor(np.log2(abs(vmax)))) - 16 if vmax else 0
+        k = max(k, self.k) if self.k is not None else k
+        while np.floor(vmax/2.0**k) - np.floor(vmin/2.0**k) >= self.nbins:
+            k += 1
+        return k
+
+    def __merge_sketch(self, other):
+        k = max(self.k, other.k)
+        first = min(self.offset*2.0**self.k, other.offset*2.0**other.k)
+        last = max((self.offset + len(self.counts))*2.0**self.k,
+                   (other.offset + len(other.counts))*2.0**other.k)
+        while np.ceil(last/2.0**k) - np.floor(first/2.0**k) > self.nbins:
+            k += 1
+        offset, counts = self.__coarsen(self.k, self.offset, self.counts, k)
+        o_offset, o_counts = \
+            self.__coarsen(other.k, other.offset, other.counts, k)
+        start = min(offset, o_offset)
+        stop = max(offset + len(counts), o_offset + len(o_counts))
+        merged = np.zeros(stop - start, dtype=np.int64)
+        merged[offset - start:offset - start + len(counts)] += counts
+        merged[o_offset - start:o_offset - start + len(o_counts)] += o_counts
+        self.k, self.offset, self.counts = k, start, merged
+
+    def __coarsen(self, k, offset, counts, new_k):
+        if new_k == k:
+            return offset, counts
+        idx = (offset + np.arange(len(counts), dtype=np.int64)) >> (new_k - k)
+        return idx[0], np.bincount(idx - idx[0], weights=counts).astype(
+            np.int64)
@@ -21,13 +21,16 @@
 
 """
 
-from savu.plugins.plugin import Plugin
-from savu.plugins.driver.cpu_plugin import CpuPlugin
 import sys
 import numpy as np
+from mpi4py import MPI
+
+from savu.plugins.plugin import Plugin
+from savu.plugins.driver.cpu_plugin import CpuPlugin
+from savu.plugins.driver.iterative_plugin import IterativePlugin
 
 
-class BaseComponentAnalysis(Plugin, CpuPlugin):
+class BaseComponentAnalysis(Plugin, CpuPlugin, IterativePlugin):
     """
     A base plugin for doing component analysis. This sorts out the main \
     features of a component analysis
@@ -38,15 +41,38 @@ class BaseComponentAnalysis(Plugin, CpuPlugin):
     :param number_of_components: The number expected components. Default: 3.
     :param chunk: The chunk to work on. Default: 'SINOGRAM'.
     :param whiten: To subtract the mean or not. Default: 1.
+    :param distributed: Accumulate the spectra covariance on each process, \
+        find the components in the post_process and project the data onto \
+        them in a second pass, so the memory required is independent of the \
+        map size (the SPECTRUM pattern is used in place of the \
+        chunk). Default: False.
     """
 
     def __init__(self, name):
         super(BaseComponentAnalysis, self).__init__(name)
+        self.count = 0
+        self.mean = None
+        self.cov = None
+        self.sample = None
+        self.nSampled = 0
+        self.projection = None
+
+    def _run_plugin(self, exp, transport):
+        # the iterative driver is only required for the two passes of the
+        # distributed mode
+        if self.parameters['distributed']:
+            IterativePlugin._run_plugin(self, exp, transport)
+        else:
+            CpuPlugin._run_plugin(self, exp, transport)
 
     def get_max_frames(self):
+        if self.parameters['distributed']:
+            return 'multiple'
         return self.spectra_length[0]
 
     def get_plugin_pattern(self):
+        if self.parameters['distributed']:
+            return 'SPECTRUM'
         return self.parameters['chunk']
 
     def setup(self):
@@ -76,12 +102,140 @@ class BaseComponentAnalysis(Plugin, CpuPlugin):
 #         dirs = range(len(out_dataset[0].get_shape()))
 #         vxz = {'core_dims': (0,1), 'slice_dims': (2,)}
 #         in_dataset[0].add_pattern("VOLUME_XZ", **vxz)
-        in_pData[0].plugin_data_setup(plugin_pattern, self.get_max_frames())
-        out_pData[0].plugin_data_setup(plugin_pattern, num_comps)
+        if self.parameters['distributed']:
+            self.__setup_distributed(in_dataset, out_dataset)
+        else:
+            in_pData[0].plugin_data_setup(plugin_pattern,
+                                          self.get_max_frames())
+            out_pData[0].plugin_data_setup(plugin_pattern, num_comps)
         out_pData[1].plugin_data_setup("SPECTRUM", num_comps)
 
         self.exp.log(self.name + " End")
 
+    def __setup_distributed(self, in_dataset, out_dataset):
+        """ The first iteration accumulates the covariance (there is no
+        output) and the second projects the data onto the components. """
+        if 'SPECTRUM' not in in_dataset[0].get_data_patterns().keys():
+            raise Exception("%s: the distributed mode requires a SPECTRUM "
+                            "pattern" % self.name)
+        in_pData, out_pData = self.get_plugin_datasets()
+        in_pData[0].plugin_data_setup('SPECTRUM', self.get_max_frames())
+        out_pData[0].plugin_data_setup('SPECTRUM', self.get_max_frames())
+        self.eigenvectors = out_dataset[1]
+        self.set_iterations(2)
+        self.set_iteration_datasets(0, [in_dataset[0]], [])
+        self.set_iteration_datasets(1, [in_dataset[0]], [out_dataset[0]])
+
+    def process_frames(self, data):
+        if not self.parameters['distributed']:
+            return self.fit_transform(data[0])
+        sh = data[0].shape
+        spectra = self.remove_nan_inf(
+            np.reshape(data[0], (-1, sh[-1])).astype(np.float64))
+        if self.get_iteration() == 0:
+            self.__accumulate(spectra)
+            return None
+        scores = np.dot(spectra - self.mean, self.projection.T)
+        return np.reshape(scores, sh[:-1] + (scores.shape[-1],))
+
+    def fit_transform(self, data):
+        """ Find the components of a chunk of data and project the data onto
+        them.
+
+        :returns: The scores and components.
+        :rtype: list(np.ndarray)
+        """
+        raise NotImplementedError("fit_transform needs to be implemented")
+
+    def solve(self, count, mean, cov, sample):
+        """ Find the components from the covariance of all the spectra.
+
+        :param int count: The number of spectra.
+        :param np.ndarray mean: The mean spectrum.
+        :param np.ndarray cov: The (unnormalised) spectra covariance.
+        :param np.ndarray sample: A random sample of the spectra (or None).
+        :returns: The components and the matrix that projects the (mean \
+            subtracted) spectra onto them.
+        :rtype: tuple(np.ndarray)
+        """
+        raise NotImplementedError("solve needs to be implemented")
+
+    def get_principal_components(self, count, cov):
+        """ Get the variance and direction of the largest principal components
+        from the (unnormalised) covariance. """
+        eigenvalues, eigenvectors = np.linalg.eigh(cov/max(count - 1, 1))
+        order = np.argsort(eigenvalues)[::-1]
+        order = order[:self.parameters['number_of_components']]
+        return eigenvalues[order], eigenvectors[:, order].T
+
+    def get_sample_size(self):
+        """ The number of spectra to sample, across all processes, for the
+        solve in distributed mode. """
+        return 0
+
+    def pre_process(self):
+        if self.parameters['distributed'] and self.get_iteration() == 0:
+            n = self.spectra_length[0]
+            self.count = 0
+            self.mean = np.zeros(n)
+            self.cov = np.zeros((n, n))
+            nProcs = len(self.exp.meta_data.get('processes'))
+            nSample = int(np.ceil(self.get_sample_size()/float(nProcs)))
+            self.sample = np.zeros((nSample, n)) if nSample else None
+            self.nSampled = 0
+
+    def post_process(self):
+        if self.parameters['distributed'] and self.get_iteration() == 0:
+            self.__solve()
+
+    def __accumulate(self, spectra):
+        """ Merge the mean and covariance of a block of spectra with the
+        running values (Chan et al.). """
+        n = len(spectra)
+        mean = spectra.mean(axis=0)
+        centred = spectra - mean
+        self.count, self.mean, self.cov = _merge_moments(
+            (self.count, self.mean, self.cov),
+            (n, mean, np.dot(centred.T, centred)))
+        if self.sample is not None:
+            self.__reservoir_sample(spectra)
+
+    def __reservoir_sample(self, spectra):
+        """ Keep a uniform random sample of the spectra seen so far. """
+        size = len(self.sample)
+        fill = max(min(size - self.nSampled, len(spectra)), 0)
+        self.sample[self.nSampled:self.nSampled+fill] = spectra[:fill]
+        seen = self.nSampled + fill + np.arange(len(spectra) - fill)
+        idx = (np.random.random(len(seen))*(seen + 1)).astype(np.int64)
+        keep = idx < size
+        self.sample[idx[keep]] = spectra[fill:][keep]
+        self.nSampled += len(spectra)
+
+    def __solve(self):
+        moments = (self.count, self.mean, self.cov)
+        sample = self.sample[:self.nSampled] if self.sample is not None \
+            else None
+        rank = 0
+        if self.exp.meta_data.get('mpi'):
+            comm = MPI.COMM_WORLD
+            rank = comm.rank
+            moments = comm.reduce(moments, op=_merge_moments, root=0)
+            if sample is not None:
+                sample = comm.gather(sample, root=0)
+                sample = np.concatenate(sample) if rank == 0 else None
+
+        result = None
+        if rank == 0:
+            result = self.solve(moments[0], moments[1], moments[2], sample)
+            self.eigenvectors.data[...] = result[0]
+        if self.exp.meta_data.get('mpi'):
+            result, moments = \
+                MPI.COMM_WORLD.bcast((result, moments[:2]), root=0)
+        self.mean = moments[1]
+        self.projection = result[1]
+        self.cov = None
+        self.sample = None
+
     def nInput_datasets(self):
         return 1
 
@@ -97,3 +251,17 @@ class BaseComponentAnalysis(Plugin, CpuPlugin):
         data[np.isnan(data)]=0
         data = np.nan_to_num(data)
         return data
+
+
+def _merge_moments(a, b):
+    """ Merge the (count, mean, unnormalised covariance) of two sets of
+    spectra. """
+    if not a[0]:
+        return b
+    if not b[0]:
+        return a
+    n = a[0] + b[0]
+    delta = b[1] - a[1]
+    mean = a[1] + delta*b[0]/float(n)
+    cov = a[2] + b[2] + np.outer(delta, delta)*a[0]*b[0]/float(n)
+    return n, mean, cov
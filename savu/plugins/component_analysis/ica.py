@@ -34,14 +34,16 @@ class Ica(BaseComponentAnalysis):
     This plugin performs independent component analysis on XRD/XRF spectra.
     :param w_init: The initial mixing matrix. Default: None.
     :param random_state: The state. Default: 1.
+    :param sample_size: The number of spectra sampled at random (across all \
+        processes) to fit the unmixing matrix in distributed mode. \
+        Default: 10000.
     """
 
     def __init__(self):
         super(Ica, self).__init__("Ica")
 
-    def process_frames(self, data):
+    def fit_transform(self, data):
         logging.debug("I am starting the old componenty vous")
-        data = data[0]
         #print 'The length of the data is'+str(data.shape)
         sh = data.shape
         newshape = (np.prod(sh[:-1]), sh[-1])
@@ -64,3 +66,22 @@ class Ica(BaseComponentAnalysis):
         eigenspectra = ica.components_
         logging.debug("mange-tout")
         return [scores, eigenspectra]
+
+    def get_sample_size(self):
+        return self.parameters['sample_size']
+
+    def solve(self, count, mean, cov, sample):
+        """ Whiten the sampled spectra using the principal components of the
+        full covariance and fit the unmixing matrix to them. """
+        nComps = self.parameters['number_of_components']
+        variance, components = self.get_principal_components(count, cov)
+        scale = np.sqrt(np.maximum(variance, np.finfo(float).eps))
+        whitening = components/scale[:, None]
+        ica = FastICA(n_components=nComps,
+                      algorithm='parallel',
+                      whiten=False,
+                      w_init=self.parameters['w_init'],
+                      random_state=self.parameters['random_state'])
+        ica.fit(np.dot(sample - mean, whitening.T))
+        components = np.dot(ica.components_, whitening)
+        return components, components
@@ -37,9 +37,8 @@ class Pca(BaseComponentAnalysis):
     def __init__(self):
         super(Pca, self).__init__("Pca")
 
-    def process_frames(self, data):
+    def fit_transform(self, data):
         logging.debug("Starting the PCA")
-        data = data[0]
         sh = data.shape
         newshape = (np.prod(sh[:-1]), sh[-1])
         data = np.reshape(data, (newshape))
@@ -58,3 +57,15 @@ class Pca(BaseComponentAnalysis):
         scores = pca.components_
         logging.debug("mange-tout")
         return [loading, scores]
+
+    def solve(self, count, mean, cov, sample):
+        variance, components = self.get_principal_components(count, cov)
+        # make the largest element of each component positive
+        signs = np.sign(components[np.arange(len(components)),
+                                   np.argmax(np.abs(components), axis=1)])
+        components *= signs[:, None]
+        projection = components
+        if self.parameters['whiten']:
+            scale = np.sqrt(np.maximum(variance, np.finfo(float).eps))
+            projection = components/scale[:, None]
+        return components, projection
@@ -64,6 +64,13 @@ class TimeBasedCorrection(BaseCorrection, CpuPlugin):
         inData.meta_data.set('multiple_dark', self.dark)
         inData.meta_data.set('multiple_flat', self.flat)
 
+        self.dark_stack = np.array(self.dark, dtype=np.float32)
+        self.flat_stack = np.array(self.flat, dtype=np.float32)
+        self.dark_frames, self.dark_dist = \
+            self.find_nearest_frames(self.dark_idx, self.data_key)
+        self.flat_frames, self.flat_dist = \
+            self.find_nearest_frames(self.flat_idx, self.data_key)
+
     def calc_average(self, data, key):
         im_key = np.where(self.image_key == key)[0]
         splits = np.where(np.diff(im_key) > 1)[0]+1
@@ -75,11 +82,12 @@ class TimeBasedCorrection(BaseCorrection, CpuPlugin):
 
     def process_frames(self, data):
         proj = data[0]
-        frame = self.get_global_frame_index()[0][self.count]
+        frames = self.__get_frames(proj)
         flat = self.calculate_flat_field(
-                *self.find_nearest_frames(self.flat_idx, frame))
+            self.flat_frames[:, frames], self.flat_dist[:, frames])
         dark = self.calculate_dark_field(
-                *self.find_nearest_frames(self.dark_idx, frame))
+            self.dark_frames[:, frames], self.dark_dist[:, frames])
+        flat, dark = self.__to_block(flat, proj), self.__to_block(dark, proj)
 
         if self.parameters['in_range']:
             proj = self.in_range(proj, flat)
@@ -87,42 +95,64 @@ class TimeBasedCorrection(BaseCorrection, CpuPlugin):
         self.count += 1
         return np.nan_to_num((proj-dark)/(flat-dark))
 
+    def __get_frames(self, proj):
+        """ The indices of the frames in the current block (any frames
+        padding the block to the full size repeat the last frame). """
+        sl = self.get_current_slice_list()[0][self.proj_dim]
+        frames = np.arange(sl.start, sl.stop, sl.step)
+        nFrames = proj.shape[self.slice_dir] if \
+            proj.ndim == self.flat_stack.ndim else 1
+        return np.pad(frames, (0, max(nFrames - len(frames), 0)), 'edge')
+
+    def __to_block(self, field, proj):
+        """ Move the frames dimension of the interpolated field to the slice
+        dimension of the data block (or remove it for a single frame). """
+        if proj.ndim < field.ndim:
+            return field[0]
+        return np.rollaxis(field, 0, self.slice_dir + 1)
+
     def in_range(self, data, flat):
         data[data > flat] = flat[data > flat]
         return data
 
-    def find_nearest_frames(self, idx_list, value):
-        """ Find the index of the two entries that 'value' lies between in \
-            'idx_list' and calculate the distance between each of them.
+    def find_nearest_frames(self, idx_list, values):
+        """ Find the index of the two entries in 'idx_list' that each of the
+            (global) image key indices in 'values' lie between and the
+            distance from each of them.
+
+        :returns: The before and after indices and the before and after
+            weights, each an array of shape (2, len(values)).
         """
-        global_val = self.data_key[value]
-        # find which list (index) global_val belongs to
-        list_idx = [global_val in i for i in self.split_idx].index(True)
-        val_list = self.split_idx[list_idx]
-        # find length of list
-        length_list = len(val_list)
-        # find position of global_val in list and distance from each end
-        pos = np.where(val_list == global_val)[0][0]
-        dist = [(length_list-pos)/float(length_list), pos/float(length_list)]
-
-        # find closest before and after idx_list entries
-        new_list = list(np.sort(np.append(idx_list, list_idx)))
-        new_idx = new_list.index(list_idx)
-
-        entry1 = new_idx-1 if new_idx != 0 else new_idx+1
-        entry2 = new_idx+1 if new_idx != len(new_list)-1 else new_idx-1
-        before = idx_list.index(new_list[entry1])
-        after = idx_list.index(new_list[entry2])
-
-        return [before, after], dist
+        values = np.asarray(values)
+        lengths = np.array([len(i) for i in self.split_idx])
+        starts = np.cumsum(lengths) - lengths
+        # find which list (run of equal keys) each value belongs to
+        list_idx = np.searchsorted(starts, values, side='right') - 1
+        # position of each value in its list and distance from each end
+        length_list = lengths[list_idx].astype(np.float64)
+        pos = values - starts[list_idx]
+        dist = np.array([(length_list-pos)/length_list, pos/length_list])
+
+        # closest before and after idx_list entries (the nearest entry on
+        # the other side at either end)
+        new_idx = np.searchsorted(idx_list, list_idx)
+        before = np.maximum(new_idx - 1, 0)
+        after = np.minimum(new_idx, len(idx_list) - 1)
+        return np.array([before, after]), dist
 
     def calculate_flat_field(self, frames, distance):
-        return self.flat[frames[0]]*distance[0] + \
-            self.flat[frames[1]]*distance[1]
+        return self.__interpolate(self.flat_stack, frames, distance)
 
     def calculate_dark_field(self, frames, distance):
-        return self.dark[frames[0]]*distance[0] + \
-            self.dark[frames[1]]*distance[1]
+        return self.__interpolate(self.dark_stack, frames, distance)
+
+    def __interpolate(self, stack, frames, distance):
+        """ Linear interpolation between the averaged runs for a block of
+        frames, returning an array with the frames in the first dimension.
+        """
+        shape = (-1,) + (1,)*(stack.ndim - 1)
+        return stack[frames[0]]*distance[0].reshape(shape).astype(np.float32)\
+            + stack[frames[1]]*distance[1].reshape(shape).astype(np.float32)
 
     def get_max_frames(self):
-        return 'single'
+        return 'multiple'
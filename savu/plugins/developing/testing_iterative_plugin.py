@@ -0,0 +1,75 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: testing_iterative_plugin
+   :platform: Unix
+   :synopsis: A plugin to test the iterative plugin driver.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+from savu.plugins.utils import register_plugin
+from savu.plugins.filters.base_filter import BaseFilter
+from savu.plugins.driver.iterative_plugin import IterativePlugin
+
+
+@register_plugin
+class TestingIterativePlugin(BaseFilter, IterativePlugin):
+    """
+    A plugin to test the iterative plugin driver, which adds one to the data \
+    on each iteration using alternating datasets.
+
+    :param nIterations: The maximum number of iterations. Default: 5.
+    :param converged: Stop when the mean of the data increases by this \
+        value (None to run all iterations). Default: None.
+    """
+
+    def __init__(self):
+        super(TestingIterativePlugin, self).__init__("TestingIterativePlugin")
+
+    def process_frames(self, data):
+        return data[0] + 1
+
+    def post_process(self):
+        if self.get_iteration() == 0:
+            self.start_mean = self.get_out_datasets()[0].data[...].mean()
+
+    def _check_convergence(self, plugin):
+        mean = self.get_out_datasets()[0].data[...].mean()
+        return mean - self.start_mean >= self.parameters['converged']
+
+    def setup(self):
+        in_dataset, out_dataset = self.get_datasets()
+        out_dataset[0].create_dataset(in_dataset[0])
+        out_dataset[1].create_dataset(in_dataset[0])
+
+        in_pData, out_pData = self.get_plugin_datasets()
+        in_pData[0].plugin_data_setup('PROJECTION', 'single')
+        out_pData[0].plugin_data_setup('PROJECTION', 'single')
+        out_pData[1].plugin_data_setup('PROJECTION', 'single')
+
+        self.set_iterations(self.parameters['nIterations'])
+        self.set_iteration_datasets(0, [in_dataset[0]], [out_dataset[0]])
+        self.set_iteration_datasets(1, [out_dataset[0]], [out_dataset[1]])
+        self.set_alternating_datasets(out_dataset[0], out_dataset[1])
+        if self.parameters['converged'] is not None:
+            self.set_convergence_callback(self._check_convergence)
+
+    def nOutput_datasets(self):
+        return 2
+
+    def nClone_datasets(self):
+        return 1
@@ -21,6 +21,7 @@
 
 """
 
+import savu.core.affinity as af
 from savu.plugins.driver.plugin_driver import PluginDriver
 from savu.plugins.driver.basic_driver import BasicDriver
 
@@ -37,5 +38,7 @@ class CpuPlugin(_base):
         super(CpuPlugin, self).__init__()
 
     def _run_plugin(self, exp, transport):
+        # one thread per core assigned to this process
+        af.set_driver_threads(exp.meta_data)
         self._run_plugin_instances(transport)
         return
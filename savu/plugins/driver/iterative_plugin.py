@@ -21,13 +21,25 @@
 
 """
 
+import h5py
+import logging
+import numpy as np
+from mpi4py import MPI
+
+import savu.core.utils as cu
 from savu.plugins.driver.plugin_driver import PluginDriver
+from savu.data.data_structures.data_types.node_buffer import NodeBuffer, \
+    get_node_communicators
 
 
 class IterativePlugin(PluginDriver):
     """
     Allows the plugin to be repeated, keeping the parameters from the previous
     iteration.
+
+    Alternating datasets are held in memory between iterations, if they fit
+    within the memory budget, and only written to file at the end (or at
+    each checkpoint).
     """
 
     def __init__(self):
@@ -37,11 +49,15 @@ class IterativePlugin(PluginDriver):
         self._ip_complete = False
         self._ip_data_dict = {}
         self._ip_data_dict['iterating'] = {}
+        self._ip_convergence = None
+        self._ip_checkpoint = None
+        self._ip_buffers = {}
 
     def _run_plugin(self, exp, transport):
         """ Runs the pre_process, process and post_process methods.
         """
         self.__set_original_datasets()
+        self.__create_buffers()
 
         while not self._ip_complete:
             print "Iteration", self._ip_iteration, "..."
@@ -52,9 +68,72 @@ class IterativePlugin(PluginDriver):
             if self._ip_fixed_iterations and \
                     self._ip_iteration == self._ip_fixed_iterations-1:
                 self.set_processing_complete()
+            if not self._ip_complete and self.__check_convergence():
+                self.set_processing_complete()
+            if not self._ip_complete and self._ip_checkpoint and \
+                    (self._ip_iteration+1) % self._ip_checkpoint == 0:
+                self.__write_buffers()
             self._ip_iteration += 1
+        self.__release_buffers()
         self.__finalise_datasets()
 
+    def __create_buffers(self):
+        """ Replace the backing data of the alternating datasets with buffers
+        in memory, if they fit within the memory budget. """
+        datasets = set([d for pair in
+                        self._ip_data_dict['iterating'].iteritems()
+                        for d in pair])
+        if not datasets:
+            return
+        if not all([isinstance(d.data, (h5py.Dataset, np.ndarray)) for d in
+                    datasets]):
+            logging.debug("Unable to hold the alternating datasets in memory")
+            return
+
+        sizes = [NodeBuffer.get_nbytes(d.data.shape, d.data.dtype)
+                 for d in datasets]
+        # the buffers are synchronised one at a time
+        max_bytes = min(NodeBuffer.MAX_BYTES, max(sizes))
+        nbytes = sum(sizes) + NodeBuffer.get_sync_nbytes(max_bytes)
+        budget = cu.get_memory_budget(self.exp.meta_data)
+        if nbytes > budget:
+            cu.user_message("%s - the alternating datasets (%i MB) exceed the "
+                            "memory budget (%i MB) and will be read from file"
+                            % (self.name, nbytes/2**20, budget/2**20))
+            return
+
+        comms = get_node_communicators()
+        for d in datasets:
+            buf = NodeBuffer(d.data.shape, d.data.dtype, comms,
+                             max_bytes=max_bytes)
+            if d in self.parameters['in_datasets']:
+                buf.fill_from(d.data)
+            self._ip_buffers[d] = d.data
+            d.data = buf
+        cu.user_message("%s - holding the alternating datasets (%i MB) in "
+                        "memory" % (self.name, nbytes/2**20))
+
+    def _synchronise_data(self):
+        for d in self._ip_buffers.keys():
+            d.data.synchronise()
+
+    def __write_buffers(self, all_data=False):
+        """ Write the in-memory output datasets of the current iteration (or
+        all the in-memory datasets) to file. """
+        for d in self._ip_buffers.keys():
+            if all_data or d in self.parameters['out_datasets']:
+                d.data.write_to(self._ip_buffers[d])
+        self.exp._barrier()
+
+    def __release_buffers(self):
+        if not self._ip_buffers:
+            return
+        self.__write_buffers(all_data=True)
+        for d, data in self._ip_buffers.iteritems():
+            d.data.free()
+            d.data = data
+        self._ip_buffers = {}
+
     def __set_datasets(self):
         params = self.parameters
         if self._ip_iteration in self._ip_data_dict.keys():
@@ -82,6 +161,29 @@ class IterativePlugin(PluginDriver):
     def set_processing_complete(self):
         self._ip_complete = True
 
+    def set_convergence_callback(self, func):
+        """ Set a function that is called with the plugin instance at the end
+        of each iteration and returns True if the processing has converged.
+        The value returned on the first process is used by all processes.
+        """
+        self._ip_convergence = func
+
+    def __check_convergence(self):
+        if not self._ip_convergence:
+            return False
+        converged = bool(self._ip_convergence(self))
+        if self.exp.meta_data.get('mpi'):
+            converged = MPI.COMM_WORLD.bcast(converged, root=0)
+        return converged
+
+    def set_checkpoint_iterations(self, nIterations):
+        """ Write the in-memory alternating datasets to file every
+        nIterations. """
+        if isinstance(nIterations, int):
+            self._ip_checkpoint = nIterations
+        else:
+            raise Exception('nIterations should be an integer.')
+
     def set_iterations(self, nIterations):
         if isinstance(nIterations, int):
             self._ip_fixed_iterations = nIterations
@@ -20,8 +20,13 @@
 .. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
 
 """
+import os
+import time
+import logging
 from mpi4py import MPI
 
+import savu.core.utils as cu
+import savu.core.affinity as af
 from savu.plugins.driver.plugin_driver import PluginDriver
 
 
@@ -50,12 +55,37 @@ class MultiThreadedPlugin(PluginDriver):
             self.parameters['available_CPUs'] = nCores
             self.parameters['available_GPUs'] = \
                 len([p for p in processes if 'GPU' in p])/nNodes
+            # use all the cores of the processes on this node
+            af.set_driver_threads(exp.meta_data, node=True)
+            start = self.__get_times()
             self._run_plugin_instances(transport, communicator=self.new_comm)
+            self.__report_utilisation(start, nCores)
+            af.set_driver_threads(exp.meta_data)
             self.__free_communicator()
 
-        self.exp._barrier()
+        # the other processes on each node wait without occupying the cores
+        self.exp._idle_barrier()
         return
 
+    def __get_times(self):
+        """ The wall time and the CPU time used by all threads (and child
+        processes) of this process. """
+        t = os.times()
+        return time.time(), sum(t[:4])
+
+    def __report_utilisation(self, start, nCores):
+        """ Report the number of cores used on average while the plugin was
+        running. """
+        end = self.__get_times()
+        wall = end[0] - start[0]
+        cores = (end[1] - start[1])/wall if wall > 0 else 0
+        self.core_utilisation = cores/nCores
+        msg = "%s - %s used %.1f of %i cores (%.0f%% utilisation)" % \
+            (self.name, MPI.Get_processor_name(), cores, nCores,
+             100*self.core_utilisation)
+        logging.info(msg)
+        cu.user_message(msg)
+
     def _get_masters(self, processes):
         masters = [p for p in range(len(processes)) if processes[p] == 'GPU0']
         if not masters:
@@ -74,6 +74,7 @@ class PluginDriver(object):
 
             logging.info("%s.%s", self.__class__.__name__, 'process_frames')
             transport._transport_process(self)
+            self._synchronise_data()
 
             logging.info("%s.%s", self.__class__.__name__, '_barrier')
             self.exp._barrier(communicator=communicator)
@@ -82,6 +83,11 @@ class PluginDriver(object):
             self.post_process()
             self.base_post_process()
 
+    def _synchronise_data(self):
+        """ Called by all processes once the frames have been processed and
+        before the post_process. """
+        pass
+
     def __get_local_dict(self):
         """ Gets the local variables of the class minus those from the Plugin
         class. """
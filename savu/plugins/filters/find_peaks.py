@@ -20,10 +20,10 @@
 .. moduleauthor:: Aaron Parsons <scientificsoftware@diamond.ac.uk>
 
 """
+from mpi4py import MPI
 from savu.plugins.driver.cpu_plugin import CpuPlugin
 from savu.plugins.utils import register_plugin
 from savu.plugins.filters.base_filter import BaseFilter
-import peakutils as pe
 import numpy as np
 from scipy.signal import savgol_filter
 
@@ -31,7 +31,8 @@ from scipy.signal import savgol_filter
 @register_plugin
 class FindPeaks(BaseFilter, CpuPlugin):
     """
-    This plugin uses peakutils to find peaks in spectra. This is then metadata.
+    This plugin finds peaks in spectra (as in peakutils.indexes). This is \
+    then metadata.
     :param out_datasets: Create a list of the dataset(s). Default: ['Peaks'].
     :param thresh: Threshold for peak detection Default: 0.03.
     :param min_distance: Minimum distance for peak detection. Default: 15.
@@ -40,16 +41,70 @@ class FindPeaks(BaseFilter, CpuPlugin):
     def __init__(self):
         super(FindPeaks, self).__init__("FindPeaks")
 
+    def pre_process(self):
+        in_pData = self.get_plugin_in_datasets()[0]
+        self.spectrum_dim = in_pData.get_core_dimensions()[0]
+        self.peak_counts = np.zeros(in_pData.get_shape()[self.spectrum_dim],
+                                    dtype=np.int64)
+
     def process_frames(self, data):
-        data = data[0]
+        data = np.rollaxis(data[0], self.spectrum_dim, data[0].ndim)
+        shape = data.shape
         # filter to smooth noise
-        data = savgol_filter(data, 51, 3)
-        PeakIndex = pe.indexes(data, thres=self.parameters['thresh'],
-                               min_dist=self.parameters['min_distance'])
+        data = savgol_filter(data.reshape(-1, shape[-1]), 51, 3, axis=-1)
+        peaks = self.find_peaks(data, self.parameters['thresh'],
+                                self.parameters['min_distance'])
+        self.peak_counts += peaks.sum(axis=0)
+        PeakIndexOut = peaks.reshape(shape).astype(np.float32)
+        return np.rollaxis(PeakIndexOut, len(shape)-1, self.spectrum_dim)
+
+    def post_process(self):
+        """ Merge the peaks found by all processes into a single list of peak
+        positions, which is added to the metadata as 'PeakIndex'. """
+        counts = self.peak_counts
+        if self.exp.meta_data.get('mpi'):
+            counts = MPI.COMM_WORLD.allreduce(counts, op=MPI.SUM)
+        peak_index = list(np.where(counts)[0])
+        for data in self.get_in_datasets() + self.get_out_datasets():
+            data.meta_data.set('PeakIndex', peak_index)
+            data.meta_data.set('PeakCounts', counts[peak_index])
+
+    @staticmethod
+    def find_peaks(data, thresh, min_dist):
+        """ Find the peaks in each row of the data.  A peak is a local
+        maximum above the fraction 'thresh' of the range of the row, and
+        smaller peaks within 'min_dist' of a larger peak are removed.
 
-        PeakIndexOut = np.zeros(data.shape)
-        PeakIndexOut[PeakIndex] = 1
-        return PeakIndexOut
+        :returns: A boolean array with True at the position of each peak.
+        :rtype: np.ndarray
+        """
+        dmin = data.min(axis=-1)[:, None]
+        dmax = data.max(axis=-1)[:, None]
+        dy = np.diff(data, axis=-1)
+        peaks = np.zeros(data.shape, dtype=bool)
+        peaks[:, 1:-1] = (dy[:, :-1] > 0) & (dy[:, 1:] < 0)
+        peaks &= data > thresh*(dmax - dmin) + dmin
+
+        min_dist = int(min_dist)
+        if min_dist <= 1 or peaks.sum(axis=-1).max() <= 1:
+            return peaks
+        # keep the highest peak, then the next highest peak not within
+        # min_dist of a kept peak and so on, for all rows at once
+        rows, cols = np.nonzero(peaks)
+        order = np.lexsort((-data[rows, cols], rows))
+        rows, cols = rows[order], cols[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        removed = np.zeros(data.shape, dtype=bool)
+        window = np.arange(-min_dist, min_dist+1)
+        for r in range(rank.max()+1):
+            current = rank == r
+            row, col = rows[current], cols[current]
+            keep = ~removed[row, col]
+            row, col = row[keep], col[keep]
+            idx = np.clip(col[:, None] + window, 0, data.shape[-1]-1)
+            removed[row[:, None], idx] = True
+            removed[row, col] = False
+        return peaks & ~removed
 
     def setup(self):
         # set up the output dataset that is created by the plugin
@@ -65,7 +120,21 @@ class FindPeaks(BaseFilter, CpuPlugin):
         out_dataset[0].create_dataset(axis_labels=labels, shape=shape)
         out_dataset[0].add_pattern("CHANNEL", slice_dims=(1,), core_dims=(0,))
         out_dataset[0].add_pattern("SPECTRUM", slice_dims=(0,), core_dims=(1,))
-        out_pData[0].plugin_data_setup("SPECTRUM", self.get_max_frames())
+
+        # the frames in each block must be a whole number of rows of the
+        # first slice dimension to map onto consecutive output frames
+        mfp = in_pData[0]._get_max_frames_process()
+        nSlices = in_dataset[0].get_shape()[
+            in_dataset[0].get_slice_dimensions()[0]]
+        nFrames = max(n for n in range(1, mfp+1) if not nSlices % n)
+        in_pData[0].plugin_data_setup("SPECTRUM", nFrames)
+        out_pData[0].plugin_data_setup("SPECTRUM", nFrames)
+
+        # each output transfer holds the flattened frames of one input
+        # transfer, whose size depends on the shape of the map
+        mft = in_pData[0]._get_max_frames_transfer()
+        out_pData[0].meta_data.set('max_frames_transfer', mft)
+        out_pData[0]._set_shape_transfer([mft])
 
     def get_max_frames(self):
-        return 'single'
+        return 'multiple'
@@ -21,6 +21,7 @@
 """
 import logging
 from scipy.signal import savgol_filter
+from scipy.ndimage import correlate1d
 import numpy as np
 from savu.plugins.filters.base_filter import BaseFilter
 from savu.plugins.driver.cpu_plugin import CpuPlugin
@@ -47,43 +48,72 @@ class StripBackground(BaseFilter, CpuPlugin):
         logging.debug("Stripping background")
         super(StripBackground, self).__init__("StripBackground")
 
+    def pre_process(self):
+        in_pData = self.get_plugin_in_datasets()[0]
+        self.spectrum_dim = in_pData.get_core_dimensions()[0]
+        npts = in_pData.get_shape()[self.spectrum_dim]
+        self.window_sl = self._get_window_slices(npts)
+        self.sg_kernels = self._get_savgol_kernels(
+            self.parameters['SG_width'], self.parameters['SG_polyorder'])
+
+    def _get_window_slices(self, npts):
+        """ Slices for the rolling window average of each point with the
+        points +/- the half width either side (only the point above at the
+        lower edge).  Points within the half width of the upper edge are not
+        stripped. """
+        w = self.parameters['window']
+        return {'main': slice(w, npts-w), 'bottom': slice(0, npts-2*w),
+                'top': slice(2*w, npts), 'bottom_edge': slice(0, w),
+                'bottom_rest': slice(w, 2*w), 'stripped': slice(0, npts-w)}
+
+    def _get_savgol_kernels(self, width, polyorder):
+        """ The Savitzky-Golay filter (mode 'interp') is linear, so the
+        central convolution kernel and the matrices giving the polynomial
+        fits at each edge are the rows of the filter applied to an identity.
+        """
+        kernels = savgol_filter(np.eye(width), width, polyorder, axis=0)
+        half = width/2
+        return kernels[half], kernels[:half], kernels[half+1:]
+
+    def _smooth(self, data):
+        """ Apply the Savitzky-Golay filter to each row of the data. """
+        centre, lower, upper = self.sg_kernels
+        width = len(centre)
+        half = width/2
+        smoothed = correlate1d(data, centre, axis=-1, mode='constant')
+        smoothed[:, :half] = np.dot(data[:, :width], lower.T)
+        smoothed[:, -half:] = np.dot(data[:, -width:], upper.T)
+        return smoothed
+
     def process_frames(self, data):
-        data = data[0]
+        data = np.rollaxis(data[0], self.spectrum_dim, data[0].ndim)
+        shape = data.shape
+        data = data.reshape(-1, shape[-1]).astype(np.float64)
         t1 = time.time()
         its = self.parameters['iterations']
-        w = self.parameters['window']
         smoothed = self.parameters['SG_filter_iterations']
-        SGwidth = self.parameters['SG_width']
-        SGpoly = self.parameters['SG_polyorder']
-
-        npts = len(data)
-        x = np.arange(npts)  # set up some x indices
-        #print data.shape
-        filtered = savgol_filter(data, 35, 5) # make the start a bit a bit smoother
-        # lets do it the crap, slow way first
-        aved = np.zeros_like(filtered)
-        bottomedgemain = x < w
-        bottomedgerest = (x >= w) & (x < 2*w)
-
-        mainpart = (x >= w) & (x < (npts-w))
-        mainpartbottom = (x >= 0) & (x < (npts-2*w))
-        mainparttop = (x >= 2*w) & (x < (npts))
-
-        topedgemain = x >= (npts-w)
-        topedgerest = (x >= (npts-2*w)) & (x >= (npts-w))
+        sl = self.window_sl
 
+        # make the start a bit smoother
+        filtered = self._smooth(data)
+        aved = np.empty_like(filtered[:, sl['stripped']])
         for k in range(its):
-            aved[mainpart] = (filtered[mainpartbottom] + filtered[mainpart] + filtered[mainparttop])/3. # works
-            aved[bottomedgemain] = (filtered[bottomedgemain] + filtered[bottomedgerest])/2.
-            aved[topedgemain] = (filtered[topedgemain] + filtered[topedgerest])/2.
-            filtered[aved<filtered] = aved[aved<filtered]
-            if not (k/float(smoothed)-k/int(smoothed)):
-                filtered=savgol_filter(filtered,35,5)
+            # strip all spectra in the block simultaneously
+            aved[:, sl['main']] = (filtered[:, sl['bottom']] +
+                                   filtered[:, sl['main']] +
+                                   filtered[:, sl['top']])/3.
+            aved[:, sl['bottom_edge']] = (filtered[:, sl['bottom_edge']] +
+                                          filtered[:, sl['bottom_rest']])/2.
+            stripped = filtered[:, sl['stripped']]
+            np.minimum(stripped, aved, out=stripped)
+            if not k % smoothed:
+                filtered = self._smooth(filtered)
 
         t2 = time.time()
         logging.debug("Strip iteration took: %s ms", str((t2-t1)*1e3))
-#         print (data - filtered).shape
-        return [data - filtered, filtered]
+        filtered = filtered.reshape(shape)
+        result = [data.reshape(shape) - filtered, filtered]
+        return [np.rollaxis(r, r.ndim-1, self.spectrum_dim) for r in result]
 
     def setup(self):
         logging.debug('setting up the background subtraction')
@@ -110,7 +140,7 @@ class StripBackground(BaseFilter, CpuPlugin):
                       stripped.get_axis_labels())
 
     def get_max_frames(self):
-        return 'single'
-        
+        return 'multiple'
+
     def nOutput_datasets(self):
         return 2
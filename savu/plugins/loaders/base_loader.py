@@ -21,6 +21,11 @@
 
 """
 
+import h5py
+import pickle
+from mpi4py import MPI
+
+import savu.core.progressive as progressive
 from savu.plugins.plugin import Plugin
 
 
@@ -54,10 +59,40 @@ class BaseLoader(Plugin):
     def get_experiment(self):
         return self.exp
 
+    def _get_metadata(self, func, *args):
+        """ Read metadata from file on a single process and broadcast it to
+        all other processes, so that only the bulk data is read by every
+        process.  This must be called by all processes.
+
+        :param func: A function that reads and returns the metadata.
+        :returns: The value returned by ``func`` on the root process, with
+            any hdf5 dataset read into a numpy array.
+        """
+        if not self.exp.meta_data.get('mpi'):
+            return self.__read_metadata(func, *args)
+
+        comm = MPI.COMM_WORLD
+        result = None
+        if comm.rank == 0:
+            # pickle here so that unpicklable values raise on all processes
+            try:
+                value = self.__read_metadata(func, *args)
+                result = pickle.dumps((value, None), pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                result = pickle.dumps((None, e), pickle.HIGHEST_PROTOCOL)
+        value, error = pickle.loads(comm.bcast(result, root=0))
+        if error is not None:
+            raise error
+        return value
+
+    def __read_metadata(self, func, *args):
+        value = func(*args)
+        return value[...] if isinstance(value, h5py.Dataset) else value
+
     def set_data_reduction_params(self, data_obj):
         pDict = self.parameters
         self.data_mapping()
-        data_obj.get_preview().set_preview(pDict['preview'], load=True)
+        progressive.set_preview(data_obj, pDict['preview'])
         self.reduction_flag = True
 
     def get_NXapp(self, ltype, nx_file, entry):
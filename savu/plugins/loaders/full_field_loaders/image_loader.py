@@ -48,6 +48,11 @@ class ImageLoader(BaseLoader):
     folder path if different from the data. Default: None.
     :param flat_prefix: A file prefix for the flat field files, including the\
     folder path if different from the data. Default: None.
+    :param decode_threads: The number of threads used to decode image \
+    files. Default: 4.
+    :param frame_cache: The maximum number of decoded frames to keep in \
+    memory (None for twice the frames in a transfer, up to a maximum of \
+    1GB). Default: None.
     """
 
     def __init__(self, name='ImageLoader'):
@@ -111,7 +116,9 @@ class ImageLoader(BaseLoader):
 
     def _get_data_type(self, obj, path):
         prefix = self.parameters['data_prefix']
-        return FabIO(path, obj, [self.parameters['frame_dim']], None, prefix)
+        return FabIO(path, obj, [self.parameters['frame_dim']], None, prefix,
+                     nThreads=self.parameters['decode_threads'],
+                     cache_size=self.parameters['frame_cache'])
 
     def set_rotation_angles(self, data_obj):
         angles = self.parameters['angles']
@@ -30,6 +30,7 @@ from savu.plugins.loaders.base_loader import BaseLoader
 from savu.plugins.utils import register_plugin
 from savu.data.data_structures.data_types.data_plus_darks_and_flats \
     import ImageKey, NoImageKey
+from savu.data.data_structures.data_types.streaming_data import StreamingData
 
 
 @register_plugin
@@ -60,10 +61,19 @@ class NxtomoLoader(BaseLoader):
 
         data_obj = exp.create_data_object('in_data', self.parameters['name'])
 
-        data_obj.backing_file = \
-            h5py.File(self.exp.meta_data.get("data_file"), 'r')
+        fname = self.exp.meta_data.get("data_file")
+        self.stream = \
+            self.exp.meta_data.get_dictionary().get('stream', False)
+        if self.stream:
+            # the file is still being written
+            data_obj.backing_file = \
+                h5py.File(fname, 'r', libver='latest', swmr=True)
+        else:
+            data_obj.backing_file = h5py.File(fname, 'r')
 
         data_obj.data = data_obj.backing_file[self.parameters['data_path']]
+        if self.stream:
+            data_obj.data = self.__get_streaming_data(data_obj.data)
 
         self._set_dark_and_flat(data_obj)
 
@@ -81,8 +91,10 @@ class NxtomoLoader(BaseLoader):
             self._set_rotation_angles(data_obj)
 
         try:
-            control = data_obj.backing_file['entry1/tomo_entry/control/data']
-            data_obj.meta_data.set("control", control[...])
+            control = self._get_metadata(
+                self.__read, data_obj.backing_file,
+                'entry1/tomo_entry/control/data')
+            data_obj.meta_data.set("control", control)
         except:
             logging.warn("No Control information available")
 
@@ -93,6 +105,33 @@ class NxtomoLoader(BaseLoader):
         self.set_data_reduction_params(data_obj)
         data_obj.data._set_dark_and_flat()
 
+    def __get_streaming_data(self, data):
+        options = self.exp.meta_data.get_dictionary()
+        nFrames = options.get('stream_frames', None)
+        nFrames = nFrames if nFrames else data.maxshape[0]
+        if not nFrames:
+            raise Exception("The total number of frames in the growing "
+                            "dataset is unknown: please set stream_frames.")
+        stream = StreamingData(
+            data, (nFrames,) + data.shape[1:], dim=0,
+            poll=options.get('stream_poll', 1.0),
+            timeout=options.get('stream_timeout', 600.0))
+        cu.user_message("Streaming the input data: %i of %i frames written."
+                        % (stream.get_nframes(), nFrames))
+        return stream
+
+    def __check_stream_image_key(self, data_obj, image_key):
+        """ The image key must be complete at setup if the data is streamed.
+        """
+        nFrames = data_obj.data.get_shape()[0]
+        if self.stream and image_key is not None and \
+                len(image_key) < nFrames:
+            raise Exception(
+                "Only %i of the %i image key entries have been written: "
+                "streaming requires the complete image key at the start of "
+                "the scan, or separate dark and flat fields."
+                % (len(image_key), nFrames))
+
     def _setup_3d(self, data_obj):
         logging.debug("Setting up 3d tomography data.")
         rot = 0
@@ -140,12 +179,17 @@ class NxtomoLoader(BaseLoader):
         else:
             self.__set_separate_dark_and_flat(data_obj)
 
+    def __read(self, nxs_file, entry):
+        return nxs_file[entry][...]
+
     def __find_dark_and_flat(self, data_obj, flat=None, dark=None):
         ignore = self.parameters['ignore_flats'] if \
             self.parameters['ignore_flats'] else None
         try:
-            image_key = data_obj.backing_file[
-                'entry1/tomo_entry/instrument/detector/image_key'][...]
+            image_key = self._get_metadata(
+                self.__read, data_obj.backing_file,
+                'entry1/tomo_entry/instrument/detector/image_key')
+            self.__check_stream_image_key(data_obj, image_key)
             data_obj.data = \
                 ImageKey(data_obj, image_key, 0, ignore=ignore)
         except KeyError:
@@ -165,10 +209,12 @@ class NxtomoLoader(BaseLoader):
 
     def __set_separate_dark_and_flat(self, data_obj):
         try:
-            image_key = data_obj.backing_file[
-                'entry1/tomo_entry/instrument/detector/image_key'][...]
+            image_key = self._get_metadata(
+                self.__read, data_obj.backing_file,
+                'entry1/tomo_entry/instrument/detector/image_key')
         except:
             image_key = None
+        self.__check_stream_image_key(data_obj, image_key)
         data_obj.data = NoImageKey(data_obj, image_key, 0)
         self.__set_data(data_obj, 'flat', data_obj.data._set_flat_path)
         self.__set_data(data_obj, 'dark', data_obj.data._set_dark_path)
@@ -183,8 +229,9 @@ class NxtomoLoader(BaseLoader):
 
         ffile = h5py.File(path, 'r')
         try:
-            image_key = \
-                ffile['entry1/tomo_entry/instrument/detector/image_key'][...]
+            image_key = self._get_metadata(
+                self.__read, ffile,
+                'entry1/tomo_entry/instrument/detector/image_key')
             func(ffile[entry], imagekey=image_key)
         except:
             func(ffile[entry])
@@ -192,10 +239,22 @@ class NxtomoLoader(BaseLoader):
         data_obj.data._set_scale(name, scale)
 
     def _set_rotation_angles(self, data_obj):
+        angles = self._get_metadata(self.__get_rotation_angles, data_obj)
+        data_obj.meta_data.set("rotation_angle", angles)
+        return len(angles)
+
+    def __get_rotation_angles(self, data_obj):
         angles = self.parameters['angles']
         if angles is None:
             try:
                 entry = 'entry1/tomo_entry/data/rotation_angle'
+                if self.stream and data_obj.backing_file[entry].shape[0] < \
+                        len(data_obj.data.get_image_key()):
+                    cu.user_message(
+                        "The rotation angles have not all been written, so "
+                        "they are assumed to be evenly spaced in [0, 180]: "
+                        "please set the angles if they are not.")
+                    return np.linspace(0, 180, data_obj.data.get_shape()[0])
                 angles = data_obj.backing_file[entry][
                     (data_obj.data.get_image_key()) == 0, ...]
             except KeyError:
@@ -209,9 +268,7 @@ class NxtomoLoader(BaseLoader):
                     angles = np.loadtxt(angles)
                 except:
                     raise Exception('Cannot set angles in loader.')
-
-        data_obj.meta_data.set("rotation_angle", angles)
-        return len(angles)
+        return angles
 
     def __check_angles(self, data_obj, n_angles):
         data_angles = data_obj.data.get_shape()[0]
@@ -38,7 +38,8 @@ class BaseMultiModalLoader(BaseLoader):
     def multi_modal_setup(self, ltype, data_str, name, patterns=True):
         data_obj = self._get_file_handle(name, ltype)
         NXdef = 'NXstxm' if ltype == 'NXmonitor' else ltype
-        entry = self.get_NXapp(NXdef, data_obj.backing_file, 'entry1/')[0]
+        entry = data_obj.backing_file[self._get_metadata(
+            self.__get_NXapp_name, NXdef, data_obj.backing_file)]
 
         path = ('/').join([entry.name, data_str])
         data_obj.data = data_obj.backing_file[path]
@@ -57,36 +58,49 @@ class BaseMultiModalLoader(BaseLoader):
                       data_obj.backing_file.filename, ltype)
         return data_obj
 
+    def __get_NXapp_name(self, ltype, nx_file):
+        return self.get_NXapp(ltype, nx_file, 'entry1/')[0].name
+
     def _check_for_monitor_data(self, data_obj, entry):
-        if entry.name + '/monitor/data' in data_obj.backing_file:
-            control = data_obj.backing_file[entry.name + '/monitor/data']
+        control = self._get_metadata(self.__get_monitor_data, data_obj, entry)
+        if control is not None:
             self.exp.meta_data.set('control', control)
             logging.debug('adding the ion chamber to the meta data')
         else:
             logging.warn('No ion chamber information. Leaving this blank')
 
+    def __get_monitor_data(self, data_obj, entry):
+        if entry.name + '/monitor/data' in data_obj.backing_file:
+            return data_obj.backing_file[entry.name + '/monitor/data']
+        return None
+
     def set_motors(self, data_obj, entry, ltype):
+        labels, values, units, self._mtype = \
+            self._get_metadata(self.__get_motors, entry)
+        self._set_axis_labels(data_obj, values, labels, units)
+
+    def __get_motors(self, entry):
         labels = list(entry['data'].attrs['axes'])
         motors = [entry['data/' + e] for e in labels]
         units = self._get_attrs(motors, 'units', 'unit')
-        self._mtype = self._get_attrs(motors, 'transformation_type', 'None')
-        self._set_axis_labels(data_obj, motors, labels, units)
+        mtype = self._get_attrs(motors, 'transformation_type', 'None')
+        return labels, [m.value for m in motors], units, mtype
 
     def _get_attrs(self, entries, key, default):
         return [e.attrs[key] if key in e.attrs.keys() else
                 default for e in entries]
 
-    def _set_axis_labels(self, dObj, motors, labels, units):
+    def _set_axis_labels(self, dObj, values, labels, units):
         trans = self.get_motor_dims('translation')
         rot_dim = self._mtype.index('rotation')
-        angles = motors[rot_dim].value
+        angles = values[rot_dim]
         labels[rot_dim] = 'rotation_angle'
         self._set_meta_data(dObj, 'rotation_angle', angles)
         if trans:
-            self._set_meta_data(dObj, 'x', motors[trans[-1]].value)
+            self._set_meta_data(dObj, 'x', values[trans[-1]])
             labels[trans[-1]] = 'x'
             if len(trans) > 1:
-                self._set_meta_data(dObj, 'y', motors[trans[-2]].value)
+                self._set_meta_data(dObj, 'y', values[trans[-2]])
                 labels[trans[-2]] = 'y'
         labels = [labels[i] + '.' + units[i] for i in range(len(labels))]
         dObj.set_axis_labels(*tuple(labels))
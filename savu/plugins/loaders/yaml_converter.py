@@ -51,10 +51,10 @@ class YamlConverter(BaseLoader):
         if self.parameters['yaml_file'] is None:
             raise Exception('Please pass a yaml file to the yaml loader.')
 
-        data_dict = yu.read_yaml(self.parameters['yaml_file'])
-        data_dict = self._check_for_inheritance(data_dict, {})
+        # the yaml files are read on one process only during a run
+        data_dict = self.__read_description() if template else \
+            self._get_metadata(self.__read_description)
         self._check_for_imports(data_dict)
-        data_dict.pop('inherit', None)
         data_dict.pop('import', None)
         if template:
             return data_dict
@@ -62,6 +62,12 @@ class YamlConverter(BaseLoader):
         data_dict = self._add_template_updates(data_dict)
         self._set_entries(data_dict)
 
+    def __read_description(self):
+        data_dict = yu.read_yaml(self.parameters['yaml_file'])
+        data_dict = self._check_for_inheritance(data_dict, {})
+        data_dict.pop('inherit', None)
+        return data_dict
+
     def _add_template_updates(self, ddict):
         all_entries = ddict.pop('all', {})
         for key, value in all_entries:
@@ -196,7 +202,10 @@ class YamlConverter(BaseLoader):
         for d in dims:
             self._check_label_entry(labels[d])
             l = labels[d]
-            for key in l.keys():
+            # the axis values are often read from file
+            l['value'] = self._get_metadata(self.update_value, dObj,
+                                            l['value'])
+            for key in set(l.keys()) - set(['value']):
                 l[key] = self.update_value(dObj, l[key])
             axis_labels[l['dim']] = (l['name'] + '.' + l['units'])
             if l['value'] is not None:
@@ -219,5 +228,5 @@ class YamlConverter(BaseLoader):
 
     def _set_metadata(self, dObj, mdata):
         for key, value in mdata.iteritems():
-            value = self.update_value(dObj, value['value'])
+            value = self._get_metadata(self.update_value, dObj, value['value'])
             dObj.meta_data.set(key, value)
@@ -27,6 +27,7 @@ import logging
 import inspect
 import numpy as np
 
+import savu.plugins.plugin_index as pi
 import savu.plugins.docstring_parser as doc
 from savu.plugins.plugin_datasets import PluginDatasets
 
@@ -124,17 +125,41 @@ class Plugin(PluginDatasets):
         class docstring such as this
 
         :param error_threshold: Convergence threshold. Default: 0.001.
+
+        The parameter information is taken from the plugin index, if the
+        plugin has been indexed, to avoid parsing the docstrings.
+        """
+        params = pi.get_indexed_parameters(self.__class__)
+        if params is None:
+            params = self._get_docstring_parameters()
+
+        for name, item in params['parameters'].iteritems():
+            self.parameters[name] = item['default']
+            self.parameters_types[name] = type(item['default'])
+            self.parameters_desc[name] = item['desc']
+        self.docstring_info.update(params['docstring_info'])
+        self.parameters_hide = params['hide']
+        self.parameters_user = params['user']
+        self.final_parameter_updates()
+
+    def _get_docstring_parameters(self):
+        """ Parse the docstrings of the plugin and its base classes.
+
+        :returns: A dictionary of parameters (with their default values and
+            descriptions), hidden and user parameter names and docstring info.
+        :rtype: dict
         """
         hidden_items = []
         user_items = []
         params = []
         not_params = []
+        docstring_info = {}
         for clazz in inspect.getmro(self.__class__)[::-1]:
             if clazz != object:
                 desc = doc.find_args(clazz, self)
-                self.docstring_info['warn'] = desc['warn']
-                self.docstring_info['info'] = desc['info']
-                self.docstring_info['synopsis'] = desc['synopsis']
+                docstring_info['warn'] = desc['warn']
+                docstring_info['info'] = desc['info']
+                docstring_info['synopsis'] = desc['synopsis']
                 params.extend(desc['param'])
                 if desc['hide_param']:
                     hidden_items.extend(desc['hide_param'])
@@ -142,20 +167,16 @@ class Plugin(PluginDatasets):
                     user_items.extend(desc['user_param'])
                 if desc['not_param']:
                     not_params.extend(desc['not_param'])
-        self._add_item(params, not_params)
+        true_list = [i for i in params if i['name'] not in not_params]
+        parameters = {}
+        for item in true_list:
+            parameters[item['name']] = \
+                {'default': item['default'], 'desc': item['desc']}
         user_items = [u for u in user_items if u not in not_params]
         hidden_items = [h for h in hidden_items if h not in not_params]
         user_items = list(set(user_items).difference(set(hidden_items)))
-        self.parameters_hide = hidden_items
-        self.parameters_user = user_items
-        self.final_parameter_updates()
-
-    def _add_item(self, item_list, not_list):
-        true_list = [i for i in item_list if i['name'] not in not_list]
-        for item in true_list:
-            self.parameters[item['name']] = item['default']
-            self.parameters_types[item['name']] = item['dtype']
-            self.parameters_desc[item['name']] = item['desc']
+        return {'parameters': parameters, 'hide': hidden_items,
+                'user': user_items, 'docstring_info': docstring_info}
 
     def delete_parameter_entry(self, param):
         if param in self.parameters.keys():
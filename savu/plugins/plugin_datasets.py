@@ -192,6 +192,19 @@ class PluginDatasets(object):
             meta_data.append(data.meta_data)
         return meta_data
 
+    def _get_transfer_nbytes(self, minimum=False):
+        """ The memory (in bytes) used by the data transfers of all the plugin
+        datasets, with the maximum number of frames per transfer or, if
+        minimum is True, the number of frames processed at a time. """
+        nbytes = 0
+        for pData in [p for d in self.get_plugin_datasets() for p in d]:
+            mft = pData.meta_data.get_dictionary().get(
+                'max_frames_transfer', None)
+            if mft:
+                nFrames = pData._get_max_frames_process() if minimum else mft
+                nbytes += pData._get_transfer_nbytes(nFrames)
+        return nbytes
+
     def _set_unknown_shape(self, data, key):
         try:
             return (len(data.meta_data.get(key)),)
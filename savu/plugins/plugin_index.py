@@ -0,0 +1,283 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: plugin_index
+   :platform: Unix
+   :synopsis: A persisted index of the available plugins, their docstring \
+       parameters and dataset counts, so plugins can be listed and populated \
+       with default parameters without importing their modules.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import json
+import inspect
+import logging
+import importlib
+
+import savu
+import savu.plugins.utils as pu
+import savu.data.data_structures.utils as du
+
+INDEX_VERSION = 2
+
+
+def get_index_file():
+    """ The location of the plugin index, which can be set with the
+    SAVU_PLUGIN_INDEX environment variable. """
+    default = os.path.join(os.path.expanduser("~"), '.savu',
+                           'plugin_index.json')
+    return os.getenv("SAVU_PLUGIN_INDEX", default)
+
+
+def load_plugin_index(update=False, rebuild=False):
+    """ Load the plugin index into ``savu.plugins.utils.plugin_index``.
+
+    Entries whose source files (including those of their base classes) have
+    changed since the index was created are discarded.
+
+    :param bool update: Re-index (import) new and modified plugin modules and
+        save the updated index.
+    :param bool rebuild: Re-index all plugin modules, including those that
+        previously failed to import.
+    :returns: The plugin index dictionary.
+    """
+    index = __read_index() if not rebuild else None
+    index = index if index else {'version': INDEX_VERSION, 'modules': {},
+                                 'plugins': {}}
+    modules = __find_plugin_modules()
+    stale = __remove_stale_entries(index, modules)
+
+    if update or rebuild:
+        new = [p for p in modules if p not in index['modules']]
+        for path in sorted(set(stale + new)):
+            __index_module(index, path, modules[path])
+        __write_index(index)
+
+    pu.plugin_index.clear()
+    pu.plugin_index.update(index['plugins'])
+    return pu.plugin_index
+
+
+def set_plugin_index(plugins):
+    """ Set the plugin index entries (e.g. received from another process).
+    """
+    pu.plugin_index.clear()
+    pu.plugin_index.update(plugins)
+
+
+def get_indexed_parameters(clazz):
+    """ Get the docstring parameter information for a plugin class from the
+    index, or None if the class is not (correctly) indexed. """
+    entry = pu.plugin_index.get(clazz.__name__, None)
+    if not entry or entry['id'] != clazz.__module__ or entry['dynamic']:
+        return None
+    params = {}
+    for name, value in entry['parameters'].iteritems():
+        params[name] = {'default': eval(value['default']),
+                        'desc': value['desc']}
+    return {'parameters': params, 'hide': list(entry['hide']),
+            'user': list(entry['user']),
+            'docstring_info': dict(entry['docstring_info'])}
+
+
+def __find_plugin_modules():
+    """ Find all savu and user plugin modules.
+
+    :returns: A dictionary of {path: module name}.
+    """
+    modules = {}
+    for path in pu.get_plugins_paths()[:-1]:
+        if os.path.isdir(path):
+            modules.update(__find_modules(path, ''))
+    plugin_path = os.path.join(savu.__path__[0], 'plugins')
+    modules.update(__find_modules(plugin_path, 'savu.plugins.'))
+    return modules
+
+
+def __find_modules(folder, prefix):
+    """ Find python modules in a folder, descending into packages only. """
+    modules = {}
+    for fname in os.listdir(folder):
+        path = os.path.join(folder, fname)
+        if os.path.isdir(path):
+            if os.path.exists(os.path.join(path, '__init__.py')):
+                modules.update(__find_modules(path, prefix + fname + '.'))
+        elif fname.endswith('.py') and fname != '__init__.py':
+            modules[os.path.abspath(path)] = prefix + fname[:-3]
+    return modules
+
+
+def __get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def __remove_stale_entries(index, modules):
+    """ Remove index entries for modified or deleted files.
+
+    :returns: The paths of the existing modules that require re-indexing.
+    """
+    stale = []
+    for path, entry in index['modules'].items():
+        if path not in modules:
+            del index['modules'][path]
+        elif __get_mtime(path) != entry['mtime']:
+            stale.append(path)
+
+    for name, entry in index['plugins'].items():
+        depends = entry['depends'].iteritems()
+        if entry['file'] in stale or \
+                any(__get_mtime(f) != m for f, m in depends):
+            del index['plugins'][name]
+            if entry['file'] in modules:
+                stale.append(entry['file'])
+    return stale
+
+
+def __index_module(index, path, module_name):
+    """ Import a plugin module and add its plugins to the index. """
+    entry = {'module': module_name, 'mtime': __get_mtime(path),
+             'plugins': [], 'error': False}
+    index['modules'][path] = entry
+    try:
+        module = importlib.import_module(module_name)
+    except Exception as e:
+        logging.debug("Unable to index the plugin module %s: %s",
+                      module_name, e)
+        entry['error'] = True
+        return
+
+    for name, clazz in inspect.getmembers(module, inspect.isclass):
+        if clazz.__module__ != module.__name__ or \
+                pu.plugins.get(name, None) is not clazz:
+            continue
+        try:
+            index['plugins'][name] = __get_plugin_entry(clazz, path)
+            entry['plugins'].append(name)
+        except Exception as e:
+            logging.debug("Unable to index the plugin %s: %s", name, e)
+
+
+def __get_plugin_entry(clazz, path):
+    plugin = clazz()
+    mro = [c for c in inspect.getmro(clazz) if c is not object]
+    # the parameters of plugins that update them in final_parameter_updates
+    # are not indexed, as the update is not run when adding from the index
+    dynamic = any(not c.__doc__ for c in mro) or \
+        __overrides_parameter_updates(clazz)
+    params = plugin._get_docstring_parameters() if not dynamic else \
+        {'parameters': {}, 'hide': [], 'user': [], 'docstring_info': {}}
+    # parameter defaults are stored as their repr
+    for value in params['parameters'].values():
+        try:
+            dynamic |= eval(repr(value['default'])) != value['default']
+        except Exception:
+            dynamic = True
+
+    dawn = pu.dawn_plugins.get(clazz.__name__, None)
+    if dawn is not None:
+        dawn = {'path2plugin': dawn['path2plugin'],
+                'plugin_output_type': dawn['plugin_output_type'],
+                'input rank': du.get_pattern_rank(plugin.get_plugin_pattern()),
+                'description': clazz.__doc__.split(':param')[0]}
+
+    depends = {}
+    for c in mro:
+        fname = __get_source_file(c)
+        if fname:
+            depends[fname] = __get_mtime(fname)
+
+    return {'id': clazz.__module__,
+            'name': plugin.name,
+            'file': path,
+            'depends': depends,
+            'dynamic': dynamic,
+            'parameters': dict((k, {'default': repr(v['default']),
+                                    'desc': v['desc']}) for k, v in
+                               params['parameters'].iteritems()),
+            'hide': params['hide'],
+            'user': params['user'],
+            'docstring_info': params['docstring_info'],
+            'nInput_datasets': plugin.nInput_datasets(),
+            'nOutput_datasets': plugin.nOutput_datasets(),
+            'dawn': dawn}
+
+
+def __overrides_parameter_updates(clazz):
+    from savu.plugins.plugin import Plugin
+    return clazz.final_parameter_updates.im_func is not \
+        Plugin.final_parameter_updates.im_func
+
+
+def __get_source_file(clazz):
+    fname = getattr(sys.modules.get(clazz.__module__, None), '__file__', None)
+    if not fname:
+        return None
+    return os.path.abspath(os.path.splitext(fname)[0] + '.py')
+
+
+def __read_index():
+    fname = get_index_file()
+    if not os.path.exists(fname):
+        return None
+    try:
+        with open(fname, 'r') as f:
+            index = __byteify(json.load(f))
+    except (IOError, ValueError) as e:
+        logging.warn("Unable to read the plugin index %s: %s", fname, e)
+        return None
+    return index if index.get('version', None) == INDEX_VERSION else None
+
+
+def __write_index(index):
+    fname = get_index_file()
+    temp = fname + '.' + str(os.getpid())
+    try:
+        if not os.path.exists(os.path.dirname(fname)):
+            os.makedirs(os.path.dirname(fname))
+        with open(temp, 'w') as f:
+            json.dump(index, f)
+        os.rename(temp, fname)
+    except (IOError, OSError) as e:
+        logging.warn("Unable to write the plugin index %s: %s", fname, e)
+
+
+def __byteify(value):
+    if isinstance(value, dict):
+        return dict((__byteify(k), __byteify(v)) for k, v in
+                    value.iteritems())
+    elif isinstance(value, list):
+        return [__byteify(v) for v in value]
+    elif isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+def main():
+    """ Rebuild the plugin index. """
+    pu.get_plugins_paths()
+    index = load_plugin_index(rebuild=True)
+    print("The plugin index %s contains %i plugins." %
+          (get_index_file(), len(index)))
+
+
+if __name__ == '__main__':
+    main()
@@ -38,52 +38,89 @@ class SimpleRecon(BaseRecon, CpuPlugin):
 
     def __init__(self):
         super(SimpleRecon, self).__init__("SimpleRecon")
+        self.indices = None
+        self.indices_centre = None
+
+    def pre_process(self):
+        """ Cache the back projection geometry, which is the same for all
+        sinograms. """
+        vol_shape = self.get_plugin_out_datasets()[0].get_core_shape()
+        try:
+            centre = self.kwargs['centre']
+        except:
+            centre = (vol_shape[0]/2, vol_shape[1]/2)
+        nAngles = self.get_plugin_in_datasets()[0].get_core_shape()[0]
+        theta = np.arange(nAngles)*(np.pi/nAngles)
+        self.x, self.y = np.meshgrid(
+            np.arange(-centre[0], vol_shape[0] - centre[0]),
+            np.arange(-centre[1], vol_shape[1] - centre[1]))
+        self.cos, self.sin = np.cos(theta), np.sin(theta)
+
+        # the detector indices of all voxels are cached, for the current
+        # centre of rotation, if they fit in the memory of this process
+        nbytes = nAngles*self.x.size*np.dtype(np.int32).itemsize
+        budget = self.exp.meta_data.get_dictionary().get(
+            'rank_memory_budget', None)
+        self.cache_indices = bool(budget) and nbytes < budget/4
+        self.indices = None
+        self.indices_centre = None
 
     def _filter(self, sinogram):
-        ff = np.arange(sinogram.shape[0])
-        ff -= sinogram.shape[0]/2
+        """ Ramp filter the rows of one or more sinograms. """
+        ff = np.arange(sinogram.shape[-1])
+        ff -= sinogram.shape[-1]/2
         ff = np.abs(ff)
-        fs = np.fft.fft(sinogram)
+        fs = np.fft.fft(sinogram, axis=-1)
         ffs = fs*ff
-        return np.fft.ifft(ffs).real
+        return np.fft.ifft(ffs, axis=-1).real
+
+    def _back_project(self, sino, centre):
+        """ Back project a stack of (padded) filtered sinograms, with shape
+        (angles, detector, sinograms), that share a centre of rotation. """
+        result = np.zeros(self.x.shape + sino.shape[2:], dtype=np.float32)
+        for i, indices in enumerate(self.__get_indices(centre)):
+            result += np.take(sino[i], indices, axis=0)
+        return result
 
-    def _back_project(self, mapping, sino_element, centre):
-        mapping_array = mapping+centre
-        return sino_element[mapping_array.astype('int')]
+    def __get_indices(self, centre):
+        """ The detector index of each voxel, for each angle in turn. """
+        if not self.cache_indices:
+            return ((self._mapping_array(i) + centre).astype('int')
+                    for i in range(len(self.cos)))
+        if self.indices_centre != centre:
+            self.indices = np.empty((len(self.cos),) + self.x.shape,
+                                    dtype=np.int32)
+            for i in range(len(self.cos)):
+                self.indices[i] = self._mapping_array(i) + centre
+            self.indices_centre = centre
+        return self.indices
 
-    def _mapping_array(self, shape, center, theta):
-        x, y = np.meshgrid(np.arange(-center[0], shape[0] - center[0]),
-                           np.arange(-center[1], shape[1] - center[1]))
-        return x*np.cos(theta) - y*np.sin(theta)
+    def _mapping_array(self, i):
+        """ The detector position of each voxel for angle i. """
+        return self.x*self.cos[i] - self.y*self.sin[i]
 
     def process_frames(self, data):
-        sino = data[0]
         centre_of_rotations, angles, vol_shape, init = self.get_frame_params()
-        sinogram = sino[:, np.newaxis, :]
-        try:
-            centre = self.kwargs['centre']
-        except:
-            centre = (vol_shape[0]/2, vol_shape[1]/2)
+        sinogram = data[0] if data[0].ndim == 3 else data[0][:, np.newaxis]
+        nAngles, nFrames, width = sinogram.shape
+        cors = centre_of_rotations[:nFrames]
 
-        results = []
-        for j in range(sinogram.shape[1]):
-            result = np.zeros(vol_shape, dtype=np.float32)
-            for i in range(sinogram.shape[0]):
-                theta = i*(np.pi/sinogram.shape[0])
-                mapping_array = self._mapping_array(vol_shape, centre, theta)
-                filt = np.zeros(sinogram.shape[2]*3, dtype=np.float32)
-                filt[sinogram.shape[2]:sinogram.shape[2]*2] = \
-                    self._filter(np.log(np.nan_to_num(sinogram[i, j, :])+1))
-                result += \
-                    self._back_project(mapping_array, filt,
-                                       (centre_of_rotations +
-                                           sinogram.shape[2]))
-            results.append(result[:, np.newaxis, :])
-        result = np.hstack(results)
-        return result
+        filt = np.zeros((nAngles, width*3, nFrames), dtype=np.float32)
+        filt[:, width:width*2] = np.transpose(
+            self._filter(np.log(np.nan_to_num(sinogram)+1)), (0, 2, 1))
+
+        result = np.empty(self.x.shape + (nFrames,), dtype=np.float32)
+        for cor in np.unique(cors):
+            frames = np.where(cors == cor)[0] if len(cors) > 1 else \
+                slice(None)
+            result[..., frames] = self._back_project(
+                filt[..., frames], cor + width)
+
+        result = np.transpose(result, (0, 2, 1))
+        return result if data[0].ndim == 3 else result[:, 0]
 
     def get_max_frames(self):
-        return 'single'
+        return 'multiple'
 
     def get_citation_information(self):
         cite_info = CitationInformation()
@@ -22,7 +22,6 @@
 """
 import logging
 import numpy
-import skimage.measure as skim
 
 from savu.plugins.plugin import Plugin
 from savu.plugins.driver.cpu_plugin import CpuPlugin
@@ -37,6 +36,8 @@ class DownsampleFilter(Plugin, CpuPlugin):
     :u*param bin_size: Bin Size for the downsample. Default: 2.
     :u*param mode: One of 'mean', 'median', 'min', 'max'. Default: 'mean'.
     :u*param pattern: One of 'PROJECTION' or 'SINOGRAM'. Default: 'PROJECTION'.
+    :u*param slice_bin_size: Bin size in the slice dimension of the pattern \
+        (1 to downsample each frame separately). Default: 1.
     """
 
     def __init__(self):
@@ -50,27 +51,40 @@ class DownsampleFilter(Plugin, CpuPlugin):
                            'max'   : numpy.max }
 
     def get_output_shape(self, input_data):
-        input_shape = input_data.get_shape()
-        core_dirs = input_data.get_core_directions()
-        output_shape = []
-        for i in range(len(input_shape)):
-            if i in core_dirs:
-                output_shape.append(input_shape[i]/self.parameters['bin_size'])
-            else:
-                output_shape.append(input_shape[i])
-        
-        return output_shape
+        return self.new_shape(input_data.get_shape(), input_data)
 
-    def process_frames(self, data):
-        logging.debug("Running Downsample data")
+    def pre_process(self):
         if self.parameters['mode'] in self.mode_dict:
-            sampler = self.mode_dict[self.parameters['mode']]
+            self.sampler = self.mode_dict[self.parameters['mode']]
         else:
             logging.warning("Unknown downsample mode. Using 'mean'.")
-            sampler = numpy.mean
-        block_size = (self.parameters['bin_size'], self.parameters['bin_size'])
-        result = skim.block_reduce(data[0], block_size, sampler)
-        return result
+            self.sampler = numpy.mean
+
+        # bin sizes in the order of the dimensions of each block of frames
+        core_dims = self.get_plugin_in_datasets()[0].get_core_dimensions()
+        nDims = len(core_dims) + 1
+        self.block_bins = [self.parameters['slice_bin_size']]*nDims
+        for dim in core_dims:
+            self.block_bins[dim] = self.parameters['bin_size']
+
+    def process_frames(self, data):
+        logging.debug("Running Downsample data")
+        return self.downsample(data[0], self.block_bins, self.sampler)
+
+    @staticmethod
+    def downsample(data, bins, sampler):
+        """ Reduce each (bins[0] x bins[1] x ...) block of the data to a single
+        value.  The data is padded with zeros to a multiple of the bin sizes,
+        as in skimage.measure.block_reduce.
+        """
+        bins = bins[len(bins)-data.ndim:]
+        pad = [(0, -s % b) for s, b in zip(data.shape, bins)]
+        if any(p[1] for p in pad):
+            data = numpy.pad(data, pad, 'constant')
+        shape = []
+        for s, b in zip(data.shape, bins):
+            shape += [s/b, b]
+        return sampler(data.reshape(shape), axis=tuple(range(1, len(shape), 2)))
 
     def setup(self):
         # get all in and out datasets required by the plugin
@@ -88,16 +102,17 @@ class DownsampleFilter(Plugin, CpuPlugin):
                                       axis_labels=in_dataset[0],
                                       shape=self.out_shape)
 
-        out_pData[0].plugin_data_setup(plugin_pattern, self.get_max_frames())
+        nFrames = self.get_max_frames()
+        if isinstance(nFrames, int):
+            nFrames /= self.parameters['slice_bin_size']
+        out_pData[0].plugin_data_setup(plugin_pattern, nFrames)
 
     def new_shape(self, full_shape, data):
-        core_dirs = data.get_core_dimensions()
-        new_shape = list(full_shape)
-        for dim in core_dirs:
-            new_shape[dim] = full_shape[dim]/self.parameters['bin_size']
-            if (full_shape[dim] % self.parameters['bin_size']) > 0:
-                new_shape[dim] += 1
-        return tuple(new_shape)
+        bins = numpy.ones(len(full_shape), dtype=int)
+        bins[list(data.get_core_dimensions())] = self.parameters['bin_size']
+        bins[data.get_slice_dimensions()[0]] = \
+            self.parameters['slice_bin_size']
+        return tuple(-(-numpy.array(full_shape) // bins))
 
     def nInput_datasets(self):
         return 1
@@ -106,5 +121,9 @@ class DownsampleFilter(Plugin, CpuPlugin):
         return 1
 
     def get_max_frames(self):
-        # This filter processes one frame at a time
-        return 'single'
+        """ Process blocks of frames, which must contain a whole number of
+        bins in the slice dimension. """
+        sbin = self.parameters['slice_bin_size']
+        if sbin == 1:
+            return 'multiple'
+        return sbin*max(2, 16/sbin)
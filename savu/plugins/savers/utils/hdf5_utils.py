@@ -22,12 +22,17 @@
 """
 
 import h5py
+import Queue
 import logging
+import threading
 from mpi4py import MPI
 
+import savu.core.trace as trace
 from savu.data.chunking import Chunking
 from savu.data.data_structures.data_types.data_plus_darks_and_flats \
     import NoImageKey
+from savu.data.data_structures.data_types.distributed_buffer import \
+    DistributedBuffer
 
 NX_CLASS = 'NX_class'
 
@@ -52,11 +57,12 @@ class Hdf5Utils(object):
         """
         self.exp._barrier()
 
-        if self.exp.meta_data.get("mpi") is True:
-            backing_file = h5py.File(filename, mode, driver='mpio',
-                                     comm=MPI.COMM_WORLD, info=self.info)
-        else:
-            backing_file = h5py.File(filename, mode)
+        with trace.span('open', 'file', file=filename, mode=mode):
+            if self.exp.meta_data.get("mpi") is True:
+                backing_file = h5py.File(filename, mode, driver='mpio',
+                                         comm=MPI.COMM_WORLD, info=self.info)
+            else:
+                backing_file = h5py.File(filename, mode)
 
         self.exp._barrier()
 
@@ -67,30 +73,45 @@ class Hdf5Utils(object):
     def _link_datafile_to_nexus_file(self, data):
         filename = self.exp.meta_data.get('nxs_filename')
 
-        with h5py.File(filename, 'a') as nxs_file:
-            # entry path in nexus file
-            name = data.get_name()
-            group_name = self.exp.meta_data.get(['group_name', name])
-            link_type = self.exp.meta_data.get(['link_type', name])
-            nxs_entry = '/entry/' + link_type
-            if link_type == 'final_result':
-                nxs_entry += '_' + data.get_name()
-            else:
-                nxs_entry += "/" + group_name
-            nxs_entry = nxs_file[nxs_entry]
-            nxs_entry.attrs['signal'] = 'data'
-            data_entry = nxs_entry.name + '/data'
-            # output file path
-            h5file = data.backing_file.filename
-
-            # entry path in output file path
-            m_data = self.exp.meta_data.get
-            if not (link_type == 'intermediate' and
-                    m_data('inter_path') != m_data('out_path')):
-                h5file = h5file.split(m_data('out_folder') + '/')[-1]
-
-            nxs_file[data_entry] = \
-                h5py.ExternalLink(h5file, group_name + '/data')
+        with trace.span('link', 'file', file=filename):
+            with h5py.File(filename, 'a') as nxs_file:
+                self._add_nexus_link(nxs_file, self._get_nexus_link(data))
+
+    def _get_nexus_link(self, data):
+        """ Get the nexus file entry for a dataset and the external file and
+        path it should be linked to.
+
+        :param Data data: The dataset to link.
+        :returns: The nexus entry, the linked file and the path in that file.
+        :rtype: tuple(str, str, str)
+        """
+        # entry path in nexus file
+        name = data.get_name()
+        group_name = self.exp.meta_data.get(['group_name', name])
+        link_type = self.exp.meta_data.get(['link_type', name])
+        nxs_entry = '/entry/' + link_type
+        if link_type == 'final_result':
+            nxs_entry += '_' + data.get_name()
+        else:
+            nxs_entry += "/" + group_name
+        # output file path
+        h5file = data.backing_file.filename
+
+        # entry path in output file path
+        m_data = self.exp.meta_data.get
+        if not (link_type == 'intermediate' and
+                m_data('inter_path') != m_data('out_path')):
+            h5file = h5file.split(m_data('out_folder') + '/')[-1]
+        return nxs_entry, h5file, group_name + '/data'
+
+    def _add_nexus_link(self, nxs_file, link):
+        """ Add an external link (from :meth:`_get_nexus_link`) to an open
+        nexus file. """
+        nxs_entry, h5file, h5path = link
+        nxs_entry = nxs_file[nxs_entry]
+        nxs_entry.attrs['signal'] = 'data'
+        data_entry = nxs_entry.name + '/data'
+        nxs_file[data_entry] = h5py.ExternalLink(h5file, h5path)
 
     def __create_dataset_nofill(self, group, name, shape, dtype, chunks=None):
         spaceid = h5py.h5s.create_simple(shape)
@@ -153,7 +174,8 @@ class Hdf5Utils(object):
         if data.backing_file is not None:
             try:
                 filename = data.backing_file.filename
-                data.backing_file.close()
+                with trace.span('close', 'file', file=filename):
+                    data.backing_file.close()
                 logging.debug("File close successful: %s", filename)
                 data.backing_file = None
             except:
@@ -172,6 +194,69 @@ class Hdf5Utils(object):
             data.data.data = data.backing_file[entry]
         elif isinstance(data.data, h5py._hl.dataset.Dataset):
             data.data = data.backing_file[entry]
+        elif isinstance(data.data, DistributedBuffer):
+            data.data.backing = data.backing_file[entry]
         else:
             raise Exception('Unable to re-open the hdf5 file - unknown'
                             ' datatype')
+
+
+class NexusWriter(object):
+    """
+    Writes entries to the nexus file in a background thread, so the writing
+    process can continue with the next plugin.  Entries queued while the
+    previous batch was being written are written together, opening the file
+    once per batch.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.queue = Queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.__run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add(self, func):
+        """ Queue a function that takes the open nexus file as its only
+        argument. """
+        self.__check_error()
+        self.queue.put(func)
+
+    def close(self):
+        """ Write all outstanding entries and stop the writer thread. """
+        self.queue.put(None)
+        self.thread.join()
+        self.__check_error()
+
+    def __run(self):
+        finished = False
+        while not finished:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Queue.Empty:
+                    break
+            if None in batch:
+                finished = True
+                batch = batch[:batch.index(None)]
+            if batch and self.error is None:
+                self.__write(batch)
+
+    def __write(self, batch):
+        try:
+            with trace.span('nexus', 'file', file=self.filename,
+                            entries=len(batch)):
+                with h5py.File(self.filename, 'a') as nxs_file:
+                    for func in batch:
+                        func(nxs_file)
+        except Exception as e:
+            logging.exception("Unable to write to the nexus file %s",
+                              self.filename)
+            self.error = e
+
+    def __check_error(self):
+        if self.error is not None:
+            raise Exception("Unable to write to the nexus file %s: %s"
+                            % (self.filename, self.error))
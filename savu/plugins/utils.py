@@ -35,6 +35,7 @@ plugins = {}
 plugins_path = {}
 dawn_plugins = {}
 dawn_plugin_params = {}
+plugin_index = {}
 count = 0
 
 OUTPUT_TYPE_DATA_ONLY = 0
@@ -49,6 +50,20 @@ def register_plugin(clazz):
     return clazz
 
 
+class LazyPlugin(object):
+    """ A placeholder in the plugin register for an indexed plugin whose
+    module has not been imported.  Calling it imports the module and returns
+    an instance of the plugin class. """
+
+    def __init__(self, name, module):
+        self.__name__ = name
+        self.__module__ = module
+
+    def __call__(self, *args, **kwargs):
+        module = importlib.import_module(self.__module__)
+        return getattr(module, self.__name__)(*args, **kwargs)
+
+
 def dawn_compatible(plugin_output_type=OUTPUT_TYPE_METADATA_AND_DATA):
     def _dawn_compatible(clazz):
         """
@@ -94,7 +109,8 @@ def load_class(name):
     path = name if os.path.dirname(name) else None
     name = os.path.basename(os.path.splitext(name)[0]) if path else name
     cls_name = ''.join(x.capitalize() for x in name.split('.')[-1].split('_'))
-    if cls_name in plugins.keys():
+    if cls_name in plugins.keys() and \
+            not isinstance(plugins[cls_name], LazyPlugin):
         return plugins[cls_name]
     mod = \
         imp.load_source(name, path) if path else importlib.import_module(name)
@@ -0,0 +1,56 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: affinity_test
+   :platform: Unix
+   :synopsis: unittest for the placement of processes on cores
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import unittest
+
+import savu.core.affinity as af
+
+
+class AffinityTest(unittest.TestCase):
+
+    def test_parse_cpu_list(self):
+        self.assertEqual(af.parse_cpu_list('0-3,8,10-11\n'),
+                         [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(af.parse_cpu_list('5'), [5])
+
+    def test_rank_cores(self):
+        numa_nodes = [range(0, 8), range(8, 16)]
+        cores = [af.get_rank_cores(r, 4, numa_nodes) for r in range(4)]
+        self.assertEqual(cores, [range(0, 4), range(4, 8), range(8, 12),
+                                 range(12, 16)])
+        # the processes are split between the NUMA nodes
+        cores = [af.get_rank_cores(r, 3, numa_nodes) for r in range(3)]
+        self.assertEqual(cores, [range(0, 4), range(4, 8), range(8, 16)])
+        # more processes than cores
+        cores = [af.get_rank_cores(r, 20, numa_nodes) for r in range(20)]
+        self.assertEqual(sorted(set(c for cs in cores for c in cs)),
+                         range(16))
+        self.assertTrue(all(len(c) == 1 for c in cores))
+
+    def test_numa_nodes(self):
+        allowed = af.get_allowed_cpus()
+        nodes = af.get_numa_nodes(allowed)
+        self.assertEqual(sorted(c for n in nodes for c in n), sorted(allowed))
+
+if __name__ == "__main__":
+    unittest.main()
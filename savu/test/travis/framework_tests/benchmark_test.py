@@ -0,0 +1,53 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: benchmark_test
+   :platform: Unix
+   :synopsis: unittest for the framework benchmarks
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import unittest
+
+import scripts.benchmark.savu_benchmark as bm
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_benchmark(self):
+        result = bm.run_benchmark('pattern_change', repeat=1, scale=0.05)
+        self.assertEqual(result['size'], [36, 128, 160])
+        self.assertTrue(result['plugin_time'] > 0)
+        self.assertTrue(result['peak_rss_MB'] > 0)
+        self.assertEqual(set(result['phases']),
+                         set(['framework', 'NoProcessPlugin']))
+
+    def test_compare(self):
+        old = {'benchmarks': {'a': {'plugin_time': 1.0, 'peak_rss_MB': 100,
+                                    'throughput_MBps': 50.0},
+                              'b': {'plugin_time': 1.0}}}
+        new = {'benchmarks': {'a': {'plugin_time': 1.05, 'peak_rss_MB': 150,
+                                    'throughput_MBps': 40.0},
+                              'c': {'plugin_time': 1.0}}}
+        rows = bm.compare(old, new, threshold=0.1)
+        regressed = dict((r[1], r[-1]) for r in rows)
+        self.assertEqual(regressed, {'plugin_time': False,
+                                     'peak_rss_MB': True,
+                                     'throughput_MBps': True})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: check_cache_test
+   :platform: Unix
+   :synopsis: unittest for the cached plugin list check
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+
+import savu.core.utils as cu
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+
+
+class CheckCacheTest(unittest.TestCase):
+
+    def __run(self, cache, rank_memory=None):
+        options = tu.set_options(
+            tu.get_test_data_path('mm.nxs'),
+            process_file=tu.get_test_process_path('spectrum_crop_test.nxs'))
+        options['check_cache'] = cache
+        if rank_memory:
+            options['rank_memory'] = rank_memory
+        exp = PluginRunner(options)._run_plugin_list()
+        return exp.meta_data.plugin_list
+
+    def test_check_cache(self):
+        cache = tempfile.mkdtemp()
+        plist = self.__run(cache)
+        cache_files = os.listdir(cache)
+        self.assertEqual(len(cache_files), 1)
+
+        cached_plist = self.__run(cache)
+        self.assertEqual(os.listdir(cache), cache_files)
+        self.assertEqual(plist._get_dataset_flow(),
+                         cached_plist._get_dataset_flow())
+        self.assertEqual(plist._get_datasets_list(),
+                         cached_plist._get_datasets_list())
+
+    def test_check_cache_mismatch(self):
+        cache = tempfile.mkdtemp()
+        self.__run(cache)
+        cache_file = os.path.join(cache, os.listdir(cache)[0])
+        with open(cache_file, 'rb') as f:
+            cached = pickle.load(f)
+        cached['shapes'][0] = [('wrong', (1, 2, 3))]
+        with open(cache_file, 'wb') as f:
+            pickle.dump(cached, f)
+        self.assertRaises(Exception, self.__run, cache)
+
+    def test_check_cache_memory_budget(self):
+        cache = tempfile.mkdtemp()
+        messages = []
+        user_message = cu.user_message
+        cu.user_message = messages.append
+        try:
+            self.__run(cache)
+            self.assertFalse([m for m in messages if 'WARNING' in m])
+            # the budget is not part of the cache key
+            del messages[:]
+            self.__run(cache, rank_memory=0.001)
+        finally:
+            cu.user_message = user_message
+        self.assertTrue("Plugin list check loaded from the cache!" in
+                        messages)
+        self.assertTrue([m for m in messages if 'WARNING' in m])
+
+if __name__ == "__main__":
+    unittest.main()
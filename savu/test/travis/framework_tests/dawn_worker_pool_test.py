@@ -0,0 +1,95 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: dawn_worker_pool_test
+   :platform: Unix
+   :synopsis: unittest for the worker pool of the DAWN runner
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import unittest
+import threading
+import numpy as np
+
+import savu.plugins.utils as pu
+from scripts.dawn_runner import run_savu
+from scripts.dawn_runner.worker_pool import new_persistence
+import savu.plugins.filters.image_interpolation
+
+
+class DawnWorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = pu.dawn_plugins['ImageInterpolation']['path2plugin']
+        self.params = {'size': {'value': 2.0}, 'interp': {'value': 'bilinear'}}
+        self.batch = [{'data': np.random.rand(8, 10).astype(np.float32),
+                       'dataset_name': 'test', 'xaxis_title': None,
+                       'yaxis_title': None} for i in range(10)]
+
+    def test_worker_pool(self):
+        serial = list(run_savu.runSavuBatch(
+            self.path, self.params, False, self.batch, new_persistence()))
+
+        persistence = new_persistence()
+        pool = run_savu.get_worker_pool(persistence, nWorkers=2)
+        try:
+            for i in range(2):
+                parallel = list(run_savu.runSavuBatch(
+                    self.path, self.params, False, self.batch, persistence))
+                self.assertEqual(len(parallel), len(serial))
+                for a, b in zip(serial, parallel):
+                    self.assertTrue(np.array_equal(a['data'], b['data']))
+
+            result = run_savu.runSavu(self.path, self.params, False,
+                                      self.batch[3], persistence)
+            self.assertTrue(np.array_equal(result['data'], serial[3]['data']))
+
+            params = {'size': {'value': 'x'}, 'interp': {'value': 'bilinear'}}
+            with self.assertRaises(Exception):
+                list(run_savu.runSavuBatch(
+                    self.path, params, False, self.batch, persistence))
+        finally:
+            pool.close()
+
+    def test_concurrent_batches(self):
+        serial = list(run_savu.runSavuBatch(
+            self.path, self.params, False, self.batch, new_persistence()))
+        persistence = new_persistence()
+        pool = run_savu.get_worker_pool(persistence, nWorkers=2)
+        try:
+            # a second batch is processed while the first is suspended
+            first = pool.imap(self.path, self.params, False, self.batch)
+            results = [next(first)]
+            other = []
+            thread = threading.Thread(target=lambda: other.extend(pool.imap(
+                self.path, self.params, False, self.batch[::-1])))
+            thread.daemon = True
+            thread.start()
+            thread.join(60)
+            self.assertFalse(thread.is_alive())
+            results.extend(first)
+            self.assertEqual(len(results), len(serial))
+            self.assertEqual(len(other), len(serial))
+            for a, b, c in zip(serial, results, other[::-1]):
+                self.assertTrue(np.array_equal(a['data'], b['data']))
+                self.assertTrue(np.array_equal(a['data'], c['data']))
+            self.assertEqual(pool.received, {})
+        finally:
+            pool.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: distributed_buffer_test
+   :platform: Unix
+   :synopsis: unittest for the distributed in-memory dataset
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import unittest
+import subprocess
+import numpy as np
+from distutils.spawn import find_executable
+
+import savu
+from savu.data.data_structures.data_types.distributed_buffer import \
+    DistributedBuffer
+
+NPROCS = 3
+
+# Each process writes every third projection and reads every third (padded)
+# sinogram, and the blocks are exchanged in rounds of at most max_bytes.
+EXCHANGER = """
+import sys
+import numpy as np
+from mpi4py import MPI
+from savu.data.data_structures.data_types.distributed_buffer import \\
+    DistributedBuffer
+
+comm = MPI.COMM_WORLD
+data = np.arange(12*5*7, dtype=np.float32).reshape(12, 5, 7)
+results = []
+for max_bytes in [2**27, 100, 10]:
+    buf = DistributedBuffer(data.shape, data.dtype, max_bytes=max_bytes)
+    for i in range(comm.rank, data.shape[0], comm.size):
+        buf[slice(i, i+1), slice(None), slice(None)] = data[i:i+1]
+    regions = [(slice(None), slice(max(i-1, 0), i+2), slice(None))
+               for i in range(comm.rank, data.shape[1], comm.size)]
+    buf.exchange(regions)
+    results.append(all(np.array_equal(buf[r], data[r]) for r in regions))
+    buf.free()
+sys.stdout.write('exchanged %i %s\\n' % (comm.rank, results))
+"""
+
+
+class DistributedBufferTest(unittest.TestCase):
+
+    def __write_projections(self, data, max_bytes):
+        buf = DistributedBuffer(data.shape, data.dtype, max_bytes=max_bytes)
+        for i in range(0, data.shape[0], 4):
+            buf[slice(i, i+4), slice(None), slice(None)] = data[i:i+4]
+        return buf
+
+    def test_exchange(self):
+        data = np.random.rand(18, 6, 7).astype(np.float32)
+        for max_bytes in [2**27, 100]:
+            buf = self.__write_projections(data, max_bytes)
+            # read padded sinograms
+            regions = [(slice(0, 18), slice(max(i-1, 0), i+2), slice(0, 7))
+                       for i in range(0, 6, 2)]
+            buf.exchange(regions)
+            for sl in regions:
+                self.assertTrue(np.array_equal(buf[sl], data[sl]))
+            self.assertTrue(np.array_equal(buf[::2, 3, 1:6:2],
+                                           data[::2, 3, 1:6:2]))
+            self.assertRaises(Exception, buf.__getitem__,
+                              (slice(None), slice(0, 6)))
+
+    def test_write_to(self):
+        data = np.arange(12*3*2).reshape(12, 3, 2)
+        out = np.zeros_like(data)
+        self.__write_projections(data, 2**27).write_to(out)
+        self.assertTrue(np.array_equal(out, data))
+
+    @unittest.skipUnless(find_executable('mpirun'), "requires mpirun")
+    def test_exchange_mpi(self):
+        env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                   OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                   OMPI_MCA_rmaps_base_oversubscribe='1')
+        path = os.path.dirname(os.path.dirname(savu.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [path] + [p for p in [env.get('PYTHONPATH')] if p])
+        runner = subprocess.Popen(
+            ['mpirun', '-np', str(NPROCS), sys.executable, '-c', EXCHANGER],
+            stdout=subprocess.PIPE, env=env)
+        stdout = runner.communicate()[0]
+        self.assertEqual(runner.returncode, 0)
+        results = sorted(l for l in stdout.splitlines() if
+                         l.startswith('exchanged'))
+        self.assertEqual(results, ['exchanged %i [True, True, True]' % i
+                                   for i in range(NPROCS)])
+
+if __name__ == "__main__":
+    unittest.main()
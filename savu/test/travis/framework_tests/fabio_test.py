@@ -0,0 +1,71 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: fabio_test
+   :platform: Unix
+   :synopsis: unittest for the threaded, prefetching FabIO data type
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import unittest
+import numpy as np
+
+import savu.test.test_utils as tu
+from savu.data.data_structures.data_types.fabIO import FabIO
+
+
+class FabIOTest(unittest.TestCase):
+
+    def __get_data(self, **kwargs):
+        path = tu.get_test_data_path('image_test/tiffs')
+        return FabIO(path, None, [0], None, None, **kwargs)
+
+    def __get_slice(self, data, frames):
+        shape = data.get_shape()
+        return (frames, slice(0, shape[1], 1), slice(0, shape[2], 1))
+
+    def __sequential_reads(self, data, nFrames, pad):
+        blocks = []
+        nTotal = data.get_shape()[0]
+        for start in range(0, nTotal, nFrames):
+            sl = slice(max(start-pad, 0), min(start+nFrames+pad, nTotal), 1)
+            blocks.append(data[self.__get_slice(data, sl)])
+        return blocks
+
+    def test_threaded_read(self):
+        serial = self.__get_data()
+        threaded = self.__get_data(nThreads=4)
+        sl = (slice(3, 20, 2), slice(5, 60, 1), slice(0, 20, 3))
+        np.testing.assert_array_equal(serial[sl], threaded[sl])
+
+    def test_prefetch_and_cache(self):
+        serial = self.__get_data()
+        threaded = self.__get_data(nThreads=4)
+        expected = self.__sequential_reads(serial, 8, 2)
+        result = self.__sequential_reads(threaded, 8, 2)
+        self.assertEqual(len(expected), len(result))
+        for e, r in zip(expected, result):
+            np.testing.assert_array_equal(e, r)
+        self.assertTrue(len(threaded._cache) <= threaded._limit)
+
+    def test_cache_size(self):
+        data = self.__get_data(cache_size=3)
+        data[self.__get_slice(data, slice(0, 10, 1))]
+        self.assertEqual(len(data._cache), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: hdf5_transport_test
+   :platform: Unix
+   :synopsis: unittest for the in-memory reorganisation of intermediate \
+       datasets by the hdf5 transport
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import glob
+import h5py
+import tempfile
+import unittest
+import subprocess
+import numpy as np
+from distutils.spawn import find_executable
+
+import savu
+import savu.core.utils as cu
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+from savu.data.meta_data import MetaData
+
+NPROCS = 3
+
+# A plugin list that changes the pattern of an intermediate dataset, run by
+# every process.  Each exchange of a distributed dataset is checked against
+# the input data.
+RUNNER = """
+import sys
+import h5py
+import numpy as np
+from mpi4py import MPI
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+from savu.data.data_structures.data_types.distributed_buffer import \\
+    DistributedBuffer
+
+out_path, rank_memory = sys.argv[1], float(sys.argv[2])
+exchanged = []
+exchange = DistributedBuffer.exchange
+
+def check_exchange(self, regions):
+    exchange(self, regions)
+    with h5py.File(out_path + '/input_array.h5', 'r') as f:
+        exchanged.append(all(np.array_equal(self[r], f['test'][r])
+                             for r in regions))
+DistributedBuffer.exchange = check_exchange
+
+names = ','.join('CPU%%i' %% i for i in range(MPI.COMM_WORLD.size))
+options = tu.set_options(tu.get_test_data_path('mm.nxs'), out_path=out_path,
+                         process_names=names)
+options['cluster'] = False
+options['rank_memory'] = rank_memory
+options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+loader = {'size': %r, 'dtype': 'int16',
+          'axis_labels': ['rotation_angle.degrees', 'detector_y.pixels',
+                          'detector_x.pixels'],
+          'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+plugin = 'savu.plugins.reshape.downsample_filter'
+tu.set_plugin_list(options, [plugin, plugin],
+                   [loader, {'bin_size': 1, 'pattern': 'PROJECTION'},
+                    {'bin_size': 1, 'pattern': 'SINOGRAM'}, {}])
+exp = PluginRunner(options)._run_plugin_list()
+sys.stdout.write('exchanged %%i %%s %%i\\n' %% (
+    MPI.COMM_WORLD.rank, exchanged, exp.meta_data.get('buffer_nbytes')))
+"""
+
+# Two intermediate datasets, written as projections and read as sinograms,
+# and a budget with room for one of them, are passed to the transport on each
+# process.  The datasets are held in files of each process, so a parallel
+# build of h5py is not required.
+TRANSPORT = """
+import sys
+import h5py
+import numpy as np
+from mpi4py import MPI
+from savu.data.meta_data import MetaData
+from savu.core.transports.hdf5_transport import Hdf5Transport
+from savu.data.data_structures.data_types.distributed_buffer import \\
+    DistributedBuffer
+
+comm = MPI.COMM_WORLD
+data = np.arange(12*5*7, dtype=np.float32).reshape(12, 5, 7)
+share = -(-data.nbytes//comm.size)
+# the share, the regions received and the exchange buffers of a dataset
+nbytes = 4*share
+names = ['tomo', 'tomo2']
+
+
+class Data(object):
+
+    def __init__(self, name):
+        self.backing_file = h5py.File(
+            '%s_%i.h5' % (name, comm.rank), 'w', driver='core',
+            backing_store=False)
+        self.data = self.backing_file.create_dataset(name, data.shape,
+                                                     data.dtype)
+        self.remove = False
+
+
+class Hdf5Utils(object):
+
+    def _close_file(self, data):
+        data.backing_file.close()
+
+
+class Experiment(object):
+    meta_data = MetaData()
+    meta_data.set('mpi', True)
+    meta_data.set('nPlugin', 0)
+    meta_data.set('rank_memory_budget', 1000 + nbytes)
+    meta_data.set('transfer_nbytes', 1000)
+    meta_data.set('buffer_nbytes', 0)
+    meta_data.set('current_and_next', [
+        {'name': name, 'current': {'PROJECTION': {}},
+         'next': {'SINOGRAM': {}}} for name in names])
+    index = {'out_data': dict((name, Data(name)) for name in names)}
+
+
+transport = Hdf5Transport()
+transport.exp = Experiment()
+transport.hdf5 = Hdf5Utils()
+transport.buffer_charges = {}
+transport.files = [{'filename': dict.fromkeys(names, ''),
+                    'group_name': dict.fromkeys(names, ''),
+                    'link_type': dict.fromkeys(names, 'intermediate')}]
+out_data = transport.exp.index['out_data']
+
+
+def get_buffered():
+    return [isinstance(out_data[n].data, DistributedBuffer) for n in names]
+
+
+transport._transport_pre_plugin()
+buffered = [get_buffered()]
+tomo = out_data['tomo'].data
+for i in range(comm.rank, data.shape[0], comm.size):
+    tomo[slice(i, i+1), slice(None), slice(None)] = data[i:i+1]
+regions = [(slice(None), slice(i, i+1), slice(None))
+           for i in range(comm.rank, data.shape[1], comm.size)]
+tomo.exchange(regions)
+exchanged = all(np.array_equal(tomo[r], data[r]) for r in regions)
+charged = [transport.exp.meta_data.get('buffer_nbytes')]
+
+# the memory of the first dataset is available to the second once it is freed
+transport._transport_terminate_dataset(out_data['tomo'])
+charged.append(transport.exp.meta_data.get('buffer_nbytes'))
+transport._transport_pre_plugin()
+buffered.append(get_buffered())
+charged.append(transport.exp.meta_data.get('buffer_nbytes'))
+sys.stdout.write('transport %i %s %s %s\\n' % (
+    comm.rank, buffered, exchanged, [c == nbytes for c in charged]))
+"""
+
+SHAPE = [30, 12, 20]
+
+
+class Hdf5TransportTest(unittest.TestCase):
+
+    def test_buffer_budget(self):
+        meta_data = MetaData()
+        self.assertEqual(cu.get_buffer_budget(meta_data), 0)
+        meta_data.set('rank_memory_budget', 1000)
+        meta_data.set('transfer_nbytes', 300)
+        self.assertEqual(cu.get_buffer_budget(meta_data), 700)
+        cu.charge_buffer(meta_data, 500)
+        self.assertEqual(cu.get_buffer_budget(meta_data), 200)
+        cu.charge_buffer(meta_data, 500)
+        self.assertEqual(cu.get_buffer_budget(meta_data), 0)
+
+    def test_transfer_nbytes(self):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        loader = {'size': SHAPE, 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        plugin = 'savu.plugins.reshape.downsample_filter'
+        tu.set_plugin_list(options, plugin, [loader, {'bin_size': 1}, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+        # the in and out transfers of all the frames of one process
+        self.assertEqual(exp.meta_data.get('transfer_nbytes'),
+                         2*np.prod(SHAPE)*4)
+        # a single process does not hold datasets in memory
+        self.assertEqual(exp.meta_data.get('buffer_nbytes'), 0)
+
+    def __mpirun(self, script, *args):
+        env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                   OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                   OMPI_MCA_rmaps_base_oversubscribe='1')
+        path = os.path.dirname(os.path.dirname(savu.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [path] + [p for p in [env.get('PYTHONPATH')] if p])
+        runner = subprocess.Popen(
+            ['mpirun', '-np', str(NPROCS), sys.executable, '-c', script] +
+            list(args), stdout=subprocess.PIPE, env=env)
+        stdout = runner.communicate()[0]
+        self.assertEqual(runner.returncode, 0)
+        return stdout.splitlines()
+
+    @unittest.skipUnless(find_executable('mpirun'), "requires mpirun")
+    def test_distributed_buffers(self):
+        results = sorted(l for l in self.__mpirun(TRANSPORT) if
+                         l.startswith('transport'))
+        # the charge of the first dataset is refunded when it is terminated
+        self.assertEqual(results, [
+            'transport %i [[True, False], [True, True]] True '
+            '[True, False, True]' % i for i in range(NPROCS)])
+
+    def __run_mpi(self, rank_memory):
+        out_path = tempfile.mkdtemp()
+        stdout = self.__mpirun(RUNNER % SHAPE, out_path, str(rank_memory))
+        results = [l.split(' ', 1)[1] for l in stdout if
+                   l.startswith('exchanged')]
+        self.assertEqual(len(results), NPROCS)
+
+        with h5py.File(os.path.join(out_path, 'input_array.h5'), 'r') as f:
+            expected = f['test'][...]
+        fname = glob.glob(os.path.join(out_path, 'tomo_p2_*.h5'))[0]
+        with h5py.File(fname, 'r') as f:
+            group = [g for g in f.values() if isinstance(g, h5py.Group)][0]
+            self.assertTrue(np.array_equal(group['data'][...], expected))
+        with open(os.path.join(out_path, 'user.log'), 'r') as f:
+            in_memory = 'in memory' in f.read()
+        return sorted(results), in_memory
+
+    @unittest.skipUnless(find_executable('mpirun') and h5py.get_config().mpi,
+                         "requires mpirun and a parallel build of h5py")
+    def test_distributed_exchange(self):
+        # the charge is refunded when the dataset is terminated
+        results, in_memory = self.__run_mpi(100)
+        self.assertTrue(in_memory)
+        self.assertEqual(results, ['%i [True] 0' % i for i in range(NPROCS)])
+
+    @unittest.skipUnless(find_executable('mpirun') and h5py.get_config().mpi,
+                         "requires mpirun and a parallel build of h5py")
+    def test_distributed_exchange_no_budget(self):
+        # the transfers leave no room in the budget for the dataset
+        results, in_memory = self.__run_mpi(0.03)
+        self.assertFalse(in_memory)
+        self.assertEqual(results, ['%i [] 0' % i for i in range(NPROCS)])
+
+if __name__ == "__main__":
+    unittest.main()
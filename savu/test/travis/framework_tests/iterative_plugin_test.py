@@ -0,0 +1,69 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: iterative_plugin_test
+   :platform: Unix
+   :synopsis: unittest for the iterative plugin driver
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import h5py
+import unittest
+import numpy as np
+
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+
+
+class IterativePluginTest(unittest.TestCase):
+
+    def __run(self, memory_budget, converged=None):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        options['memory_budget'] = memory_budget
+        loader = {'size': [20, 10, 30], 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        params = {'nIterations': 5, 'converged': converged,
+                  'in_datasets': ['tomo'], 'out_datasets': ['tomo']}
+        plugin = 'savu.plugins.developing.testing_iterative_plugin'
+        tu.set_plugin_list(options, plugin, [loader, params, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        in_data = h5py.File(
+            options['out_path'] + '/input_array.h5', 'r')['test'][...]
+        # the final result is in whichever of the alternating datasets was
+        # written last
+        results = []
+        for fname in exp.meta_data.get('filename').values():
+            with h5py.File(fname, 'r') as f:
+                group = [g for g in f.values() if isinstance(g, h5py.Group)]
+                results.append(group[0]['data'][...] - in_data)
+        return max(results, key=lambda r: r.mean())
+
+    def test_file_iterations(self):
+        self.assertTrue(np.all(self.__run(0) == 5))
+
+    def test_memory_iterations(self):
+        self.assertTrue(np.all(self.__run(None) == 5))
+
+    def test_convergence(self):
+        self.assertTrue(np.all(self.__run(None, converged=2.5) == 4))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: memory_budget_test
+   :platform: Unix
+   :synopsis: unittest for limiting the data transfers to the memory budget
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import unittest
+
+import savu.test.test_utils as tu
+
+
+class MemoryBudgetTest(unittest.TestCase):
+
+    def __setup_plugin(self, budget, padding=None):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        loader = {'size': [40, 10, 30], 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        plugin = 'savu.plugins.reshape.downsample_filter'
+        tu.set_plugin_list(options, plugin, [loader, {}, {}])
+        plugin = tu.plugin_runner_load_plugin(options)
+        plugin.exp.meta_data.set('rank_memory_budget', budget)
+        tu.plugin_setup(plugin)
+        return plugin.get_plugin_in_datasets()[0]
+
+    def test_transfer_nbytes(self):
+        pData = self.__setup_plugin(None)
+        # frames of 10x30 float32 values
+        self.assertEqual(pData._get_transfer_nbytes(4), 4*10*30*4)
+        pData.padding = {'pad_multi_frames': 2, 'pad_frame_edges': 1}
+        self.assertEqual(pData._get_transfer_nbytes(4), 8*12*32*4)
+
+    def test_no_budget(self):
+        pData = self.__setup_plugin(None)
+        self.assertEqual(pData._get_max_frames_transfer(), 20)
+
+    def test_limited_budget(self):
+        # the in and out datasets share a budget of five frames each
+        pData = self.__setup_plugin(2*5*10*30*4)
+        self.assertEqual(pData._get_max_frames_transfer(), 5)
+        self.assertEqual(pData._get_max_frames_process(), 5)
+
+if __name__ == "__main__":
+    unittest.main()
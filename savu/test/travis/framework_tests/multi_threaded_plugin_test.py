@@ -0,0 +1,114 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: multi_threaded_plugin_test
+   :platform: Unix
+   :synopsis: unittest for the idle barrier and the core utilisation of the \
+       multi-threaded plugin driver
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import unittest
+import subprocess
+from distutils.spawn import find_executable
+
+import savu
+
+NPROCS = 3
+
+# The processes form a single node, so the first process runs the plugin,
+# which keeps a core busy, while the others wait in the idle barrier.  The
+# wall and CPU times of the wait are measured on each process.
+RUNNER = """
+import os
+import sys
+import time
+from mpi4py import MPI
+from savu.data.meta_data import MetaData
+from savu.data.experiment_collection import Experiment
+from savu.plugins.driver.multi_threaded_plugin import MultiThreadedPlugin
+
+comm = MPI.COMM_WORLD
+BUSY = 1.0
+
+
+class IdleExperiment(Experiment):
+
+    def __init__(self):
+        self.meta_data = MetaData()
+        self.meta_data.set('mpi', True)
+        self.meta_data.set('process', comm.rank)
+        self.meta_data.set('processes',
+                           ['CPU%i' % i for i in range(comm.size)])
+
+
+class BusyPlugin(MultiThreadedPlugin):
+
+    def __init__(self, exp):
+        super(BusyPlugin, self).__init__()
+        self.name = 'BusyPlugin'
+        self.exp = exp
+        self.parameters = {}
+        self.core_utilisation = None
+
+    def _run_plugin_instances(self, transport, communicator=MPI.COMM_WORLD):
+        end = time.time() + BUSY
+        while time.time() < end:
+            pass
+
+
+exp = IdleExperiment()
+plugin = BusyPlugin(exp)
+exp._barrier()
+start, cpu = time.time(), sum(os.times()[:2])
+plugin._run_plugin(exp, None)
+wall, cpu = time.time() - start, sum(os.times()[:2]) - cpu
+waited = wall > 0.9*BUSY
+idle = cpu < 0.5*wall if comm.rank else None
+utilised = 0 < plugin.core_utilisation <= 1 if comm.rank == 0 else \\
+    plugin.core_utilisation
+sys.stdout.write('run %i %s %s %s\\n' % (comm.rank, waited, idle, utilised))
+"""
+
+
+class MultiThreadedPluginTest(unittest.TestCase):
+
+    @unittest.skipUnless(find_executable('mpirun'), "requires mpirun")
+    def test_idle_barrier(self):
+        env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                   OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                   OMPI_MCA_rmaps_base_oversubscribe='1')
+        path = os.path.dirname(os.path.dirname(savu.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [path] + [p for p in [env.get('PYTHONPATH')] if p])
+        runner = subprocess.Popen(
+            ['mpirun', '-np', str(NPROCS), sys.executable, '-c', RUNNER],
+            stdout=subprocess.PIPE, env=env)
+        stdout = runner.communicate()[0]
+        self.assertEqual(runner.returncode, 0)
+        results = sorted(l for l in stdout.splitlines() if
+                         l.startswith('run'))
+        # every process is released once the plugin has finished, the waiting
+        # processes are idle and the utilisation is only set on the master
+        self.assertEqual(results, ['run 0 True None True'] +
+                         ['run %i True True None' % i
+                          for i in range(1, NPROCS)])
+
+if __name__ == "__main__":
+    unittest.main()
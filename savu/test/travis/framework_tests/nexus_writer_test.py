@@ -0,0 +1,108 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: nexus_writer_test
+   :platform: Unix
+   :synopsis: unittest for writing the nexus file in a background thread
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import h5py
+import tempfile
+import threading
+import unittest
+
+from savu.plugins.savers.utils.hdf5_utils import NexusWriter
+
+
+def add_entry(name):
+    def func(nxs_file):
+        nxs_file.create_group('entry/' + name)
+    return func
+
+
+class NexusWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(tempfile.mkdtemp(), 'test.nxs')
+        h5py.File(self.filename, 'w').close()
+
+    def __get_entries(self):
+        with h5py.File(self.filename, 'r') as f:
+            return sorted(f['entry'].keys()) if 'entry' in f else []
+
+    def test_batched_writes(self):
+        opened = []
+        File = h5py.File
+
+        def counting_file(*args, **kwargs):
+            opened.append(args[0])
+            return File(*args, **kwargs)
+
+        started, release = threading.Event(), threading.Event()
+
+        def blocking_entry(nxs_file):
+            started.set()
+            release.wait(60)
+            add_entry('a')(nxs_file)
+
+        h5py.File = counting_file
+        try:
+            writer = NexusWriter(self.filename)
+            writer.add(blocking_entry)
+            self.assertTrue(started.wait(60))
+            # queued while the first entry is being written
+            for name in ['b', 'c', 'd']:
+                writer.add(add_entry(name))
+            release.set()
+            writer.close()
+        finally:
+            h5py.File = File
+        self.assertEqual(opened, [self.filename]*2)
+        self.assertEqual(self.__get_entries(), ['a', 'b', 'c', 'd'])
+
+    def test_close(self):
+        writer = NexusWriter(self.filename)
+        names = ['entry%i' % i for i in range(20)]
+        for name in names:
+            writer.add(add_entry(name))
+        # all the outstanding entries are written before close returns
+        writer.close()
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(self.__get_entries(), sorted(names))
+
+    def test_error(self):
+        def fail(nxs_file):
+            raise ValueError('unable to write the entry')
+
+        writer = NexusWriter(self.filename)
+        writer.add(fail)
+        writer.thread.join(0.5)
+        with self.assertRaises(Exception) as cm:
+            for name in ['a', 'b']:
+                writer.add(add_entry(name))
+            writer.close()
+        self.assertTrue('unable to write the entry' in str(cm.exception))
+        self.assertTrue(self.filename in str(cm.exception))
+        # the writer stops writing after an error
+        with self.assertRaises(Exception):
+            writer.close()
+        self.assertEqual(self.__get_entries(), [])
+
+if __name__ == "__main__":
+    unittest.main()
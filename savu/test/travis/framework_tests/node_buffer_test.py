@@ -0,0 +1,107 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: node_buffer_test
+   :platform: Unix
+   :synopsis: unittest for the synchronisation of in-memory datasets \
+       between nodes
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import unittest
+import subprocess
+import numpy as np
+from distutils.spawn import find_executable
+
+import savu
+from savu.data.data_structures.data_types.node_buffer import NodeBuffer, \
+    get_node_communicators
+
+NPROCS = 3
+
+# Each process is a node, writing every third projection (and single values
+# of the others), and the buffers are synchronised in small rounds.
+SYNCHRONISER = """
+import sys
+import numpy as np
+from mpi4py import MPI
+from savu.data.data_structures.data_types.node_buffer import NodeBuffer
+
+comm = MPI.COMM_WORLD
+comms = (comm.Split(comm.rank, 0), comm.Split(0, comm.rank))
+data = np.arange(12*5*7, dtype=np.float32).reshape(12, 5, 7)
+results = []
+for max_bytes in [2**27, 100, 10]:
+    buf = NodeBuffer(data.shape, data.dtype, comms, max_bytes=max_bytes)
+    for i in range(comm.rank, data.shape[0], comm.size):
+        buf[(slice(i, i+1), slice(None), slice(0, 7, 1))] = data[i:i+1]
+    buf[comm.rank, 4, ::3] = -1
+    buf.synchronise()
+    expected = data.copy()
+    for rank in range(comm.size):
+        expected[rank, 4, ::3] = -1
+    results.append(np.array_equal(buf[...], expected))
+    buf.free()
+sys.stdout.write('synchronised %i %s\\n' % (comm.rank, results))
+"""
+
+
+class NodeBufferTest(unittest.TestCase):
+
+    def __get_buffer(self, data):
+        buf = NodeBuffer(data.shape, data.dtype, get_node_communicators())
+        buf.fill_from(data)
+        return buf
+
+    def test_single_node(self):
+        data = np.random.rand(6, 4, 5).astype(np.float32)
+        buf = self.__get_buffer(data)
+        buf[1:3, :, 2] = 0
+        data[1:3, :, 2] = 0
+        buf.synchronise()
+        self.assertTrue(np.array_equal(buf[...], data))
+        self.assertEqual(buf.written, [])
+        out = np.zeros_like(data)
+        buf.write_to(out)
+        self.assertTrue(np.array_equal(out, data))
+        buf.free()
+
+    def test_sync_nbytes(self):
+        self.assertEqual(NodeBuffer.get_sync_nbytes(100), 200)
+
+    @unittest.skipUnless(find_executable('mpirun'), "requires mpirun")
+    def test_synchronise(self):
+        env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                   OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                   OMPI_MCA_rmaps_base_oversubscribe='1')
+        path = os.path.dirname(os.path.dirname(savu.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [path] + [p for p in [env.get('PYTHONPATH')] if p])
+        runner = subprocess.Popen(
+            ['mpirun', '-np', str(NPROCS), sys.executable, '-c',
+             SYNCHRONISER], stdout=subprocess.PIPE, env=env)
+        stdout = runner.communicate()[0]
+        self.assertEqual(runner.returncode, 0)
+        results = sorted(l for l in stdout.splitlines() if
+                         l.startswith('synchronised'))
+        self.assertEqual(results, ['synchronised %i [True, True, True]' % i
+                                   for i in range(NPROCS)])
+
+if __name__ == "__main__":
+    unittest.main()
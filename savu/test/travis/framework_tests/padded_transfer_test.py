@@ -0,0 +1,124 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: padded_transfer_test
+   :platform: Unix
+   :synopsis: unittest for the padding of transferred data
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import unittest
+import subprocess
+import numpy as np
+from distutils.spawn import find_executable
+
+import savu
+from savu.data.transport_data.slice_lists import _fill_padding, TransferHalo
+
+NPROCS = 3
+
+# Each process reads four frames in two transfers, padded by one frame before
+# and after.  The padding at the end of the last transfer of each process is
+# at the start of the first transfer of the next process.
+READER = """
+import sys
+import numpy as np
+from mpi4py import MPI
+from savu.data.transport_data.slice_lists import TransferHalo
+
+rank = MPI.COMM_WORLD.rank
+data = np.arange(12*3*4, dtype=np.float32).reshape(12, 3, 4)
+transfers = [(slice(s - 1, s + 3, 1), slice(0, 3, 1), slice(0, 4, 1))
+             for s in range(4*rank, 4*rank + 4, 2)]
+halo = TransferHalo(0, 1, 1, transfers, data.shape, data.dtype, 'tomo', True)
+reads = []
+
+
+def read(box, out, origin):
+    reads.append(box[0])
+    out[tuple(slice(b[0] - o, b[1] - o) for b, o in
+              zip(box, origin))] = data[tuple(slice(*b) for b in box)]
+
+
+correct = []
+for box in halo.boxes:
+    out = np.empty([b[1] - b[0] for b in box], dtype=data.dtype)
+    halo._read(box, out, [b[0] for b in box], read)
+    correct.append(np.array_equal(out, data[tuple(slice(*b) for b in box)]))
+sys.stdout.write('read %i %s %s\\n' % (rank, correct, reads))
+"""
+
+
+class PaddedTransferTest(unittest.TestCase):
+
+    def test_fill_padding(self):
+        data = np.random.rand(4, 5, 3)
+        for mode in ['edge', 'reflect', 'symmetric', 'wrap', 'constant']:
+            for pad in [[[2, 3], [0, 0], [1, 1]], [[5, 5], [1, 0], [0, 0]]]:
+                expected = np.pad(data, pad, mode=mode)
+                padded = np.empty(expected.shape)
+                padded[tuple(slice(p[0], p[0] + n) for p, n in
+                             zip(pad, data.shape))] = data
+                _fill_padding(padded, pad, mode)
+                self.assertTrue(np.array_equal(padded, expected))
+
+    def test_transfer_halo(self):
+        data = np.random.rand(20, 3, 4)
+        transfers = [(slice(s - 2, s + 7, 1), slice(0, 3, 1), slice(0, 4, 1))
+                     for s in range(0, 20, 4)]
+        halo = TransferHalo(0, 2, 3, transfers, data.shape, data.dtype,
+                            'tomo', False)
+        nread = []
+
+        def read(box, out, origin):
+            nread.append(box[0][1] - box[0][0])
+            out[tuple(slice(b[0] - o, b[1] - o) for b, o in
+                      zip(box, origin))] = data[tuple(slice(*b) for b in box)]
+
+        for box in halo.boxes:
+            out = np.empty([b[1] - b[0] for b in box])
+            halo._read(box, out, [b[0] for b in box], read)
+            self.assertTrue(np.array_equal(
+                out, data[tuple(slice(*b) for b in box)]))
+        # each frame is read once
+        self.assertEqual(sum(nread), 20)
+
+    @unittest.skipUnless(find_executable('mpirun'), "requires mpirun")
+    def test_transfer_halo_mpi(self):
+        env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                   OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                   OMPI_MCA_rmaps_base_oversubscribe='1')
+        path = os.path.dirname(os.path.dirname(savu.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [path] + [p for p in [env.get('PYTHONPATH')] if p])
+        reader = subprocess.Popen(
+            ['mpirun', '-np', str(NPROCS), sys.executable, '-c', READER],
+            stdout=subprocess.PIPE, env=env)
+        stdout = reader.communicate()[0]
+        self.assertEqual(reader.returncode, 0)
+        results = sorted(l for l in stdout.splitlines() if
+                         l.startswith('read'))
+        # the frame after the last transfer of the first two processes is
+        # received from the next process, not read from file
+        reads = ['[(0, 3), (3, 4)]', '[(3, 7), (7, 8)]', '[(7, 11), (11, 12)]']
+        self.assertEqual(results, ['read %i [True, True] %s' % (i, reads[i])
+                                   for i in range(NPROCS)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: plugin_index_test
+   :platform: Unix
+   :synopsis: unittest for the persisted plugin index
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+import savu.plugins.utils as pu
+import savu.plugins.plugin_index as pi
+from savu.plugins.reshape.downsample_filter import DownsampleFilter
+from savu.plugins.loaders.mapping_loaders.mm_loader import MmLoader
+
+
+class PluginIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.tmpdir, 'plugin_index.json')
+        self.env = os.environ.get('SAVU_PLUGIN_INDEX', None)
+        os.environ['SAVU_PLUGIN_INDEX'] = self.index_file
+        pu.get_plugins_paths()
+
+    def tearDown(self):
+        if self.env is None:
+            del os.environ['SAVU_PLUGIN_INDEX']
+        else:
+            os.environ['SAVU_PLUGIN_INDEX'] = self.env
+        pi.set_plugin_index({})
+        shutil.rmtree(self.tmpdir)
+
+    def test_indexed_parameters(self):
+        index = pi.load_plugin_index(update=True)
+        self.assertTrue(os.path.exists(self.index_file))
+        self.assertTrue('DownsampleFilter' in index.keys())
+        plugin = DownsampleFilter()
+        self.assertEqual(pi.get_indexed_parameters(DownsampleFilter),
+                         plugin._get_docstring_parameters())
+
+        plugin._populate_default_parameters()
+        self.assertEqual(plugin.parameters['bin_size'], 2)
+        self.assertEqual(plugin.parameters_types['bin_size'], int)
+
+    def test_parameter_updates(self):
+        # a plugin that overrides final_parameter_updates is not created from
+        # the index, so the update is always run
+        index = pi.load_plugin_index(update=True)
+        self.assertTrue(index['MmLoader']['dynamic'])
+        self.assertEqual(pi.get_indexed_parameters(MmLoader), None)
+        self.assertFalse(index['DownsampleFilter']['dynamic'])
+
+    def test_stale_entries(self):
+        pi.load_plugin_index(update=True)
+        with open(self.index_file, 'r') as f:
+            index = json.load(f)
+        for entry in index['plugins'].values():
+            for fname in entry['depends'].keys():
+                entry['depends'][fname] -= 1
+        with open(self.index_file, 'w') as f:
+            json.dump(index, f)
+
+        # a read-only load discards the modified entries
+        self.assertEqual(len(pi.load_plugin_index()), 0)
+        self.assertEqual(pi.get_indexed_parameters(DownsampleFilter), None)
+        # an update re-indexes them
+        self.assertTrue('DownsampleFilter' in
+                        pi.load_plugin_index(update=True).keys())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: progressive_test
+   :platform: Unix
+   :synopsis: unittest for the coarse-to-fine processing of a plugin list
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import h5py
+import tempfile
+import unittest
+import numpy as np
+
+import savu.test.test_utils as tu
+import savu.core.progressive as progressive
+from savu.core.plugin_runner import PluginRunner
+from savu.data.meta_data import MetaData
+
+
+class Experiment(object):
+
+    def __init__(self, nxs_filename):
+        self.meta_data = MetaData()
+        self.meta_data.set('nxs_filename', nxs_filename)
+        self.meta_data.set('progressive', {'dim': 1, 'length': 9})
+
+
+class ProgressiveTest(unittest.TestCase):
+
+    def test_get_strides(self):
+        self.assertEqual(progressive.get_strides('16,64'), [64, 16, 1])
+        self.assertEqual(progressive.get_strides([4, 1]), [4, 1])
+        with self.assertRaises(Exception):
+            progressive.get_strides('0')
+
+    def __set_options(self, **kwargs):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        options['progressive'] = '4'
+        options.update(kwargs)
+        # the input file is reused by every pass
+        loader = {'size': [20, 10, 30], 'dtype': 'int16',
+                  'file_name': 'input_array',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c'],
+                  'preview': [':', '1:end', ':']}
+        plugin = 'savu.plugins.basic_operations.no_process_plugin'
+        tu.set_plugin_list(options, plugin, [loader, {'pattern': 'SINOGRAM'},
+                                             {}])
+        return options
+
+    def test_progressive_plugin_list(self):
+        options = self.__set_options()
+        filename = progressive.get_filename(options)
+        passes = []
+        write_pass = progressive.write_pass
+
+        def record_pass(exp, fname, stride, final):
+            written = write_pass(exp, fname, stride, final)
+            with h5py.File(fname, 'r') as f:
+                passes.append((stride, f['entry/final_result_tomo/data'][...]))
+            return written
+
+        progressive.write_pass = record_pass
+        try:
+            runner = PluginRunner(options)
+            exp = runner.exp
+            runner._run_plugin_list()
+        finally:
+            progressive.write_pass = write_pass
+        # the experiment is reused by every pass
+        self.assertTrue(runner.exp is exp)
+
+        path = options['out_path']
+        with h5py.File(os.path.join(path, 'input_array.h5'), 'r') as f:
+            in_data = f['test'][:, 1:, :]
+
+        self.assertEqual([p[0] for p in passes], [4, 1])
+        coarse = passes[0][1]
+        self.assertEqual(coarse.shape, in_data.shape)
+        self.assertTrue(np.all(coarse[:, ::4] == in_data[:, ::4]))
+
+        with h5py.File(filename, 'r') as f:
+            entry = f['entry/final_result_tomo']
+            self.assertEqual(entry.attrs['stride'], 1)
+            # the final pass is linked, not copied
+            link = entry.get('data', getlink=True)
+            self.assertTrue(isinstance(link, h5py.ExternalLink))
+            self.assertTrue(np.all(entry['data'][...] == in_data))
+
+    def test_write_pass_by_label(self):
+        path = tempfile.mkdtemp()
+        nxs_filename = os.path.join(path, 'test_processed.nxs')
+        results = {'a': (['rotation_angle', 'detector_y', 'detector_x'],
+                         (4, 3, 5)),
+                   'b': (['detector_y', 'rotation_angle', 'detector_x'],
+                         (3, 4, 5)),
+                   'c': (['rotation_angle', 'voxel_y', 'detector_x'],
+                         (4, 3, 5))}
+        with h5py.File(nxs_filename, 'w') as f:
+            for name, (axes, shape) in results.items():
+                entry = f.create_group('entry/final_result_' + name)
+                entry.attrs['axes'] = axes
+                entry['data'] = np.ones(shape, dtype=np.float32)
+
+        filename = os.path.join(path, 'test_progressive.nxs')
+        written = progressive.write_pass(
+            Experiment(nxs_filename), filename, 3, False)
+        # the result without the progressive axis label is not written
+        self.assertEqual(written, ['a', 'b'])
+        with h5py.File(filename, 'r') as f:
+            a = f['entry/final_result_a/data'][...]
+            b = f['entry/final_result_b/data'][...]
+        self.assertEqual(a.shape, (4, 9, 5))
+        self.assertTrue(np.all(a[:, ::3] == 1))
+        self.assertTrue(np.all(np.isnan(a[:, 1::3])))
+        self.assertEqual(b.shape, (9, 4, 5))
+        self.assertTrue(np.all(b[::3] == 1))
+        self.assertTrue(np.all(np.isnan(b[1::3])))
+
+    def test_invalid_progressive_dim(self):
+        options = self.__set_options(progressive_dim='voxel_y')
+        with self.assertRaises(Exception) as cm:
+            PluginRunner(options)._run_plugin_list()
+        self.assertTrue('detector_x' in str(cm.exception))
+        self.assertTrue('rotation_angle' in str(cm.exception))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: streaming_test
+   :platform: Unix
+   :synopsis: unittest for processing a growing input file
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import h5py
+import tempfile
+import unittest
+import subprocess
+import numpy as np
+
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+from savu.data.data_structures.data_types.streaming_data import \
+    StreamingData
+
+SHAPE = (24, 6, 10)
+IMAGE_KEY = np.array([2, 2, 1, 1] + [0]*(SHAPE[0] - 4))
+
+# An NXtomo file written with SWMR, one frame at a time, by a separate
+# process that does not share the hdf5 library state of the test.
+WRITER = """
+import sys, time, h5py
+import numpy as np
+fname, nFrames, delay = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+shape, image_key = %r, %r
+with h5py.File(fname, 'w', libver='latest') as f:
+    entry = 'entry1/tomo_entry/'
+    data = f.create_dataset(entry + 'data/data', (0,) + shape[1:],
+                            maxshape=(None,) + shape[1:],
+                            chunks=(1,) + shape[1:], dtype=np.float32)
+    f[entry + 'instrument/detector/image_key'] = image_key
+    f[entry + 'data/rotation_angle'] = np.linspace(0, 180, shape[0])
+    f.swmr_mode = True
+    sys.stdout.write('started\\n')
+    sys.stdout.flush()
+    for i in range(nFrames):
+        time.sleep(delay)
+        data.resize(i + 1, axis=0)
+        data[i] = np.arange(np.prod(shape[1:]), dtype=np.float32).reshape(
+            shape[1:]) + 100*i
+        data.flush()
+""" % (SHAPE, list(IMAGE_KEY))
+
+
+def frame(i):
+    return np.arange(np.prod(SHAPE[1:]), dtype=np.float32).reshape(
+        SHAPE[1:]) + 100*i
+
+
+class StreamingTest(unittest.TestCase):
+
+    def __start_scan(self, nFrames, delay):
+        fname = os.path.join(tempfile.mkdtemp(), 'scan.nxs')
+        writer = subprocess.Popen(
+            [sys.executable, '-c', WRITER, fname, str(nFrames), str(delay)],
+            stdout=subprocess.PIPE)
+        self.assertEqual(writer.stdout.readline().strip(), 'started')
+        return fname, writer
+
+    def __finish_scan(self, writer):
+        writer.communicate()
+        self.assertEqual(writer.returncode, 0)
+
+    def test_streaming_data(self):
+        fname, writer = self.__start_scan(6, 0.01)
+        with h5py.File(fname, 'r', libver='latest', swmr=True) as f:
+            data = StreamingData(f['entry1/tomo_entry/data/data'], SHAPE,
+                                 poll=0.01, timeout=0.5)
+            self.assertEqual(data.get_shape(), SHAPE)
+            self.assertEqual(data.dtype, np.float32)
+            self.assertTrue(np.all(data[4] == frame(4)))
+            self.assertTrue(np.all(data[[1, 3], :, 2] == frame(3)[:, 2] -
+                                   np.array([[200], [0]])))
+            self.__finish_scan(writer)
+            # the newest frame may still be being written
+            self.assertEqual(data.get_nframes(), 5)
+            with self.assertRaises(Exception):
+                data[5:8]
+            self.assertFalse(data.is_complete())
+
+            # a second handle to the dataset would break the reads
+            with h5py.File(fname, 'r', libver='latest', swmr=True) as f2:
+                other = StreamingData(f2['entry1/tomo_entry/data/data'],
+                                      SHAPE)
+                self.assertTrue(other.data is data.data)
+
+    def test_streamed_plugin_list(self):
+        fname, writer = self.__start_scan(SHAPE[0], 0.02)
+        options = tu.set_options(fname)
+        options['loader'] = \
+            'savu.plugins.loaders.full_field_loaders.nxtomo_loader'
+        options.update({'stream': True, 'stream_frames': SHAPE[0],
+                        'stream_poll': 0.01, 'stream_timeout': 10.0})
+        plugin = 'savu.plugins.basic_operations.no_process_plugin'
+        tu.set_plugin_list(options, plugin, [{}, {'pattern': 'PROJECTION'},
+                                             {}])
+        exp = PluginRunner(options)._run_plugin_list()
+        self.__finish_scan(writer)
+
+        expected = np.array([frame(i) for i in np.where(IMAGE_KEY == 0)[0]])
+        fname = exp.meta_data.get('filename').values()[0]
+        with h5py.File(fname, 'r') as f:
+            group = [g for g in f.values() if isinstance(g, h5py.Group)]
+            self.assertTrue(np.all(group[0]['data'][...] == expected))
+
+if __name__ == "__main__":
+    unittest.main()
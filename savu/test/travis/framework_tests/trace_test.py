@@ -0,0 +1,81 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: trace_test
+   :platform: Unix
+   :synopsis: unittest for the trace events and their summary
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import json
+import unittest
+
+import savu.core.trace as trace
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+
+
+class TraceTest(unittest.TestCase):
+
+    def __event(self, name, cat, ts, dur, plugin):
+        return {'name': name, 'cat': cat, 'ph': 'X', 'ts': ts, 'dur': dur,
+                'pid': 0, 'tid': 0, 'args': {'plugin': plugin}}
+
+    def test_summary(self):
+        events = [self.__event('A', 'plugin', 0, 100, 'A'),
+                  self.__event('read', 'read', 10, 20, 'A'),
+                  self.__event('process', 'process', 30, 50, 'A'),
+                  self.__event('open', 'file', 85, 10, 'A'),
+                  self.__event('barrier', 'barrier', 88, 5, 'A'),
+                  self.__event('barrier', 'barrier', 100, 5, None)]
+        summary, nProcs = trace.summarise(events)
+        self.assertEqual(nProcs, 1)
+        self.assertAlmostEqual(summary['A']['io']*1e6, 25)
+        self.assertAlmostEqual(summary['A']['compute']*1e6, 50)
+        self.assertAlmostEqual(summary['A']['wait']*1e6, 5)
+        self.assertAlmostEqual(summary['A']['other']*1e6, 20)
+        self.assertAlmostEqual(summary['framework']['wait']*1e6, 5)
+
+    def test_plugin_list_trace(self):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        options['trace'] = True
+        loader = {'size': [20, 10, 30], 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        plugin = 'savu.plugins.filters.median_filter'
+        tu.set_plugin_list(options, plugin, [loader, {}, {}])
+        PluginRunner(options)._run_plugin_list()
+        self.assertFalse(trace.is_enabled())
+
+        out_file = os.path.join(options['log_path'], 'trace.json')
+        events = trace.merge_trace_files(options['log_path'], out_file)
+        with open(out_file, 'r') as f:
+            self.assertEqual(json.load(f)['traceEvents'], events)
+
+        names = [(e['name'], e['args']['plugin']) for e in events
+                 if e['ph'] == 'X']
+        for name in ['read', 'process', 'write', 'open', 'MedianFilter']:
+            self.assertTrue((name, 'MedianFilter') in names)
+        summary, nProcs = trace.summarise(events)
+        self.assertTrue(summary['MedianFilter']['compute'] > 0)
+        self.assertTrue('MedianFilter' in trace.format_summary(summary, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: component_analysis_test
+   :platform: Unix
+   :synopsis: unittest for the distributed component analysis
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import h5py
+import unittest
+import numpy as np
+from sklearn.decomposition import PCA
+
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+
+
+class ComponentAnalysisTest(unittest.TestCase):
+
+    def __run(self, plugin, params, data=None):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        fname = options['out_path'] + '/input_array.h5'
+        if data is not None:
+            # the loader uses an existing input file
+            with h5py.File(fname, 'w') as f:
+                f['test'] = data
+        loader = {'size': [10, 12, 16], 'dtype': 'int16',
+                  'dataset_name': 'xrf',
+                  'axis_labels': ['x.pixels', 'y.pixels', 'energy.keV'],
+                  'patterns': ['SPECTRUM.0s.1s.2c', 'PROJECTION.0c.1c.2s']}
+        params.update({'in_datasets': ['xrf']})
+        plugin = 'savu.plugins.component_analysis.' + plugin
+        tu.set_plugin_list(options, plugin, [loader, params, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        in_data = h5py.File(fname, 'r')['test'][...]
+        results = {}
+        for name, fname in exp.meta_data.get('filename').iteritems():
+            with h5py.File(fname, 'r') as f:
+                group = [g for g in f.values() if isinstance(g, h5py.Group)]
+                results[name] = group[0]['data'][...]
+        return in_data.reshape(-1, in_data.shape[-1]), results
+
+    def __check_pca(self, data, results):
+        pca = PCA(n_components=3, whiten=True)
+        scores = pca.fit_transform(data)
+        self.assertEqual(results['scores'].shape, (10, 12, 3))
+        # the components are found up to a sign
+        self.assertTrue(np.allclose(np.abs(results['eigenvectors']),
+                                    np.abs(pca.components_), atol=1e-5))
+        self.assertTrue(np.allclose(np.abs(results['scores'].reshape(-1, 3)),
+                                    np.abs(scores), atol=1e-4))
+
+    def test_pca(self):
+        data, results = self.__run(
+            'pca', {'whiten': 1, 'chunk': 'PROJECTION', 'distributed': False})
+        self.__check_pca(data, results)
+
+    def test_distributed_pca(self):
+        data, results = self.__run('pca', {'whiten': 1, 'distributed': True})
+        self.__check_pca(data, results)
+
+    def test_distributed_ica(self):
+        # independent (non-gaussian) sources mixed into the spectra
+        state = np.random.RandomState(0)
+        sources = np.array([state.uniform(-1, 1, 120),
+                            np.sign(state.uniform(-1, 1, 120)),
+                            state.laplace(size=120)]).T
+        mixing = state.uniform(0, 1, (3, 16))
+        data = np.dot(sources, mixing).reshape(10, 12, 16) + 10
+
+        data, results = self.__run(
+            'ica', {'sample_size': 120, 'distributed': True}, data=data)
+        self.assertEqual(results['eigenvectors'].shape, (3, 16))
+        scores = results['scores'].reshape(-1, 3)
+        # the scores are white
+        self.assertTrue(np.allclose(np.cov(scores.T), np.eye(3), atol=1e-3))
+        # and recover the sources, up to their order, sign and scale
+        corr = np.abs(np.corrcoef(scores.T, sources.T)[:3, 3:])
+        self.assertTrue(np.all(np.sort(corr.max(axis=0)) > 0.99))
+        self.assertEqual(sorted(corr.argmax(axis=0)), [0, 1, 2])
+
+if __name__ == "__main__":
+    unittest.main()
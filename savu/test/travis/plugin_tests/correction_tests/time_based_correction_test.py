@@ -21,7 +21,11 @@
 
 """
 import unittest
+import numpy as np
+
 from savu.test import test_utils as tu
+from savu.plugins.corrections.time_based_correction import \
+    TimeBasedCorrection
 
 from savu.test.travis.framework_tests.plugin_runner_test import \
     run_protected_plugin_runner
@@ -43,6 +47,88 @@ class TimeBasedCorrectionTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def __nearest_frames(self, split_idx, idx_list, global_val):
+        """ The nearest frames and distances for a single frame. """
+        list_idx = [global_val in i for i in split_idx].index(True)
+        val_list = split_idx[list_idx]
+        pos = np.where(val_list == global_val)[0][0]
+        dist = [(len(val_list)-pos)/float(len(val_list)),
+                pos/float(len(val_list))]
+        new_list = list(np.sort(np.append(idx_list, list_idx)))
+        new_idx = new_list.index(list_idx)
+        entry1 = new_idx-1 if new_idx != 0 else new_idx+1
+        entry2 = new_idx+1 if new_idx != len(new_list)-1 else new_idx-1
+        return [idx_list.index(new_list[entry1]),
+                idx_list.index(new_list[entry2])], dist
+
+    def test_find_nearest_frames(self):
+        image_key = np.array([2]*2 + [0]*5 + [1]*3 + [0]*7 + [1]*2 + [0]*4 +
+                             [2]*3 + [1]*2 + [0]*6)
+        plugin = TimeBasedCorrection()
+        plugin.image_key = image_key
+        changes = np.where(np.diff(image_key) != 0)[0] + 1
+        plugin.split_key = np.split(image_key, changes)
+        plugin.split_idx = np.split(np.arange(len(image_key)), changes)
+        data_key = np.where(image_key == 0)[0]
+
+        for key in [1, 2]:
+            idx_list = \
+                list(np.where([key in i for i in plugin.split_key])[0])
+            frames, dist = plugin.find_nearest_frames(idx_list, data_key)
+            for i, val in enumerate(data_key):
+                expected = self.__nearest_frames(
+                    plugin.split_idx, idx_list, val)
+                self.assertEqual(list(frames[:, i]), expected[0])
+                np.testing.assert_allclose(dist[:, i], expected[1])
+
+        plugin.flat_stack = np.random.rand(3, 4, 5).astype(np.float32)
+        frames = np.array([[0, 1, 2], [1, 2, 2]])
+        dist = np.array([[0.25, 1.0, 0.5], [0.75, 0.0, 0.5]])
+        flat = plugin.calculate_flat_field(frames, dist)
+        for i in range(3):
+            np.testing.assert_allclose(
+                flat[i], plugin.flat_stack[frames[0, i]]*dist[0, i] +
+                plugin.flat_stack[frames[1, i]]*dist[1, i], rtol=1e-6)
+
+    def test_process_frames(self):
+        """ A block of several projections is corrected with the flat and
+        dark fields of each of its frames. """
+        class Plugin(TimeBasedCorrection):
+            def get_current_slice_list(self):
+                return [self.sl]
+
+            def get_global_frame_index(self):
+                # one index per block of frames, as in the framework
+                return [np.arange(4)]
+
+        plugin = Plugin()
+        plugin.parameters = {'in_range': False}
+        plugin.count = 0
+        plugin.proj_dim = plugin.slice_dir = 0
+        plugin.flat_stack = np.random.rand(2, 4, 5).astype(np.float32) + 2
+        plugin.dark_stack = np.random.rand(2, 4, 5).astype(np.float32)
+        nFrames = 8
+        plugin.flat_frames = plugin.dark_frames = \
+            np.array([[0]*nFrames, [1]*nFrames])
+        weights = np.linspace(0, 1, nFrames)
+        plugin.flat_dist = np.array([1 - weights, weights])
+        plugin.dark_dist = np.array([weights, 1 - weights])
+
+        def expected(frame, proj):
+            flat = plugin.calculate_flat_field(
+                plugin.flat_frames[:, [frame]], plugin.flat_dist[:, [frame]])
+            dark = plugin.calculate_dark_field(
+                plugin.dark_frames[:, [frame]], plugin.dark_dist[:, [frame]])
+            return (proj - dark[0])/(flat[0] - dark[0])
+
+        proj = np.random.rand(3, 4, 5).astype(np.float32) + 1
+        for sl, frames in [(slice(2, 5, 1), [2, 3, 4]),
+                           (slice(6, 8, 1), [6, 7, 7])]:
+            plugin.sl = [sl, slice(None), slice(None)]
+            result = plugin.process_frames([proj.copy()])
+            for i, frame in enumerate(frames):
+                np.testing.assert_allclose(
+                    result[i], expected(frame, proj[i]), rtol=1e-5)
 
 if __name__ == "__main__":
     unittest.main()
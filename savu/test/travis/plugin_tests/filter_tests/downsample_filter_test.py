@@ -21,9 +21,13 @@
 
 """
 
+import h5py
 import unittest
+import numpy as np
 
 import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+from savu.plugins.reshape.downsample_filter import DownsampleFilter
 from savu.test.travis.framework_tests.plugin_runner_test import \
     run_protected_plugin_runner
 
@@ -36,5 +40,60 @@ class PluginRunnerDownsamplePluginTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def __run(self, params):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        loader = {'size': [21, 13, 30], 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        plugin = 'savu.plugins.reshape.downsample_filter'
+        tu.set_plugin_list(options, plugin, [loader, params, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        in_data = h5py.File(
+            options['out_path'] + '/input_array.h5', 'r')['test'][...]
+        fname = exp.meta_data.get('filename').values()[0]
+        with h5py.File(fname, 'r') as f:
+            group = [g for g in f.values() if isinstance(g, h5py.Group)]
+            return in_data, group[0]['data'][...]
+
+    def __reference(self, data, bins, sampler):
+        padded = np.zeros([-(-s // b)*b for s, b in zip(data.shape, bins)])
+        padded[tuple(slice(0, s) for s in data.shape)] = data
+        out = np.zeros([s/b for s, b in zip(padded.shape, bins)])
+        for idx in np.ndindex(*out.shape):
+            sl = tuple(slice(i*b, (i+1)*b) for i, b in zip(idx, bins))
+            out[idx] = sampler(padded[sl])
+        return out
+
+    def test_3d_binning(self):
+        for mode, sampler in [('mean', np.mean), ('max', np.max)]:
+            params = {'mode': mode, 'bin_size': 2, 'slice_bin_size': 3,
+                      'pattern': 'SINOGRAM'}
+            in_data, out_data = self.__run(params)
+            self.assertEqual(out_data.shape, (11, 5, 15))
+            np.testing.assert_allclose(
+                out_data, self.__reference(in_data, (2, 3, 2), sampler),
+                rtol=1e-5)
+
+    def test_frame_binning(self):
+        params = {'mode': 'median', 'bin_size': 3}
+        in_data, out_data = self.__run(params)
+        self.assertEqual(out_data.shape, (21, 5, 10))
+        np.testing.assert_allclose(
+            out_data, self.__reference(in_data, (1, 3, 3), np.median),
+            rtol=1e-5)
+
+    def test_downsample(self):
+        data = np.arange(24.).reshape(2, 3, 4)
+        np.testing.assert_array_equal(
+            DownsampleFilter.downsample(data, [2, 2, 2], np.max),
+            [[[17, 19], [21, 23]]])
+        np.testing.assert_array_equal(
+            DownsampleFilter.downsample(data[0], [1, 3, 2], np.min),
+            [[0, 2]])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -20,8 +20,14 @@
 .. moduleauthor:: Mark Basham <scientificsoftware@diamond.ac.uk>
 
 """
+import h5py
 import unittest
+import numpy as np
+from scipy.signal import savgol_filter
+
 from savu.test import test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+from savu.plugins.filters.find_peaks import FindPeaks
 from savu.test.travis.framework_tests.plugin_runner_test import \
     run_protected_plugin_runner
 
@@ -34,5 +40,61 @@ class FindPeaksTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def __indexes(self, y, thresh, min_dist):
+        """ Peak detection for a single spectrum, as in peakutils. """
+        thresh = thresh*(np.max(y) - np.min(y)) + np.min(y)
+        dy = np.diff(y)
+        peaks = np.where((np.hstack([dy, 0.]) < 0.) &
+                         (np.hstack([0., dy]) > 0.) & (y > thresh))[0]
+        if peaks.size > 1 and min_dist > 1:
+            highest = peaks[np.argsort(y[peaks])][::-1]
+            rem = np.ones(y.size, dtype=bool)
+            rem[peaks] = False
+            for peak in highest:
+                if not rem[peak]:
+                    rem[max(0, peak - min_dist):peak + min_dist + 1] = True
+                    rem[peak] = False
+            peaks = np.arange(y.size)[~rem]
+        return peaks
+
+    def test_find_peaks(self):
+        data = np.random.rand(20, 300)
+        for thresh, min_dist in [(0.03, 15), (0.5, 1), (0.2, 4)]:
+            peaks = FindPeaks.find_peaks(data, thresh, min_dist)
+            for i in range(len(data)):
+                np.testing.assert_array_equal(
+                    np.where(peaks[i])[0],
+                    self.__indexes(data[i], thresh, min_dist))
+
+    def __run(self, size):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        loader = {'size': size, 'dtype': 'int16',
+                  'axis_labels': ['x.mm', 'y.mm', 'energy.keV'],
+                  'patterns': ['SPECTRUM.0s.1s.2c']}
+        plugin = 'savu.plugins.filters.find_peaks'
+        tu.set_plugin_list(options, plugin, [loader, {}, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        in_data = h5py.File(
+            options['out_path'] + '/input_array.h5', 'r')['test'][...]
+        fname = exp.meta_data.get('filename').values()[0]
+        with h5py.File(fname, 'r') as f:
+            group = [g for g in f.values() if isinstance(g, h5py.Group)]
+            return in_data, group[0]['data'][...]
+
+    def test_uneven_maps(self):
+        # the frames of each transfer are not a divisor of the map size
+        for size in [[5, 7, 100], [7, 5, 100]]:
+            in_data, out_data = self.__run(size)
+            # the frames are flattened with the first dimension changing
+            # fastest
+            spectra = in_data.transpose(1, 0, 2).reshape(-1, size[-1])
+            peaks = FindPeaks.find_peaks(
+                savgol_filter(spectra, 51, 3, axis=-1), 0.03, 15)
+            self.assertEqual(out_data.shape, (size[0]*size[1], size[-1]))
+            np.testing.assert_array_equal(out_data, peaks)
+
+
 if __name__ == "__main__":
     unittest.main()
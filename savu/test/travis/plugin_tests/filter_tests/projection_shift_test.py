@@ -0,0 +1,64 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: projection_shift_test
+   :platform: Unix
+   :synopsis: unittest for the projection shift plugin
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import h5py
+import unittest
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+import savu.test.test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+
+
+class ProjectionShiftTest(unittest.TestCase):
+
+    def test_template_matching(self):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+
+        # projections of a smooth image with known shifts
+        image = gaussian_filter(np.random.rand(80, 100), 2)
+        shifts = np.cumsum(np.random.randint(-2, 3, size=(20, 2)), axis=0)
+        shifts -= shifts[0]
+        data = np.array([np.roll(np.roll(image, s[0], 0), s[1], 1)
+                         [10:58, 10:74] for s in shifts])
+        # the loader uses an existing file
+        with h5py.File(options['out_path'] + '/input_array.h5', 'w') as f:
+            f['test'] = data.astype(np.float32)
+
+        loader = {'size': list(data.shape),
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        params = {'method': 'template_matching',
+                  'template': ['12:36', '16:48']}
+        plugin = 'savu.plugins.alignment.projection_shift'
+        tu.set_plugin_list(options, plugin, [loader, params, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        meta_data = exp.index['in_data']['tomo'].meta_data
+        np.testing.assert_allclose(
+            meta_data.get('proj_align_shift'), shifts, atol=1e-6)
+
+if __name__ == "__main__":
+    unittest.main()
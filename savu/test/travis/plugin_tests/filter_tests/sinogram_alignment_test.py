@@ -23,8 +23,10 @@
 """
 
 import unittest
+import numpy as np
 
 import savu.test.test_utils as tu
+from savu.plugins.alignment.sinogram_alignment import SinogramAlignment
 from savu.test.travis.framework_tests.plugin_runner_test import \
     run_protected_plugin_runner
 
@@ -37,5 +39,27 @@ class SinogramAlignmentTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def test_row_alignment(self):
+        np.random.seed(0)
+        angles = np.linspace(0, 180, 90)
+        x = np.arange(64)
+        sine = 30 + 10*np.sin(np.deg2rad(angles - 20))
+        sinograms = np.empty((3, len(angles), len(x)))
+        for i in range(len(sinograms)):
+            centre = sine + np.random.uniform(-2, 2, len(angles))
+            sinograms[i] = np.exp(-(x - centre[:, np.newaxis])**2/20.)
+
+        plugin = SinogramAlignment()
+        plugin.com_x = angles
+        plugin.basis = np.transpose([np.sin(np.deg2rad(angles)),
+                                     np.cos(np.deg2rad(angles)),
+                                     np.ones(len(angles))])
+        aligned = plugin._shift(sinograms, angles, plugin._com_y(sinograms))
+        # the centre of mass of every row now lies on a sine curve
+        com = plugin._com_y(aligned)
+        fit = np.linalg.lstsq(plugin.basis, com.T, rcond=-1)[0]
+        residual = com - np.dot(plugin.basis, fit).T
+        self.assertTrue(np.all(np.abs(residual) < 0.1))
+
 if __name__ == "__main__":
     unittest.main()
@@ -21,7 +21,11 @@
 
 """
 import unittest
+import numpy as np
+from scipy.signal import savgol_filter
+
 from savu.test import test_utils as tu
+from savu.plugins.filters.strip_background import StripBackground
 from savu.test.travis.framework_tests.plugin_runner_test import \
     run_protected_plugin_runner
 
@@ -34,5 +38,42 @@ class StripBackgroundTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def __strip(self, data, its, w, smoothed):
+        """ Strip a single spectrum, one point at a time. """
+        filtered = savgol_filter(data, 35, 5)
+        npts = len(filtered)
+        for k in range(its):
+            aved = filtered.copy()
+            for i in range(npts - w):
+                if i < w:
+                    aved[i] = (filtered[i] + filtered[i+w])/2.
+                else:
+                    aved[i] = \
+                        (filtered[i-w] + filtered[i] + filtered[i+w])/3.
+            filtered = np.minimum(filtered, aved)
+            if not k % smoothed:
+                filtered = savgol_filter(filtered, 35, 5)
+        return filtered
+
+    def test_strip_block(self):
+        npts = 200
+        x = np.arange(npts)
+        data = np.random.rand(2, 3, npts)*5 + 50*np.exp(-(x-80.)**2/20.)
+
+        plugin = StripBackground()
+        plugin._populate_default_parameters()
+        plugin.parameters['iterations'] = 12
+        plugin.spectrum_dim = 2
+        plugin.window_sl = plugin._get_window_slices(npts)
+        plugin.sg_kernels = plugin._get_savgol_kernels(35, 5)
+        stripped, background = plugin.process_frames([data])
+
+        for idx in np.ndindex(2, 3):
+            expected = self.__strip(data[idx], 12, 10, 5)
+            np.testing.assert_allclose(background[idx], expected, atol=1e-8)
+            np.testing.assert_allclose(
+                stripped[idx], data[idx] - expected, atol=1e-8)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,119 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: base_loader_test
+   :platform: Unix
+   :synopsis: unittest for reading the loader metadata on a single process
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import h5py
+import tempfile
+import unittest
+import subprocess
+import numpy as np
+from distutils.spawn import find_executable
+
+import savu
+from savu.data.meta_data import MetaData
+from savu.plugins.loaders.base_loader import BaseLoader
+
+NPROCS = 3
+
+# Each process reads the image key, and the angles of a missing entry, through
+# the loader.  Only the first process opens the file.
+READER = """
+import sys
+import h5py
+import numpy as np
+from mpi4py import MPI
+from savu.data.meta_data import MetaData
+from savu.plugins.loaders.base_loader import BaseLoader
+
+class Experiment(object):
+    meta_data = MetaData()
+    meta_data.set('mpi', True)
+
+reads = []
+
+def read(fname, path):
+    reads.append(path)
+    return h5py.File(fname, 'r')[path]
+
+loader = BaseLoader()
+loader.exp = Experiment()
+image_key = loader._get_metadata(read, sys.argv[1], 'image_key')
+try:
+    loader._get_metadata(read, sys.argv[1], 'rotation_angle')
+    error = None
+except KeyError:
+    error = 'KeyError'
+sys.stdout.write('read %i %s %s %s %s\\n' % (
+    MPI.COMM_WORLD.rank, type(image_key).__name__, list(image_key), error,
+    reads))
+"""
+
+
+class Experiment(object):
+
+    def __init__(self, mpi):
+        self.meta_data = MetaData()
+        self.meta_data.set('mpi', mpi)
+
+
+class BaseLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fname = os.path.join(tempfile.mkdtemp(), 'metadata.h5')
+        with h5py.File(self.fname, 'w') as f:
+            f['image_key'] = np.array([2, 1, 0, 0])
+
+    def test_get_metadata(self):
+        loader = BaseLoader()
+        loader.exp = Experiment(False)
+        with h5py.File(self.fname, 'r') as f:
+            image_key = loader._get_metadata(lambda p: f[p], 'image_key')
+            self.assertEqual(type(image_key), np.ndarray)
+            self.assertEqual(list(image_key), [2, 1, 0, 0])
+            self.assertEqual(loader._get_metadata(len, 'abc'), 3)
+            self.assertRaises(KeyError, loader._get_metadata,
+                              lambda p: f[p], 'rotation_angle')
+
+    @unittest.skipUnless(find_executable('mpirun'), "requires mpirun")
+    def test_get_metadata_mpi(self):
+        env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                   OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                   OMPI_MCA_rmaps_base_oversubscribe='1')
+        path = os.path.dirname(os.path.dirname(savu.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [path] + [p for p in [env.get('PYTHONPATH')] if p])
+        reader = subprocess.Popen(
+            ['mpirun', '-np', str(NPROCS), sys.executable, '-c', READER,
+             self.fname], stdout=subprocess.PIPE, env=env)
+        stdout = reader.communicate()[0]
+        self.assertEqual(reader.returncode, 0)
+        results = sorted(l for l in stdout.splitlines() if
+                         l.startswith('read'))
+        # the metadata is read on the first process and broadcast
+        reads = ["['image_key', 'rotation_angle']"] + ['[]']*(NPROCS - 1)
+        self.assertEqual(results, ['read %i ndarray [2, 1, 0, 0] KeyError %s'
+                                   % (i, reads[i]) for i in range(NPROCS)])
+
+if __name__ == "__main__":
+    unittest.main()
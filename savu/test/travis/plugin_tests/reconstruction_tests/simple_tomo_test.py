@@ -20,8 +20,12 @@
 .. moduleauthor:: Mark Basham <scientificsoftware@diamond.ac.uk>
 
 """
+import h5py
 import unittest
+import numpy as np
+
 from savu.test import test_utils as tu
+from savu.core.plugin_runner import PluginRunner
 from savu.test.travis.framework_tests.plugin_runner_test \
     import run_protected_plugin_runner
 
@@ -35,5 +39,52 @@ class SimpleTomoTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def test_reference(self):
+        self.__run_reference({})
+
+    def test_reference_uncached(self):
+        # the detector indices do not fit in the memory of each process
+        self.__run_reference({'rank_memory': 0.01})
+
+    def __run_reference(self, extra_options):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options.update(extra_options)
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        loader = {'size': [30, 5, 20], 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        params = {'log': False, 'centre_of_rotation': 9.5}
+        tu.set_plugin_list(options,
+                           'savu.plugins.reconstructions.simple_recon',
+                           [loader, params, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        data = h5py.File(
+            options['out_path'] + '/input_array.h5', 'r')['test'][...]
+        recon = h5py.File(exp.meta_data.get(['filename', 'tomo']), 'r')
+        recon = recon['1-SimpleRecon-tomo']['data'][...]
+        for j in range(data.shape[1]):
+            expected = self.__reference(data[:, j, :], 9.5, (20, 20))
+            self.assertTrue(np.allclose(recon[:, j, :], expected,
+                                        rtol=1e-4, atol=1e-3))
+
+    def __reference(self, sino, cor, vol_shape):
+        """ Back project one angle at a time. """
+        nAngles, width = sino.shape
+        centre = (vol_shape[0]/2, vol_shape[1]/2)
+        x, y = np.meshgrid(np.arange(-centre[0], vol_shape[0] - centre[0]),
+                           np.arange(-centre[1], vol_shape[1] - centre[1]))
+        ramp = np.abs(np.arange(width) - width/2)
+        result = np.zeros(vol_shape, dtype=np.float32)
+        for i in range(nAngles):
+            theta = i*(np.pi/nAngles)
+            filt = np.zeros(width*3, dtype=np.float32)
+            filt[width:width*2] = \
+                np.fft.ifft(np.fft.fft(np.log(sino[i]+1))*ramp).real
+            mapping = x*np.cos(theta) - y*np.sin(theta)
+            result += filt[(mapping + (cor + width)).astype('int')]
+        return result
+
 if __name__ == "__main__":
     unittest.main()
@@ -20,8 +20,13 @@
 .. moduleauthor:: Mark Basham <scientificsoftware@diamond.ac.uk>
 
 """
+import h5py
 import unittest
+import numpy as np
+
 from savu.test import test_utils as tu
+from savu.core.plugin_runner import PluginRunner
+from savu.plugins.analysis.utils.streaming_stats import StreamingStats
 from savu.test.travis.framework_tests.plugin_runner_test import \
     run_protected_plugin_runner
 
@@ -34,5 +39,53 @@ class StatsTest(unittest.TestCase):
         run_protected_plugin_runner(tu.set_options(data_file,
                                                    process_file=process_file))
 
+    def test_streaming_stats(self):
+        np.random.seed(0)
+        data = np.random.randn(30, 40, 50)*10 + 3
+        stats = [StreamingStats() for i in range(3)]
+        for i in range(len(data)):
+            stats[i % 3].update(data[i])
+        for s in stats[1:]:
+            stats[0].merge(s)
+        stats = stats[0]
+
+        self.assertEqual(stats.count, data.size)
+        self.assertEqual(stats.min, data.min())
+        self.assertEqual(stats.max, data.max())
+        self.assertAlmostEqual(stats.mean, data.mean())
+        self.assertAlmostEqual(stats.get_std(), data.std())
+        bin_width = 2*(data.max() - data.min())/stats.nbins
+        percentiles = [0, 5, 50, 95, 100]
+        self.assertTrue(np.allclose(stats.get_percentiles(percentiles),
+                                    np.percentile(data, percentiles),
+                                    atol=bin_width))
+        counts, edges = stats.get_histogram(10)
+        self.assertEqual(counts.sum(), data.size)
+        self.assertTrue(np.allclose(counts, np.histogram(data, 10)[0],
+                                    atol=data.size*1e-3))
+
+    def test_stats_metadata(self):
+        options = tu.set_options(tu.get_test_data_path('mm.nxs'))
+        options['loader'] = 'savu.plugins.loaders.random_hdf5_loader'
+        loader = {'size': [20, 10, 30], 'dtype': 'int16',
+                  'axis_labels': ['rotation_angle.degrees',
+                                  'detector_y.pixels', 'detector_x.pixels'],
+                  'patterns': ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']}
+        params = {'required_stats': ['max', 'min', 'mean', 'percentiles'],
+                  'percentiles': [50]}
+        tu.set_plugin_list(options, 'savu.plugins.analysis.stats',
+                           [loader, params, {}])
+        exp = PluginRunner(options)._run_plugin_list()
+
+        data = h5py.File(
+            options['out_path'] + '/input_array.h5', 'r')['test'][...]
+        meta_data = exp.index['in_data']['tomo'].meta_data
+        self.assertEqual(meta_data.get('max'), data.max())
+        self.assertEqual(meta_data.get('min'), data.min())
+        self.assertAlmostEqual(meta_data.get('mean'),
+                               data.mean(dtype=np.float64))
+        self.assertTrue(np.allclose(meta_data.get('percentile_values'),
+                                    np.percentile(data, 50), rtol=1e-2))
+
 if __name__ == "__main__":
     unittest.main()
@@ -61,6 +61,48 @@ def __option_parser():
                         default=False)
     parser.add_argument("-q", "--quiet", action="store_true", dest="quiet",
                         help="Display only Errors and Info.", default=False)
+    cache_help = "Cache the plugin list check in this folder and reuse it " \
+        "in identical runs."
+    parser.add_argument("--check_cache", help=cache_help, default=None)
+    memory_help = "The memory (MB) per node available for in-memory data, " \
+        "defaulting to half of the available memory."
+    parser.add_argument("--memory_budget", help=memory_help, type=float,
+                        default=None)
+    rank_memory_help = "The memory (MB) per process available for the " \
+        "data transfers of each plugin, defaulting to the available memory " \
+        "of the node divided by the number of processes on the node."
+    parser.add_argument("--rank_memory", help=rank_memory_help, type=float,
+                        default=None)
+    trace_help = "Write a timeline of the reads, processing, writes, " \
+        "barriers and file operations of each process to the log folder."
+    parser.add_argument("--trace", action="store_true", help=trace_help,
+                        default=False)
+    stream_help = "Process the input file while it is being written " \
+        "(opened in HDF5 SWMR mode). Reads of the data wait for the frames " \
+        "they require."
+    parser.add_argument("--stream", action="store_true", help=stream_help,
+                        default=False)
+    stream_frames_help = "The total number of frames in the streamed " \
+        "dataset, if its maximum shape is not fixed."
+    parser.add_argument("--stream_frames", help=stream_frames_help,
+                        type=int, default=None)
+    parser.add_argument("--stream_poll", type=float, default=1.0,
+                        help="The time (s) between checks for new frames.")
+    stream_timeout_help = "The time (s) without new frames after which " \
+        "the streamed data is considered incomplete."
+    parser.add_argument("--stream_timeout", help=stream_timeout_help,
+                        type=float, default=600.0)
+    progressive_help = "Process every n-th slice for each comma separated " \
+        "stride n (e.g. 64,16), followed by all slices, writing the results " \
+        "of each pass into a single progressive file."
+    parser.add_argument("--progressive", help=progressive_help, default=None)
+    progressive_dim_help = "The axis label of the dimension reduced in the " \
+        "progressive passes."
+    parser.add_argument("--progressive_dim", help=progressive_dim_help,
+                        default='detector_y')
+    affinity_help = "Do not pin the processes to the cores of each node."
+    parser.add_argument("--no_affinity", action="store_false",
+                        dest="affinity", help=affinity_help, default=True)
     # temporary flag to fix lustre issue
     parser.add_argument("--lustre_workaround", action="store_true",
                         dest="lustre", help="Avoid lustre segmentation fault",
@@ -134,6 +176,17 @@ def _set_options(args):
     options['bllog'] = args.bllog
     options['email'] = args.email
     options['femail'] = args.femail
+    options['check_cache'] = args.check_cache
+    options['memory_budget'] = args.memory_budget
+    options['rank_memory'] = args.rank_memory
+    options['affinity'] = args.affinity
+    options['trace'] = args.trace
+    options['stream'] = args.stream
+    options['stream_frames'] = args.stream_frames
+    options['stream_poll'] = args.stream_poll
+    options['stream_timeout'] = args.stream_timeout
+    options['progressive'] = args.progressive
+    options['progressive_dim'] = args.progressive_dim
 
     out_folder_name = \
         args.folder if args.folder else __get_folder_name(options['data_file'])
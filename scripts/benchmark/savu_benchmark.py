@@ -0,0 +1,297 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: savu_benchmark
+   :platform: Unix
+   :synopsis: A benchmark of the framework overhead, running process lists of \
+       no-op and basic-operation plugins on randomly generated data, and a \
+       comparison of the results from two versions of Savu.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+import savu
+import savu.core.trace as trace
+from savu.data.plugin_list import PluginList
+
+LOADERS = {'random': 'savu.plugins.loaders.random_hdf5_loader',
+           'tomo': 'savu.plugins.loaders.full_field_loaders.'
+                   'random_3d_tomo_loader'}
+NO_PROCESS = 'savu.plugins.basic_operations.no_process_plugin'
+BASIC_OPERATIONS = 'savu.plugins.basic_operations.basic_operations'
+PATTERNS = ['SINOGRAM.0c.1s.2c', 'PROJECTION.0s.1c.2c']
+AXIS_LABELS = ['rotation_angle.degrees', 'detector_y.pixels',
+               'detector_x.pixels']
+
+# name: (loader, size, [(plugin, parameters)])
+BENCHMARKS = {
+    'projection': ('random', [720, 128, 160],
+                   [(NO_PROCESS, {'pattern': 'PROJECTION'})]),
+    'sinogram': ('random', [720, 128, 160],
+                 [(NO_PROCESS, {'pattern': 'SINOGRAM'})]),
+    'pattern_change': ('random', [720, 128, 160],
+                       [(NO_PROCESS, {'pattern': 'PROJECTION'}),
+                        (NO_PROCESS, {'pattern': 'SINOGRAM'})]),
+    'basic_operations': ('random', [720, 128, 160],
+                         [(BASIC_OPERATIONS, {'operations': ['tomo*2.0'],
+                                              'pattern': 'PROJECTION'})]),
+    'tomo_loader': ('tomo', [724, 128, 160],
+                    [(NO_PROCESS, {'pattern': 'PROJECTION'})]),
+}
+
+# metric: True if larger values are better
+METRICS = {'plugin_time': False, 'wall_time': False,
+           'throughput_MBps': True, 'peak_rss_MB': False}
+
+
+def get_commit():
+    """ The git commit of the Savu source being benchmarked. """
+    path = os.path.dirname(os.path.dirname(savu.__file__))
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=path,
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        from savu.version import __version__
+        return __version__
+
+
+def create_process_list(fname, loader, size, plugins, dtype='int16'):
+    """ Save a process list of a random data loader followed by the plugins.
+
+    :param str fname: The process list file.
+    :param str loader: A key of LOADERS.
+    :param list size: The size of the generated data.
+    :param list plugins: (plugin module, parameters) pairs.
+    :param str dtype: The integer data type of the generated values.
+    """
+    params = {'size': list(size), 'dtype': dtype}
+    if loader == 'random':
+        params.update({'axis_labels': AXIS_LABELS, 'patterns': PATTERNS})
+    plugin_list = PluginList()
+    entries = [(LOADERS[loader], params)] + \
+        [(module, dict({'in_datasets': ['tomo'], 'out_datasets': ['tomo']},
+                       **p)) for module, p in plugins]
+    for pos, (module, params) in enumerate(entries):
+        name = ''.join(
+            x.capitalize() for x in module.split('.')[-1].split('_'))
+        entry = plugin_list._get_plugin_entry_template()
+        entry.update({'name': name, 'id': module, 'data': params,
+                      'desc': {}, 'pos': str(pos + 1)})
+        plugin_list.plugin_list.append(entry)
+    plugin_list._save_plugin_list(fname)
+
+
+def run_savu(process_list, out_folder, nProcs, mpirun):
+    """ Run Savu with tracing and return the wall time and trace events. """
+    names = ','.join('CPU%i' % i for i in range(nProcs))
+    cmd = [sys.executable, '-m', 'savu.tomo_recon', process_list,
+           process_list, out_folder, '-f', 'run', '-n', names, '-q',
+           '--trace']
+    if nProcs > 1:
+        cmd = mpirun.split() + ['-np', str(nProcs)] + cmd
+
+    env = dict(os.environ)
+    path = os.path.dirname(os.path.dirname(savu.__file__))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [path] + [p for p in [env.get('PYTHONPATH')] if p])
+    log = os.path.join(out_folder, 'benchmark.log')
+    start = time.time()
+    with open(log, 'w') as f:
+        status = subprocess.call(cmd, stdout=f, stderr=subprocess.STDOUT,
+                                 env=env)
+    wall_time = time.time() - start
+    if status:
+        with open(log, 'r') as f:
+            raise Exception("The benchmark run failed:\n%s\n%s" %
+                            (' '.join(cmd), ''.join(f.readlines()[-20:])))
+    events = trace.merge_trace_files(os.path.join(out_folder, 'run'))
+    return wall_time, events
+
+
+def get_plugin_time(events):
+    """ The time (s) from the start of the first plugin to the end of the
+    last plugin, on the slowest process. """
+    times = {}
+    for e in events:
+        if e.get('ph') == 'X' and e.get('cat') == 'plugin':
+            start, end = times.get(e['pid'], (np.inf, -np.inf))
+            times[e['pid']] = \
+                (min(start, e['ts']), max(end, e['ts'] + e['dur']))
+    return max(end - start for start, end in times.values())*1e-6
+
+
+def run_benchmark(name, nProcs=1, repeat=3, scale=1.0, dtype='int16',
+                  mpirun='mpirun', keep=False):
+    """ Run a benchmark several times and return the results of the fastest
+    run.
+
+    :param str name: A key of BENCHMARKS.
+    :param int nProcs: The number of processes.
+    :param int repeat: The number of runs.
+    :param float scale: Multiplies the size of the slice dimension of the \
+        first pattern (the number of projections).
+    :param str dtype: The integer data type of the generated values.
+    :param str mpirun: The mpirun command, used if nProcs > 1.
+    :param bool keep: Keep the output folders.
+    """
+    loader, size, plugins = copy.deepcopy(BENCHMARKS[name])
+    size[0] = max(int(size[0]*scale), 1)
+    runs = []
+    for i in range(repeat):
+        folder = tempfile.mkdtemp(prefix='savu_benchmark_%s_' % name)
+        try:
+            process_list = os.path.join(folder, 'process_list.nxs')
+            create_process_list(process_list, loader, size, plugins, dtype)
+            wall_time, events = run_savu(process_list, folder, nProcs, mpirun)
+            runs.append((get_plugin_time(events), wall_time, events))
+        finally:
+            if not keep:
+                shutil.rmtree(folder, ignore_errors=True)
+
+    plugin_time, wall_time, events = min(runs, key=lambda r: r[0])
+    summary, nTraced = trace.summarise(events)
+    # the generated data is stored as float32
+    nbytes = np.prod(size)*np.dtype(np.float32).itemsize*len(plugins)
+    return {'size': size, 'dtype': dtype,
+            'plugins': [p[0].split('.')[-1] for p in plugins],
+            'plugin_time': plugin_time,
+            'plugin_times': [r[0] for r in runs],
+            'wall_time': wall_time,
+            'throughput_MBps': nbytes/2.0**20/plugin_time,
+            'peak_rss_MB': trace.get_peak_memory(events),
+            'phases': {p: {c: v/nTraced for c, v in row.items()}
+                       for p, row in summary.items()}}
+
+
+def run(names, out_file, **kwargs):
+    """ Run the benchmarks and save the results to a json file. """
+    results = {'commit': get_commit(), 'host': socket.gethostname(),
+               'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+               'nProcesses': kwargs.get('nProcs', 1), 'benchmarks': {}}
+    for name in names:
+        print "Running the %s benchmark" % name
+        result = run_benchmark(name, **kwargs)
+        results['benchmarks'][name] = result
+        print "    plugins %.3f s, %.1f MB/s, peak memory %.1f MB" % \
+            (result['plugin_time'], result['throughput_MBps'],
+             result['peak_rss_MB'])
+        with open(out_file, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return results
+
+
+def compare(old, new, threshold=0.1):
+    """ Compare the metrics of the benchmarks in two results dictionaries.
+
+    :param float threshold: The fractional change in a metric flagged as a \
+        regression.
+    :returns: A list of (benchmark, metric, old value, new value, change, \
+        regressed) entries.
+    """
+    rows = []
+    for name in sorted(set(old['benchmarks']) & set(new['benchmarks'])):
+        for metric in sorted(METRICS):
+            a = old['benchmarks'][name].get(metric)
+            b = new['benchmarks'][name].get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a)/float(a)
+            worse = -change if METRICS[metric] else change
+            rows.append((name, metric, a, b, change, worse > threshold))
+    return rows
+
+
+def format_comparison(old, new, rows):
+    lines = ['%s (%s) -> %s (%s)' % (old.get('commit'), old.get('date'),
+                                      new.get('commit'), new.get('date'))]
+    lines.append('%-18s%-17s%12s%12s%10s' %
+                 ('benchmark', 'metric', 'old', 'new', 'change'))
+    for name, metric, a, b, change, regressed in rows:
+        lines.append('%-18s%-17s%12.3f%12.3f%+9.1f%%%s' % (
+            name, metric, a, b, 100*change, '  REGRESSION' if regressed
+            else ''))
+    return '\n'.join(lines)
+
+
+def __option_parser():
+    """ Option parser for command line arguments.
+    """
+    parser = argparse.ArgumentParser(prog='savu_benchmark')
+    sub = parser.add_subparsers(dest='command')
+
+    run_parser = sub.add_parser('run', help='Run the benchmarks.')
+    run_parser.add_argument('-o', '--output', default='benchmark.json',
+                            help='The results file.')
+    run_parser.add_argument('-b', '--benchmarks', nargs='*',
+                            default=sorted(BENCHMARKS),
+                            choices=sorted(BENCHMARKS),
+                            help='The benchmarks to run (default all).')
+    run_parser.add_argument('-n', '--nprocs', type=int, default=1,
+                            help='The number of processes.')
+    run_parser.add_argument('-r', '--repeat', type=int, default=3,
+                            help='The number of runs of each benchmark.')
+    run_parser.add_argument('-s', '--scale', type=float, default=1.0,
+                            help='Scale the number of projections.')
+    run_parser.add_argument('-d', '--dtype', default='int16',
+                            help='The integer type of the generated data.')
+    run_parser.add_argument('--mpirun', default='mpirun',
+                            help='The mpirun command and its options.')
+    run_parser.add_argument('--keep', action='store_true', default=False,
+                            help='Keep the output folders.')
+
+    comp_parser = sub.add_parser(
+        'compare', help='Compare two results files.')
+    comp_parser.add_argument('old', help='The reference results.')
+    comp_parser.add_argument('new', help='The new results.')
+    comp_parser.add_argument('-t', '--threshold', type=float, default=10.0,
+                             help='The change (%%) flagged as a regression.')
+    return parser.parse_args()
+
+
+def main():
+    args = __option_parser()
+    if args.command == 'run':
+        run(args.benchmarks, args.output, nProcs=args.nprocs,
+            repeat=args.repeat, scale=args.scale, dtype=args.dtype,
+            mpirun=args.mpirun, keep=args.keep)
+        print "Results saved to", args.output
+        return
+
+    with open(args.old, 'r') as f:
+        old = json.load(f)
+    with open(args.new, 'r') as f:
+        new = json.load(f)
+    rows = compare(old, new, threshold=args.threshold/100.0)
+    print format_comparison(old, new, rows)
+    if any(r[-1] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,11 +26,11 @@ import os
 import atexit
 import logging
 import traceback
-import pkgutil
 
 from functools import wraps
 import arg_parsers as parsers
 import savu.plugins.utils as pu
+import savu.plugins.plugin_index as pi
 import savu.data.data_structures.utils as du
 
 
@@ -101,30 +101,19 @@ def error_catcher(function):
     return error_catcher_wrap_function
 
 
-def _add_module(loader, module_name):
-    if module_name not in sys.modules:
-        try:
-            loader.find_module(module_name).load_module(module_name)
-        except Exception:
-            pass
-
-
 # change this to dawn=False!!!!!!!!!!!!!!!!!!!!!!!!!
 def populate_plugins(dawn=True):
-    # load all the plugins
-    plugins_path = pu.get_plugins_paths()
-    savu_path = plugins_path[-1].split('savu')[0]
-    savu_plugins = plugins_path[-1:]
-    local_plugins = plugins_path[0:-1] + [savu_path + 'plugins_examples']
-
-    # load local plugins
-    for loader, module_name, is_pkg in pkgutil.walk_packages(local_plugins):
-        _add_module(loader, module_name)
-
-    # load savu plugins
-    for loader, module_name, is_pkg in pkgutil.walk_packages(savu_plugins):
-        if module_name.split('savu.plugins')[0] == '':
-            _add_module(loader, module_name)
+    # load the plugin index, re-indexing any new or modified plugin modules,
+    # and register the indexed plugins without importing their modules
+    pu.get_plugins_paths()
+    index = pi.load_plugin_index(update=True)
+    for name, entry in index.iteritems():
+        if name not in pu.plugins:
+            pu.plugins[name] = pu.LazyPlugin(name, entry['id'])
+            if entry['id'].split('.')[0] != 'savu':
+                pu.plugins_path[name] = entry['id']
+        if entry['dawn'] and name not in pu.dawn_plugins:
+            pu.dawn_plugins[name] = dict(entry['dawn'])
 
     if dawn:
         _dawn_setup()
@@ -132,6 +121,11 @@ def populate_plugins(dawn=True):
 
 def _dawn_setup():
     for plugin in pu.dawn_plugins.keys():
+        params = pi.get_indexed_parameters(pu.plugins[plugin])
+        if params and 'input rank' in pu.dawn_plugins[plugin]:
+            pu.dawn_plugin_params[plugin] = \
+                _get_dawn_parameters_from_index(params)
+            continue
         p = pu.plugins[plugin]()
         pu.dawn_plugins[plugin]['input rank'] = \
             du.get_pattern_rank(p.get_plugin_pattern())
@@ -140,6 +134,14 @@ def _dawn_setup():
         pu.dawn_plugin_params[plugin] = params
 
 
+def _get_dawn_parameters_from_index(indexed):
+    params = {}
+    for key, value in indexed['parameters'].iteritems():
+        if key not in ['in_datasets', 'out_datasets']:
+            params[key] = {'value': value['default'], 'hint': value['desc']}
+    return params
+
+
 def _get_dawn_parameters(plugin):
     plugin._populate_default_parameters()
     desc = plugin.parameters_desc
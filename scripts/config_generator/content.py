@@ -26,6 +26,7 @@ import os
 import inspect
 
 from savu.plugins import utils as pu
+from savu.plugins import plugin_index as pi
 from savu.data.plugin_list import PluginList
 import mutations
 
@@ -83,10 +84,15 @@ class Content(object):
     def add(self, name, str_pos):
         if name not in pu.plugins.keys():
             raise Exception("INPUT ERROR: Unknown plugin %s" % name)
-        plugin = pu.plugins[name]()
-        plugin._populate_default_parameters()
+        # avoid importing the plugin module if the plugin has been indexed
+        plugin_dict = self.create_indexed_plugin_dict(name)
+        if not plugin_dict:
+            plugin = pu.plugins[name]()
+            plugin._populate_default_parameters()
+            plugin_dict = self.create_plugin_dict(plugin)
         pos, str_pos = self.convert_pos(str_pos)
-        self.insert(plugin, pos, str_pos)
+        plugin_dict['pos'] = str_pos
+        self.plugin_list.plugin_list.insert(pos, plugin_dict)
 
     def refresh(self, str_pos, defaults=False, change=False):
         pos = self.find_position(str_pos)
@@ -338,14 +344,36 @@ class Content(object):
             self.plugin_list.plugin_list.insert(pos, plugin_dict)
 
     def create_plugin_dict(self, plugin):
+        return self.__create_plugin_dict(
+            plugin.name, plugin.__module__, plugin.parameters,
+            plugin.parameters_desc, plugin.parameters_hide,
+            plugin.parameters_user)
+
+    def create_indexed_plugin_dict(self, name):
+        """ Create the plugin dictionary from the plugin index, or return None
+        if the plugin is not indexed.  Plugins that override
+        final_parameter_updates are indexed as dynamic, so are not created
+        from the index. """
+        params = pi.get_indexed_parameters(pu.plugins[name])
+        if not params:
+            return None
+        data = dict((k, v['default']) for k, v in
+                    params['parameters'].iteritems())
+        desc = dict((k, v['desc']) for k, v in
+                    params['parameters'].iteritems())
+        return self.__create_plugin_dict(
+            pu.plugin_index[name]['name'], pu.plugin_index[name]['id'], data,
+            desc, params['hide'], params['user'])
+
+    def __create_plugin_dict(self, name, module, data, desc, hide, user):
         plugin_dict = {}
-        plugin_dict['name'] = plugin.name
-        plugin_dict['id'] = plugin.__module__
-        plugin_dict['data'] = plugin.parameters
+        plugin_dict['name'] = name
+        plugin_dict['id'] = module
+        plugin_dict['data'] = data
         plugin_dict['active'] = True
-        plugin_dict['desc'] = plugin.parameters_desc
-        plugin_dict['hide'] = plugin.parameters_hide
-        plugin_dict['user'] = plugin.parameters_user
+        plugin_dict['desc'] = desc
+        plugin_dict['hide'] = hide
+        plugin_dict['user'] = user
 
         dev_keys = [k for k in plugin_dict['data'].keys() if k not in
                     plugin_dict['user'] + plugin_dict['hide']]
@@ -39,7 +39,13 @@ def runSavu(path2plugin, params, metaOnly, inputs, persistence):
     params - are the savu parameters
     metaOnly - a boolean for whether the data is kept in metadata or is passed as data
     inputs      - is a dictionary of input objects 
+    persistence - the state kept between calls; if it contains a
+                  'worker_pool' (see get_worker_pool) the frame is processed
+                  by the pool
     '''
+    if persistence.get('worker_pool'):
+        return persistence['worker_pool'].run(
+            path2plugin, params, metaOnly, inputs)
     t1 = time.time()
     sys_path_0_lock = persistence['sys_path_0_lock']
     sys_path_0_set = persistence['sys_path_0_set']
@@ -49,6 +55,7 @@ def runSavu(path2plugin, params, metaOnly, inputs, persistence):
     string_key = persistence['string_key']
     parameters = persistence['parameters']
     aux = persistence['aux']
+    metaOnly = metaOnly or persistence.get('meta_only', False)
     sys_path_0_lock.acquire()
     try:
         result = copy(inputs)
@@ -103,6 +110,11 @@ def runSavu(path2plugin, params, metaOnly, inputs, persistence):
                     result['yaxis_title']=y
                     result['yaxis']=axis_values[y]
                     result['xaxis']=axis_values[x]
+            # keep the output details for the following frames
+            persistence.update({'axis_labels': axis_labels,
+                                'axis_values': axis_values,
+                                'string_key': string_key, 'aux': aux,
+                                'meta_only': metaOnly})
         else:
             pass
     finally:
@@ -137,6 +149,35 @@ def runSavu(path2plugin, params, metaOnly, inputs, persistence):
     return result
 
 
+def runSavuBatch(path2plugin, params, metaOnly, batch, persistence):
+    '''
+    Process a batch of frames, with the same arguments as runSavu except for
+    batch, a list of inputs dictionaries.  This is a generator yielding the
+    result of each frame in turn.  The frames are processed in parallel if
+    the persistence contains a worker pool, and serially otherwise.
+    '''
+    if persistence.get('worker_pool'):
+        for result in persistence['worker_pool'].imap(
+                path2plugin, params, metaOnly, batch):
+            yield result
+    else:
+        for inputs in batch:
+            yield runSavu(path2plugin, params, metaOnly, inputs, persistence)
+
+
+def get_worker_pool(persistence, nWorkers=None, max_plugins=4):
+    '''
+    Add a persistent pool of local worker processes to the persistence, so
+    that runSavu and runSavuBatch process frames in the workers.  Each worker
+    keeps up to max_plugins plugin instances set up, keyed by the plugin and
+    its parameters.
+    '''
+    if not persistence.get('worker_pool'):
+        from scripts.dawn_runner.worker_pool import WorkerPool
+        persistence['worker_pool'] = WorkerPool(nWorkers, max_plugins)
+    return persistence['worker_pool']
+
+
 def _savu_setup(path2plugin, inputs, parameters):
     print("running _savu_setup")
     parameters['in_datasets'] = [inputs['dataset_name']]
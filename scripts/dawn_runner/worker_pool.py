@@ -0,0 +1,163 @@
+'''
+worker_pool
+A pool of local worker processes for the DAWN runner.  Each worker keeps the
+plugin instances it has set up, keyed by the plugin, its parameters and the
+shape of the input frames, so frames processed with the same parameters skip
+the import, setup and pre_process of the plugin.  Batches of frames are
+processed in parallel and the results are returned as they complete.
+'''
+import sys
+import json
+import atexit
+import hashlib
+import itertools
+import threading
+import traceback
+import multiprocessing
+from collections import OrderedDict
+
+import numpy as np
+
+
+def new_persistence():
+    ''' An empty persistence dictionary, as created by DAWN. '''
+    return {'sys_path_0_lock': threading.Lock(),
+            'sys_path_0_set': False,
+            'plugin_object': None,
+            'axis_labels': None,
+            'axis_values': None,
+            'string_key': None,
+            'parameters': None,
+            'aux': {}}
+
+
+def get_plugin_key(path2plugin, params, metaOnly, inputs):
+    ''' A hash of everything the setup of a plugin instance depends on. '''
+    values = dict((k, params[k]['value']) for k in params.keys())
+    data = np.asarray(inputs['data'])
+    axes = [inputs.get(k) for k in ['dataset_name', 'xaxis_title',
+                                    'yaxis_title']]
+    key = [path2plugin, values, bool(metaOnly), data.shape, str(data.dtype),
+           axes]
+    return hashlib.md5(json.dumps(key, sort_keys=True, default=str)).\
+        hexdigest()
+
+
+def _worker(tasks, results, max_plugins):
+    from scripts.dawn_runner.run_savu import runSavu
+    plugins = OrderedDict()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        batch, idx, key, path2plugin, params, metaOnly, inputs = task
+        try:
+            # least recently used plugin instances are discarded
+            persistence = plugins.pop(key, None)
+            if persistence is None:
+                persistence = new_persistence()
+                if len(plugins) >= max_plugins:
+                    plugins.popitem(last=False)
+            plugins[key] = persistence
+            result = runSavu(path2plugin, params, metaOnly, inputs,
+                             persistence)
+            results.put((batch, idx, True, result))
+        except Exception:
+            results.put((batch, idx, False, traceback.format_exc()))
+        sys.stdout.flush()
+
+
+class WorkerPool(object):
+    '''
+    A pool of persistent worker processes, communicating through pipes.
+
+    nWorkers    - the number of processes (defaults to the number of cores)
+    max_plugins - the number of plugin instances kept by each worker
+    '''
+
+    def __init__(self, nWorkers=None, max_plugins=4):
+        self.nWorkers = nWorkers if nWorkers else multiprocessing.cpu_count()
+        self.tasks = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.lock = threading.Lock()
+        self.batch = itertools.count()
+        self.received = {}  # the results of each active batch, by frame
+        self.workers = []
+        for i in range(self.nWorkers):
+            worker = multiprocessing.Process(
+                target=_worker, args=(self.tasks, self.results, max_plugins))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        atexit.register(self.close)
+
+    def run(self, path2plugin, params, metaOnly, inputs):
+        ''' Process a single frame, with the same arguments and result as
+        runSavu. '''
+        return next(self.imap(path2plugin, params, metaOnly, [inputs]))
+
+    def imap(self, path2plugin, params, metaOnly, batch):
+        '''
+        Process a batch of frames in parallel.  This is a generator yielding
+        the results in the order of the frames, as soon as they are
+        available.  The lock is only held while collecting the results, not
+        while they are yielded, so batches can be consumed concurrently.
+
+        batch - a list (or iterable) of inputs dictionaries
+        '''
+        with self.lock:
+            if not self.workers:
+                raise Exception("The worker pool has been closed.")
+            bid = next(self.batch)
+            self.received[bid] = {}
+        frames = iter(enumerate(batch))
+        nSent, nDone = 0, 0
+        try:
+            while True:
+                with self.lock:
+                    received = self.received[bid]
+                    # limit the frames in flight so that memory is bounded
+                    nFree = 2*self.nWorkers - (nSent - nDone - len(received))
+                    for idx, inputs in itertools.islice(frames, nFree):
+                        self.__put(bid, idx, path2plugin, params, metaOnly,
+                                   inputs)
+                        nSent += 1
+                    if nDone == nSent:
+                        return
+                    while nDone not in received:
+                        self.__get()
+                    ready = []
+                    while nDone in received:
+                        ready.append((nDone, received.pop(nDone)))
+                        nDone += 1
+                for idx, (success, result) in ready:
+                    if not success:
+                        raise Exception("Frame %i failed in the worker pool:"
+                                        "\n%s" % (idx, result))
+                    yield result
+        finally:
+            with self.lock:
+                del self.received[bid]
+
+    def __get(self):
+        ''' Receive a result, for whichever batch it belongs to. '''
+        bid, idx, success, result = self.results.get()
+        if bid in self.received:  # otherwise from an abandoned batch
+            self.received[bid][idx] = (success, result)
+
+    def __put(self, bid, idx, path2plugin, params, metaOnly, inputs):
+        key = get_plugin_key(path2plugin, params, metaOnly, inputs)
+        self.tasks.put((bid, idx, key, path2plugin, params, metaOnly,
+                        inputs))
+
+    def close(self):
+        ''' Stop the workers. '''
+        if not self.workers:
+            return
+        for worker in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
@@ -0,0 +1,59 @@
+# Copyright 2014 Diamond Light Source Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+.. module:: merge_traces
+   :platform: Unix
+   :synopsis: Merge the per-process trace files of a Savu run (created with \
+       the --trace option) into a single timeline, and print the time each \
+       plugin spent in I/O, computation and waiting.
+
+.. moduleauthor:: Nicola Wadeson <scientificsoftware@diamond.ac.uk>
+
+"""
+
+import os
+import argparse
+
+import savu.core.trace as trace
+
+
+def __option_parser():
+    """ Option parser for command line arguments.
+    """
+    parser = argparse.ArgumentParser(prog='savu_trace')
+    parser.add_argument('folder', help='The folder containing the trace files'
+                        ' (the Savu log folder).')
+    parser.add_argument('-o', '--output', default=None,
+                        help='The merged trace file, defaulting to '
+                        'trace.json in the folder.')
+    return parser.parse_args()
+
+
+def main():
+    args = __option_parser()
+    out_file = args.output if args.output else \
+        os.path.join(args.folder, 'trace.json')
+
+    events = trace.merge_trace_files(args.folder, out_file=out_file)
+    print trace.format_summary(*trace.summarise(events))
+    peak = trace.get_peak_memory(events)
+    if peak is not None:
+        print "Peak memory of a process: %.1f MB" % peak
+    print "\nTimeline created:", out_file
+    print "Open the file in chrome://tracing or https://ui.perfetto.dev"
+
+
+if __name__ == "__main__":
+    main()
@@ -94,11 +94,14 @@ setup(name='savu',
 
       entry_points={'console_scripts': [
                         'savu_config=scripts.config_generator.savu_config:main',
+                        'savu_plugin_index=savu.plugins.plugin_index:main',
                         'savu=savu.tomo_recon:main',
                         'savu_quick_tests=savu:run_tests',
                         'savu_full_tests=savu:run_full_tests',
                         'savu_citations=scripts.citation_extractor.citation_extractor:main',
-                        'savu_profile=scripts.log_evaluation.GraphicalThreadProfiler:main',],},
+                        'savu_profile=scripts.log_evaluation.GraphicalThreadProfiler:main',
+                        'savu_trace=scripts.log_evaluation.merge_traces:main',
+                        'savu_benchmark=scripts.benchmark.savu_benchmark:main',],},
 
       package_data={'test_data': [
                         'data/*',